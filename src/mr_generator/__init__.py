@@ -6,12 +6,25 @@ MR Description Generator
 
 from .core.git_helper import GitHelper
 from .core.base_provider import LLMProvider
-from .providers.gigachat_provider import GigaChatProvider
-from .providers.deepseek_provider import DeepSeekProvider
 from .config import Config
 
 __version__ = "1.0.0"
 
+# Провайдеры импортируются при первом обращении: импорт пакета не загружает их все
+_LAZY_PROVIDERS = {
+    "GigaChatProvider": ".providers.gigachat_provider",
+    "DeepSeekProvider": ".providers.deepseek_provider",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_PROVIDERS:
+        import importlib
+
+        return getattr(importlib.import_module(_LAZY_PROVIDERS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     "GitHelper",
     "LLMProvider",
@@ -7,9 +7,12 @@ MR Description Generator
 """
 
 import argparse
+import json
 import os
 import sys
-from typing import Optional
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -21,31 +24,170 @@ current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 from .core.git_helper import GitHelper
-from .providers.gigachat_provider import GigaChatProvider
-from .providers.deepseek_provider import DeepSeekProvider
+from .providers.fallback_provider import FallbackProvider
+from .providers.registry import ProviderRegistry, get_provider_registry
 from .core.base_provider import LLMProvider
+from .core.commit_log import CompactLog, compact_commit_log
+from .core.diff_cache import DiffCache
+from .core.diff_model import DiffFile, parse_diff, render_diff
+from .core.diff_normalizer import DiffNormalizer, NormalizationStats
+from .core.diff_dedup import HunkDeduplicator, summarize_paths
+from .core.diff_parallel import ParallelDiffProcessor
+from .core.diff_renames import collapse_renames
+from .core.diff_segments import SegmentCache
+from .core.health import CircuitBreaker, HealthCheckedProvider
+from .core.hooks import install_hooks, precompute_lock
+from .core.importance_index import ImportanceIndex
+from .core.memory_budget import MemoryBudget, format_size, parse_size, peak_rss
+from .core.rate_limiter import RateLimitedProvider, RateLimiter
+from .core.revisions import Revisions, read_ci_revisions
+from .core.stack import (
+    build_stack, stack_ancestors, stack_context, summarize_description
+)
+from .core.state_file import default_state_dir
+from .core.structured_description import (
+    LANGUAGES, PROMPT_TYPES, parse_structured, render_all
+)
+from .core.symbol_digest import SymbolDigest
+from .core.timing import PhaseTimer
+from .core.tokens import estimate_tokens
+from .core.file_classifier import (
+    CATEGORY_PRIORITY, GENERATED, classify_path, detect_mr_type
+)
+from .config import Config, DIFF_LABELS, STRUCTURED_MAX_TOKENS
 
 
 class MRDescriptionGenerator:
     """Генератор описаний для Merge Request"""
     
-    SUPPORTED_PROVIDERS = {
-        'gigachat': GigaChatProvider,
-        'deepseek': DeepSeekProvider
-    }
+    # Параметры конкретного провайдера: резервным провайдерам не передаются
+    PROVIDER_OPTIONS = ('base_url', 'model', 'auth_header', 'auth_scheme', 'stream',
+                        'requests_per_minute', 'tokens_per_minute')
+    
+    # Версия формата упакованного diff'а в кэше: менять при изменении упаковки
+    PACKED_FORMAT = 1
+    
+    # Параметры, не влияющие на результат упаковки (не входят в ключ кэша)
+    CACHE_NEUTRAL_OPTIONS = ('jobs', 'parallel_min_size', 'parallel_min_files')
     
-    def __init__(self, repo_path: str = "."):
+    # Параметры, которые передаются в git diff (остальные обрабатываются на нашей стороне)
+    GIT_DIFF_OPTIONS = ('ignore_whitespace', 'ignore_blank_lines', 'context_lines',
+                        'find_renames', 'find_copies')
+    
+    def __init__(self, repo_path: str = ".", diff_options: Optional[dict] = None,
+                 diff_stats: bool = False, cache_options: Optional[dict] = None,
+                 health_options: Optional[dict] = None,
+                 importance_options: Optional[dict] = None,
+                 memory_options: Optional[dict] = None,
+                 registry: Optional[ProviderRegistry] = None):
         self.git_helper = GitHelper(repo_path)
+        # Провайдеры: встроенные и из entry points, модуль импортируется при создании
+        self.registry = registry or get_provider_registry()
         self.repo_path = repo_path
+        self.diff_options = Config.get_diff_options()
+        self.diff_options.update(diff_options or {})
+        self.diff_stats = diff_stats
+        self.timer = PhaseTimer()
+        
+        # Кэш diff'ов по SHA коммитов: повторные запуски не пересчитывают diff
+        self.cache_options = Config.get_cache_config()
+        self.cache_options.update(cache_options or {})
+        if self.cache_options.get('enabled') and self.git_helper.is_git_repo():
+            cache_dir = self.cache_options.get('dir') or os.path.join(
+                self.git_helper.get_git_common_dir(), 'mr-generator', 'cache')
+            self.git_helper.cache = DiffCache(cache_dir, self.cache_options['max_size'])
+        self.symbol_digest = SymbolDigest(self.git_helper)
+        
+        # Лимит памяти: diff не читается в память целиком, а отображается из файла
+        self.memory_options = Config.get_memory_config()
+        self.memory_options.update(memory_options or {})
+        self.memory_budget = None
+        if self.memory_options.get('max_memory'):
+            self.memory_budget = MemoryBudget(self.memory_options['max_memory'],
+                                              self.memory_options.get('spool_dir'))
+            self.git_helper.memory_budget = self.memory_budget
+        
+        # Индекс важности файлов: порядок и доля бюджета файлов при упаковке
+        self.importance_options = Config.get_importance_config()
+        self.importance_options.update(importance_options or {})
+        self.importance_index = None
+        if self.importance_options.get('enabled') and self.git_helper.is_git_repo():
+            self.importance_index = ImportanceIndex(
+                os.path.join(self.git_helper.get_git_common_dir(), 'mr-generator',
+                             'importance.json'),
+                self.git_helper,
+                half_life_days=self.importance_options['half_life_days'],
+                max_commits=self.importance_options['max_commits'],
+            )
+        
+        # Circuit breaker: недоступный endpoint не ждем до таймаута при каждом запуске
+        self.health_options = Config.get_health_config()
+        self.health_options.update(health_options or {})
+        self.circuit_breaker = None
+        if self.health_options.get('enabled'):
+            self.circuit_breaker = CircuitBreaker(
+                self.health_options.get('state_file')
+                or os.path.join(default_state_dir(), 'health.json'),
+                failure_threshold=self.health_options['failure_threshold'],
+                open_seconds=self.health_options['open_seconds'],
+                max_open_seconds=self.health_options['max_open_seconds'],
+                alpha=self.health_options['ewma_alpha'],
+            )
+        self.rate_limit_options = Config.get_rate_limit_config()
+        # Кэш секций diff'а по файлам (режим watch): пересчитываются только изменившиеся
+        self.segment_cache: Optional[SegmentCache] = None
+        # Бюджет токенов на список коммитов (определение типа MR и контекст промпта)
+        self.commit_log_tokens = Config.get_commit_log_tokens()
+        # Резервные провайдеры (название, API ключ, параметры) и режим их запуска
+        self.fallback_providers: List[Tuple[str, str, dict]] = []
+        self.race_options: dict = {}
     
     def create_provider(self, provider_name: str, api_key: str, **kwargs) -> LLMProvider:
-        """Создает провайдера языковой модели"""
-        if provider_name not in self.SUPPORTED_PROVIDERS:
-            raise ValueError(f"Неподдерживаемый провайдер: {provider_name}. "
-                           f"Доступные: {list(self.SUPPORTED_PROVIDERS.keys())}")
+        """
+        Создает провайдера языковой модели
+        
+        Если заданы резервные провайдеры (self.fallback_providers), возвращает
+        FallbackProvider с основным провайдером в начале цепочки.
+        """
+        provider = self._instantiate_provider(provider_name, api_key, **kwargs)
+        if not self.fallback_providers:
+            return provider
         
-        provider_class = self.SUPPORTED_PROVIDERS[provider_name]
-        return provider_class(api_key, **kwargs)
+        common = {key: value for key, value in kwargs.items()
+                  if key not in self.PROVIDER_OPTIONS}
+        chain = [provider] + [
+            self._instantiate_provider(name, key, **{**common, **options})
+            for name, key, options in self.fallback_providers
+        ]
+        return FallbackProvider(chain, **self.race_options)
+    
+    def _instantiate_provider(self, provider_name: str, api_key: str, **kwargs) -> LLMProvider:
+        """Создает одного провайдера по названию"""
+        provider_class = self.registry.load(provider_name)
+        # Значения из DEFAULT_CONFIGS, переопределенные параметрами запуска
+        provider_config = Config.get_provider_config(provider_name)
+        provider_config.update(kwargs)
+        requests_per_minute = provider_config.pop('requests_per_minute', None)
+        tokens_per_minute = provider_config.pop('tokens_per_minute', None)
+        provider = provider_class(api_key, **provider_config)
+        
+        if self.circuit_breaker is not None:
+            endpoint = ' '.join([provider_name, str(provider_config.get('base_url', '')),
+                                 str(provider_config.get('model', ''))])
+            provider = HealthCheckedProvider(provider, self.circuit_breaker, endpoint)
+        
+        if requests_per_minute or tokens_per_minute:
+            # Снаружи circuit breaker'а: ожидание лимита не считается задержкой endpoint'а
+            limiter = RateLimiter(
+                self.rate_limit_options.get('state_file')
+                or os.path.join(default_state_dir(), 'rate_limits.json'),
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_wait=self.rate_limit_options['max_wait'],
+            )
+            provider = RateLimitedProvider(provider, limiter,
+                                           RateLimiter.make_key(provider_name, api_key or ''))
+        return provider
     
     def generate_description(
         self,
@@ -60,7 +202,7 @@ class MRDescriptionGenerator:
         
         Args:
             branch: Название ветки
-            provider_name: Название провайдера (gigachat, deepseek)
+            provider_name: Название провайдера (gigachat, deepseek, local)
             api_key: API ключ
             base_branch: Базовая ветка (определяется автоматически если не указана)
             **kwargs: Дополнительные параметры
@@ -68,144 +210,588 @@ class MRDescriptionGenerator:
         Returns:
             Сгенерированное описание
         """
+        provider, prompt = self.prepare_prompt(branch, provider_name, api_key,
+                                               base_branch, **kwargs)
+        
+        print("⏳ Генерируем описание...")
+        with self.timer.phase('запрос к модели'):
+            description = provider.complete(prompt, **kwargs)
+        
+        return description
+    
+    def generate_all_formats(
+        self,
+        branch: str,
+        provider_name: str,
+        api_key: str,
+        base_branch: Optional[str] = None,
+        **kwargs
+    ) -> Tuple[dict, Dict[Tuple[str, str], str]]:
+        """
+        Генерирует все варианты описания одним запросом к модели
+        
+        Модель возвращает структурированное описание (JSON на двух языках),
+        из которого локально собираются форматы basic, detailed и concise
+        на русском и английском.
+        
+        Returns:
+            Структурированное описание и варианты по ключу (тип, язык)
+        """
+        kwargs['prompt_type'] = 'structured'
+        response = self.generate_description(branch, provider_name, api_key,
+                                             base_branch, **kwargs)
+        data = parse_structured(response)
+        return data, render_all(data)
+    
+    def save_all_formats(self, data: dict, variants: Dict[Tuple[str, str], str],
+                         output_file: Optional[str] = None):
+        """
+        Сохраняет все варианты описания
+        
+        Для output_file "description.md" создаются description.<тип>.<язык>.md
+        и description.json со структурированным описанием.
+        """
+        if not output_file:
+            for (prompt_type, language), description in variants.items():
+                print(f"\n🗂️  Формат: {prompt_type}, язык: {language}")
+                self.save_description(description, None)
+            return
+        
+        output_path = Path(output_file)
+        suffix = output_path.suffix or '.md'
+        for (prompt_type, language), description in variants.items():
+            self.save_description(description, str(output_path.with_name(
+                f"{output_path.stem}.{prompt_type}.{language}{suffix}")))
+        self.save_description(json.dumps(data, ensure_ascii=False, indent=2),
+                              str(output_path.with_name(f"{output_path.stem}.json")))
+    
+    def plan_stack(self, branches: List[str],
+                   base_branch: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+        """
+        Находит стеки среди веток по общей истории
+        
+        Включает общий кэш сегментов diff'а для всех веток пакета.
+        
+        Returns:
+            Пары (ветка, родительская ветка или None), родитель идет раньше потомка
+        """
+        if self.segment_cache is None:
+            self.segment_cache = SegmentCache()
+        heads = dict(zip(branches, self.git_helper.resolve_commits(*branches)))
+        stack = build_stack(heads, self.git_helper.is_ancestor)
+        print(f"🥞 Порядок веток ({len(stack)}):")
+        for branch, parent in stack:
+            print(f"   • {branch} ← {parent or base_branch or 'базовая ветка'}")
+        return stack
+    
+    def generate_batch(
+        self,
+        branches: List[str],
+        provider_name: str,
+        api_key: str,
+        base_branch: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, str]:
+        """
+        Генерирует описания для нескольких веток, в том числе для стека веток
+        
+        Ветка стека сравнивается с ближайшей предыдущей веткой, а не с базовой:
+        изменения предков не обрабатываются и не отправляются повторно. Вместо
+        них в промпт идет сводка уже готовых описаний предков. Секции diff'а
+        файлов переиспользуются между ветками через общий кэш сегментов.
+        
+        Returns:
+            Описания по названию ветки в порядке стека
+        """
+        parents: Dict[str, Optional[str]] = {}
+        summaries: Dict[str, str] = {}
+        descriptions: Dict[str, str] = {}
+        for branch, parent in self.plan_stack(branches, base_branch):
+            parents[branch] = parent
+            ancestors = [(name, summaries[name]) for name in stack_ancestors(parent, parents)]
+            
+            print(f"\n🌿 Ветка '{branch}'")
+            descriptions[branch] = self.generate_description(
+                branch, provider_name, api_key, parent or base_branch,
+                stack_context=stack_context(ancestors), **kwargs)
+            summaries[branch] = summarize_description(descriptions[branch])
+        return descriptions
+    
+    def save_batch(self, descriptions: Dict[str, str], output_file: Optional[str] = None):
+        """
+        Сохраняет описания веток
+        
+        Для output_file "description.md" создаются description.<ветка>.md
+        (символ "/" в названии ветки заменяется на "-").
+        """
+        for branch, description in descriptions.items():
+            if not output_file:
+                print(f"\n🌿 Ветка: {branch}")
+                self.save_description(description, None)
+                continue
+            output_path = Path(output_file)
+            name = branch.replace('/', '-')
+            self.save_description(description, str(output_path.with_name(
+                f"{output_path.stem}.{name}{output_path.suffix or '.md'}")))
+    
+    def prepare_prompt(
+        self,
+        branch: str,
+        provider_name: str,
+        api_key: str,
+        base_branch: Optional[str] = None,
+        **kwargs
+    ) -> Tuple[LLMProvider, str]:
+        """
+        Выполняет все шаги генерации до запроса к модели
+        
+        Получает и нормализует diff, упаковывает его в бюджет, собирает
+        метаданные и промпт. Время этапов записывается в self.timer.
+        Параметр stack_context (контекст стека веток) добавляется перед diff'ом.
+        Параметр branch_name - имя ветки для промпта, когда branch и base_branch
+        заданы SHA коммитов (--base-sha / --head-sha): текущая ветка тогда не
+        определяется.
+        
+        Returns:
+            Провайдер и готовый промпт
+        """
+        self.timer = PhaseTimer()
+        stack_prefix = kwargs.pop('stack_context', '')
+        branch_name = kwargs.pop('branch_name', None)
         
         # Проверяем, что мы в git репозитории
         if not self.git_helper.is_git_repo():
             raise Exception("Текущая директория не является Git репозиторием")
         
         # Получаем информацию о репозитории
-        repo_info = self.git_helper.get_repo_info()
+        repo_info = self.git_helper.get_repo_info(include_branch=branch_name is None)
         print(f"📁 Репозиторий: {repo_info.get('repo_name', 'Unknown')}")
-        print(f"🌿 Текущая ветка: {repo_info.get('current_branch', 'Unknown')}")
-        
-        # Получаем diff
-        print(f"🔍 Получаем diff для ветки '{branch}'...")
-        diff_content = self.git_helper.get_diff(branch, base_branch)
-        
-        if not diff_content.strip():
-            raise Exception(f"Нет изменений в ветке '{branch}' относительно базовой ветки")
-        
-        # 🧠 УМНАЯ ОБРАБОТКА БОЛЬШИХ DIFF'ОВ
-        original_size = len(diff_content)
-        print(f"📏 Размер diff: {original_size:,} символов")
+        if branch_name is None:
+            print(f"🌿 Текущая ветка: {repo_info.get('current_branch', 'Unknown')}")
+        else:
+            print(f"🌿 Ветка: {branch_name} ({base_branch[:12]}..{branch[:12]})")
         
-        # Определяем стратегию обработки
-        if original_size > 100000:  # Больше 100К символов
-            print("🧠 Diff слишком большой! Применяем умную обработку...")
-            diff_content = self._smart_truncate_diff(diff_content, max_size=50000)
-            print(f"📉 Размер после оптимизации: {len(diff_content):,} символов")
-        elif original_size > 50000:  # Больше 50К символов
-            print("⚡ Применяем легкую оптимизацию...")
-            diff_content = self._smart_truncate_diff(diff_content, max_size=30000)
-            print(f"📉 Размер после оптимизации: {len(diff_content):,} символов")
+        diff_content = stack_prefix + self.collect_diff(branch, base_branch,
+                                                        kwargs.get('language', 'ru'))
         
         # Получаем дополнительную информацию
-        changed_files = self.git_helper.get_changed_files(branch, base_branch)
-        commit_messages = self.git_helper.get_commit_messages(branch, base_branch)
+        changed_files, commit_log = self.collect_metadata(branch, base_branch)
         
         print(f"📄 Измененных файлов: {len(changed_files)}")
-        print(f"📝 Коммитов: {len(commit_messages)}")
+        print(f"📝 Коммитов: {commit_log.total}" + (
+            f" (в контексте: {len(commit_log.lines)} групп, merge: {commit_log.merges}, "
+            f"не вошло: {commit_log.omitted})"
+            if len(commit_log.lines) != commit_log.total else ""))
         
-        # Создаем провайдера и генерируем описание
+        mr_type = detect_mr_type(changed_files, commit_log.lines)
+        print(f"🎯 Определен тип MR: {mr_type}")
+        
+        # Создаем провайдера и собираем промпт
         provider = self.create_provider(provider_name, api_key, **kwargs)
         print(f"🤖 Используем модель: {provider.get_model_name()}")
         
         # Добавляем дополнительную информацию в kwargs
-        kwargs.update({
+        prompt_kwargs = dict(kwargs)
+        prompt_kwargs.update({
             'changed_files': changed_files,
-            'commit_messages': commit_messages,
+            'commit_messages': commit_log.lines,
+            'commits_count': commit_log.total,
             'repo_name': repo_info.get('repo_name', ''),
+            'mr_type': mr_type,
         })
         
-        print("⏳ Генерируем описание...")
-        description = provider.generate_description(diff_content, branch, **kwargs)
+        with self.timer.phase('промпт'):
+            prompt = provider.build_prompt(diff_content, branch_name or branch, **prompt_kwargs)
         
-        return description
+        return provider, prompt
+    
+    def collect_metadata(self, branch: str,
+                         base_branch: Optional[str] = None) -> Tuple[List[str], CompactLog]:
+        """Измененные файлы и сжатый до бюджета токенов список коммитов"""
+        with self.timer.phase('метаданные git'):
+            changed_files = self.git_helper.get_changed_files(branch, base_branch)
+            commit_messages = self.git_helper.get_commit_messages(branch, base_branch)
+            commit_log = compact_commit_log(commit_messages, self.commit_log_tokens)
+        return changed_files, commit_log
     
-    def _smart_truncate_diff(self, diff_content: str, max_size: int = 50000) -> str:
-        """Умно обрезает diff, сохраняя важную информацию"""
+    def collect_diff(self, branch: str, base_branch: Optional[str] = None,
+                     language: str = 'ru') -> str:
+        """
+        Получает, нормализует и упаковывает diff в бюджет промпта
         
-        if len(diff_content) <= max_size:
-            return diff_content
+        Результат кэшируется по SHA коммитов, параметрам diff и языку промпта
+        (на нем подписи разделов сводки), поэтому после precompute повторный
+        вызов только читает кэш.
         
-        lines = diff_content.split('\n')
+        Returns:
+            Текст diff'а для промпта
+        """
+        # Diff, подготовленный заранее (precompute из git hook'а)
+        with self.timer.phase('кэш'):
+            key = self._packed_key(branch, base_branch, language)
+            # С --diff-stats diff считается заново, чтобы показать статистику шагов
+            packed = self.git_helper.cache.get_json(key) if key and not self.diff_stats else None
+        if packed is not None:
+            print(f"⚡ Diff подготовлен заранее: {packed['original_size']:,} байт → "
+                  f"{len(packed['diff']):,} символов")
+            return packed['diff']
         
-        # Собираем статистику
-        stats = {
-            'files_changed': 0,
-            'additions': 0,
-            'deletions': 0,
-            'file_types': {}
-        }
+        # Получаем diff
+        print(f"🔍 Получаем diff для ветки '{branch}'...")
+        with self.timer.phase('git diff'):
+            # Секции из кэша сегментов собираются в памяти: при лимите памяти не используем
+            if self.segment_cache is not None and self.memory_budget is None:
+                hits, misses = self.segment_cache.hits, self.segment_cache.misses
+                diff_content = self.git_helper.get_diff_segments(
+                    branch, base_branch, segments=self.segment_cache, **self.diff_options)
+                print(f"♻️  Файлов из кэша: {self.segment_cache.hits - hits}, "
+                      f"пересчитано: {self.segment_cache.misses - misses}")
+            else:
+                diff_content = self.git_helper.get_diff_bytes(branch, base_branch,
+                                                              **self.diff_options)
         
-        important_lines = []
-        current_file = None
-        files_shown = 0
-        max_files_to_show = 15  # Показываем первые 15 файлов
-        
-        for line in lines:
-            # Всегда сохраняем заголовки файлов
-            if line.startswith('diff --git'):
-                stats['files_changed'] += 1
-                if files_shown < max_files_to_show:
-                    important_lines.append(line)
-                    current_file = line
-                    files_shown += 1
-                else:
-                    break
-            
-            # Сохраняем метаданные
-            elif line.startswith('index ') or line.startswith('---') or line.startswith('+++'):
-                if files_shown <= max_files_to_show:
-                    important_lines.append(line)
-            
-            # Сохраняем контекстные заголовки
-            elif line.startswith('@@'):
-                if files_shown <= max_files_to_show:
-                    important_lines.append(line)
-            
-            # Подсчитываем изменения и сохраняем некоторые
-            elif line.startswith('+') and not line.startswith('+++'):
-                stats['additions'] += 1
-                # Сохраняем первые несколько строк изменений для каждого файла
-                if files_shown <= max_files_to_show and len(important_lines) < max_size // 2:
-                    important_lines.append(line)
+        # Срез, а не весь diff: при лимите памяти это буфер mmap без strip()
+        if not diff_content[:64].strip():
+            raise Exception(f"Нет изменений в ветке '{branch}' относительно базовой ветки")
+        
+        original_size = len(diff_content)
+        print(f"📏 Размер diff: {original_size:,} байт")
+        with self.timer.phase('нормализация'):
+            prefix, files = self._normalize_diff(diff_content, branch, base_branch, language)
+        del diff_content
+        
+        if self.diff_options.get('symbols'):
+            with self.timer.phase('сводка символов'):
+                prefix = self._build_symbol_digest(branch, base_branch, language) + prefix
+        
+        # 🧠 УМНАЯ ОБРАБОТКА БОЛЬШИХ DIFF'ОВ
+        normalized_size = len(prefix) + sum(diff_file.size for diff_file in files)
+        
+        # Важность файлов нужна, только если diff не помещается в бюджет
+        importance = {}
+        if normalized_size > 50000:
+            with self.timer.phase('индекс важности'):
+                importance = self._file_importance(branch, base_branch, files)
+            # Без индекса упаковка хуже: такой результат не кэшируем под ключом с индексом
+            if importance is None:
+                importance, key = {}, None
+        
+        # Определяем стратегию обработки
+        with self.timer.phase('упаковка'):
+            if normalized_size > 100000:  # Больше 100К байт
+                print("🧠 Diff слишком большой! Применяем умную обработку...")
+                diff_content = self._smart_truncate_diff(files, max_size=50000, prefix=prefix,
+                                                         original_size=original_size,
+                                                         importance=importance)
+                print(f"📉 Размер после оптимизации: {len(diff_content):,} символов")
+            elif normalized_size > 50000:  # Больше 50К байт
+                print("⚡ Применяем легкую оптимизацию...")
+                diff_content = self._smart_truncate_diff(files, max_size=30000, prefix=prefix,
+                                                         original_size=original_size,
+                                                         importance=importance)
+                print(f"📉 Размер после оптимизации: {len(diff_content):,} символов")
+            else:
+                diff_content = prefix + render_diff(files)
+        
+        if key:
+            self.git_helper.cache.put_json(key, {'diff': diff_content,
+                                                 'original_size': original_size})
+        return diff_content
+    
+    def _packed_key(self, branch: str, base_branch: Optional[str] = None,
+                    language: str = 'ru') -> Optional[str]:
+        """Ключ кэша упакованного diff'а или None, если кэш выключен"""
+        if self.git_helper.cache is None:
+            return None
+        merge_base = self.git_helper.get_merge_base(branch, base_branch)
+        head = self.git_helper.resolve_commits(branch)[0]
+        options = {key: value for key, value in self.diff_options.items()
+                   if key not in self.CACHE_NEUTRAL_OPTIONS}
+        # Порядок и доли файлов зависят от индекса важности. Перед использованием
+        # индекс доводится до merge-base, поэтому его состояние задает merge-base в ключе
+        options['importance'] = (
+            {key: self.importance_options[key] for key in ('half_life_days', 'max_commits')}
+            if self.importance_index is not None else False
+        )
+        options['language'] = language
+        return DiffCache.make_key('packed', [self.PACKED_FORMAT, merge_base, head,
+                                             json.dumps(options, sort_keys=True)])
+    
+    def precompute(self, branch: str, base_branch: Optional[str] = None, language: str = 'ru'):
+        """Заранее считает и кэширует diff и метаданные для ветки (без запроса к модели)"""
+        if self.git_helper.cache is None:
+            raise Exception("Кэш diff'ов выключен: предварительный расчет бесполезен")
+        
+        self.timer = PhaseTimer()
+        diff_content = self.collect_diff(branch, base_branch, language)
+        changed_files, commit_log = self.collect_metadata(branch, base_branch)
+        # Индекс обновляется и для небольших diff'ов: к генерации он будет готов
+        if self.importance_index is not None:
+            self._update_importance(branch, base_branch)
+        
+        mr_type = detect_mr_type(changed_files, commit_log.lines)
+        print(f"🎯 Тип MR: {mr_type}, файлов: {len(changed_files)}, коммитов: {commit_log.total}")
+        print(f"📊 Оценка токенов diff'а: ~{estimate_tokens(len(diff_content)):,}")
+    
+    def watch(self, branch: str, on_change: Callable[[str], None], interval: float = 2.0,
+              debounce: float = 5.0):
+        """
+        Следит за веткой и вызывает on_change(head) при каждом ее сдвиге
+        
+        Ветка опрашивается раз в interval секунд. После сдвига ждем, пока она
+        не простоит debounce секунд, чтобы серия коммитов дала один пересчет.
+        Секции diff'а неизменившихся файлов берутся из кэша сегментов.
+        Работает до прерывания (Ctrl+C).
+        """
+        if self.segment_cache is None:
+            self.segment_cache = SegmentCache()
+        
+        last_head = None
+        while True:
+            try:
+                head = self.git_helper.resolve_commits(branch)[0]
+                if head != last_head and last_head is not None:
+                    print(f"🔔 Ветка '{branch}' сдвинулась: {head[:12]}")
+                    while True:
+                        time.sleep(debounce)
+                        current = self.git_helper.resolve_commits(branch)[0]
+                        if current == head:
+                            break
+                        head = current
+            except Exception as e:
+                # Например, ветку удалили или переписывают: ждем следующей проверки
+                print(f"⚠️  {e}")
+                time.sleep(interval)
+                continue
             
-            elif line.startswith('-') and not line.startswith('---'):
-                stats['deletions'] += 1
-                if files_shown <= max_files_to_show and len(important_lines) < max_size // 2:
-                    important_lines.append(line)
+            if head == last_head:
+                time.sleep(interval)
+                continue
             
-            # Сохраняем контекстные строки (без + или -)
-            elif files_shown <= max_files_to_show and len(important_lines) < max_size // 2:
-                if len(line.strip()) > 0:  # Пропускаем пустые строки
-                    important_lines.append(line)
+            last_head = head
+            try:
+                on_change(head)
+            except Exception as e:
+                # Ошибка одного пересчета (например, сети) не останавливает наблюдение
+                print(f"❌ Ошибка: {e}")
+            print(f"👀 Ждем новых коммитов в ветке '{branch}' (Ctrl+C - выход)...")
+    
+    def _normalize_diff(self, diff_content: bytes, branch: str, base_branch: Optional[str] = None,
+                        language: str = 'ru') -> Tuple[str, List[DiffFile]]:
+        """
+        Нормализует diff и выводит экономию токенов по шагам
+        
+        Returns:
+            Сводка перемещений и повторяющихся правок и оставшиеся файлы diff'а
+        """
+        stats = NormalizationStats()
+        if self.diff_stats:
+            self._measure_git_steps(branch, base_branch, stats)
+        
+        # Большие diff'ы разбираются и нормализуются в пуле процессов
+        files, fingerprints = None, None
+        processor = ParallelDiffProcessor(self.diff_options.get('jobs'),
+                                          self.diff_options.get('parallel_min_size'))
+        # Пул копирует diff в разделяемую память: при лимите - только если копия поместится
+        if processor.should_run(len(diff_content)) and (
+                self.memory_budget is None or self.memory_budget.can_allocate(len(diff_content))):
+            print(f"⚙️  Параллельная обработка diff: процессов {processor.jobs}")
+            try:
+                files, fingerprints = processor.process(diff_content, self.diff_options, stats)
+            except OSError as e:
+                print(f"⚠️  Пул процессов недоступен ({e}), обрабатываем в одном процессе")
+        if files is None:
+            files = parse_diff(diff_content,
+                               fallback_encoding=self.diff_options.get('fallback_encoding', 'cp1251'),
+                               file_encodings=self.diff_options.get('file_encodings'))
+            files = DiffNormalizer(**self.diff_options).normalize(files, stats)
+        
+        # Чистые переименования и копирования заменяем строками сводки
+        moves_text = ""
+        size = sum(diff_file.size for diff_file in files)
+        files, moves = collapse_renames(files, language)
+        if moves:
+            moves_text = "\n".join([DIFF_LABELS.get(language, DIFF_LABELS['ru'])['moves_title'],
+                                    ""] + moves) + "\n\n"
+            stats.record('collapse_renames', size,
+                         sum(diff_file.size for diff_file in files) + len(moves_text))
+            print(f"🚚 Перемещений без изменений: {len(moves)} групп")
+        
+        # Повторяющиеся правки выносим в кластеры с одним представителем
+        clusters_text = ""
+        if self.diff_options.get('dedup_hunks'):
+            size = sum(diff_file.size for diff_file in files)
+            deduplicator = HunkDeduplicator(min_files=self.diff_options.get('dedup_min_files', 3),
+                                            language=language)
+            files, clusters = deduplicator.deduplicate(files, fingerprints)
+            clusters_text = deduplicator.render_clusters(clusters)
+            stats.record('dedup_hunks', size,
+                         sum(diff_file.size for diff_file in files) + len(clusters_text))
+            if clusters:
+                print(f"🧬 Повторяющихся правок: {len(clusters)} "
+                      f"(в {sum(len(c.paths) for c in clusters):,} файлах)")
+        
+        prefix = moves_text + clusters_text
+        
+        if self.diff_stats or stats.tokens_saved > 0:
+            size = len(prefix) + sum(diff_file.size for diff_file in files)
+            print(f"🧹 Нормализация diff: -{stats.tokens_saved:,} токенов")
+            for line in stats.format_lines():
+                print(f"   • {line}")
+            print(f"📏 Размер после нормализации: {size:,} байт")
+        return prefix, files
+    
+    def memory_report(self) -> str:
+        """Пиковая память процесса (и лимит, если он задан)"""
+        if self.memory_budget is not None:
+            return self.memory_budget.report()
+        peak = peak_rss()
+        return f"пиковая память {format_size(peak)}" if peak is not None else "неизвестно"
+    
+    def _update_importance(self, branch: str, base_branch: Optional[str] = None):
+        """Дописывает в индекс важности новые коммиты базовой ветки (до merge-base)"""
+        indexed = self.importance_index.update(self.git_helper.get_merge_base(branch,
+                                                                              base_branch))
+        if indexed:
+            print(f"🗂️  Индекс важности файлов: +{indexed:,} коммитов")
+    
+    def _file_importance(self, branch: str, base_branch: Optional[str],
+                         files: List[DiffFile]) -> Optional[Dict[str, float]]:
+        """Важность файлов diff'а по индексу (None, если индекс не удалось прочитать)"""
+        if self.importance_index is None:
+            return {}
+        try:
+            self._update_importance(branch, base_branch)
+            return self.importance_index.scores([diff_file.path for diff_file in files])
+        except Exception as e:
+            # Без индекса файлы упаковываются в порядке категорий и git
+            print(f"⚠️  Индекс важности файлов недоступен: {e}")
+            return None
+    
+    def _build_symbol_digest(self, branch: str, base_branch: Optional[str] = None,
+                             language: str = 'ru') -> str:
+        """Строит сводку измененных функций и классов с заголовком на языке промпта"""
+        changes = self.git_helper.get_raw_changes(branch, base_branch, **self.diff_options)
+        lines = self.symbol_digest.build(changes)
+        if not lines:
+            return ""
+        print(f"🧩 Сводка символов: {sum(1 for line in lines if line.startswith('  '))} изменений")
+        title = DIFF_LABELS.get(language, DIFF_LABELS['ru'])['symbols_title']
+        return "\n".join([title, ""] + lines) + "\n\n"
+    
+    def _measure_git_steps(self, branch: str, base_branch: Optional[str],
+                           stats: NormalizationStats):
+        """Замеряет экономию от параметров git diff, добавляя их по одному"""
+        applied = {}
+        size = len(self.git_helper.get_diff_bytes(branch, base_branch))
+        for option in self.GIT_DIFF_OPTIONS:
+            value = self.diff_options.get(option)
+            if value is None or value is False:
+                continue
+            applied[option] = value
+            new_size = len(self.git_helper.get_diff_bytes(branch, base_branch, **applied))
+            stats.record(option, size, new_size)
+            size = new_size
+    
+    def _smart_truncate_diff(self, files: List[DiffFile], max_size: int = 50000,
+                             prefix: str = "", original_size: Optional[int] = None,
+                             importance: Optional[Dict[str, float]] = None) -> str:
+        """
+        Умно упаковывает diff в бюджет, начиная с самых важных файлов
+        
+        Внутри категории файлы идут по убыванию importance (индекс важности),
+        а самые важные получают до двух долей бюджета на файл.
+        """
+        
+        diff_size = len(prefix) + sum(diff_file.size for diff_file in files)
+        if diff_size <= max_size:
+            return prefix + render_diff(files)
+        
+        # Классифицируем каждый файл один раз
+        categories = [classify_path(diff_file.path) for diff_file in files]
+        category_counts = Counter(categories)
+        
+        # Сводка перемещений и повторов занимает не больше половины бюджета
+        if len(prefix) > max_size // 2:
+            prefix = prefix[:max_size // 2] + "\n...\n\n"
+        budget = max_size - len(prefix)
+        file_budget = max(max_size // 4, 1000)
+        
+        # Сначала код, затем конфиги, тесты, CI, документация; внутри категории - по важности
+        importance = importance or {}
+        top_importance = max(importance.values(), default=0.0)
+        order = sorted(range(len(files)), key=lambda i: (
+            CATEGORY_PRIORITY[categories[i]], -importance.get(files[i].path, 0.0)))
+        
+        important_lines = []
+        skipped = []
+        for i in order:
+            diff_file = files[i]
+            if categories[i] == GENERATED or budget <= 0:
+                skipped.append(diff_file.path)
+                continue
+            limit = file_budget
+            if top_importance > 0:
+                limit = int(file_budget * (1 + importance.get(diff_file.path, 0.0) / top_importance))
+            lines = self._fit_file(diff_file, min(budget, limit))
+            if not lines:
+                skipped.append(diff_file.path)
+                continue
+            important_lines.extend(lines)
+            budget -= sum(len(line) + 1 for line in lines)
+        
+        files_shown = len(files) - len(skipped)
+        categories_text = ", ".join(
+            f"{category}: {count}" for category, count in sorted(
+                category_counts.items(), key=lambda item: CATEGORY_PRIORITY[item[0]])
+        )
         
         # Создаем итоговый diff
         result_lines = [
             f"=== УМНОЕ РЕЗЮМЕ DIFF'А ===",
-            f"Оригинальный размер: {len(diff_content):,} символов",
-            f"Файлов изменено: {stats['files_changed']:,}",
-            f"Добавлено строк: {stats['additions']:,}",
-            f"Удалено строк: {stats['deletions']:,}",
-            f"Показаны первые {min(files_shown, max_files_to_show)} файлов из {stats['files_changed']}",
+            f"Оригинальный размер: {original_size or diff_size:,} байт",
+            f"Файлов изменено: {len(files):,} ({categories_text})",
+            f"Добавлено строк: {sum(f.additions for f in files):,}",
+            f"Удалено строк: {sum(f.deletions for f in files):,}",
+            f"Показаны {files_shown} файлов из {len(files)} в порядке важности",
             "",
-            "=== КЛЮЧЕВЫЕ ИЗМЕНЕНИЯ ===",
-            ""
         ]
-        
+        if prefix:
+            result_lines.append(prefix.rstrip("\n"))
+            result_lines.append("")
+        result_lines.extend(["=== КЛЮЧЕВЫЕ ИЗМЕНЕНИЯ ===", ""])
         result_lines.extend(important_lines)
         
-        if stats['files_changed'] > max_files_to_show:
+        if skipped:
             result_lines.extend([
                 "",
-                f"... и еще {stats['files_changed'] - max_files_to_show} файлов не показаны для экономии места",
+                f"... и еще {len(skipped)} файлов не показаны для экономии места: "
+                f"{summarize_paths(skipped)}",
                 "",
                 "[АВТОМАТИЧЕСКИ СОКРАЩЕНО ДЛЯ ОБРАБОТКИ ИИ]"
             ])
         
         return '\n'.join(result_lines)
     
+    @staticmethod
+    def _fit_file(diff_file: DiffFile, limit: int) -> List[str]:
+        """Берет заголовок файла и столько строк hunk'ов, сколько помещается в лимит"""
+        lines = diff_file.render_header_lines()
+        size = sum(len(line) + 1 for line in lines)
+        if size > limit:
+            return []
+        
+        # Декодируются только hunk'и, которые попадают в промпт
+        for number, hunk in enumerate(diff_file.hunks):
+            for line in diff_file.render_hunk_lines(hunk):
+                if size + len(line) + 1 > limit:
+                    rest = len(diff_file.hunks) - number
+                    lines.append(f"... (файл сокращен, не показано hunk'ов: {rest})")
+                    return lines
+                lines.append(line)
+                size += len(line) + 1
+        return lines
+    
     def save_description(self, description: str, output_file: Optional[str] = None):
         """Сохраняет описание в файл"""
         if output_file:
@@ -229,8 +815,89 @@ class MRDescriptionGenerator:
             print("="*50)
 
 
+# Команды CLI и те из них, которым нужен провайдер
+COMMANDS = ('generate', 'precompute', 'install-hooks', 'watch', 'batch')
+PROVIDER_COMMANDS = ('generate', 'watch', 'batch')
+
+
+def _env_prefix(provider_name: str) -> str:
+    """Префикс переменных окружения провайдера: corp-llm -> CORP_LLM"""
+    return provider_name.upper().replace('-', '_').replace('.', '_')
+
+
+def _provider_env_options(provider_name: str) -> dict:
+    """
+    Параметры провайдера из переменных окружения
+    
+    <PROVIDER>_BASE_URL и <PROVIDER>_MODEL - адрес и модель,
+    <PROVIDER>_RPM и <PROVIDER>_TPM - лимиты запросов и токенов в минуту.
+    """
+    options = {}
+    names = {
+        'base_url': 'BASE_URL',
+        'model': 'MODEL',
+        'requests_per_minute': 'RPM',
+        'tokens_per_minute': 'TPM',
+    }
+    for key, suffix in names.items():
+        value = os.getenv(f"{_env_prefix(provider_name)}_{suffix}")
+        if value:
+            options[key] = float(value) if suffix in ('RPM', 'TPM') else value
+    return options
+
+
+def _forwarded_diff_args(args: argparse.Namespace) -> List[str]:
+    """Аргументы diff'а, которые hook передает в precompute (ключ кэша должен совпасть)"""
+    forwarded = []
+    flags = {
+        'ignore_whitespace': '--ignore-whitespace',
+        'ignore_blank_lines': '--ignore-blank-lines',
+        'drop_comment_hunks': '--drop-comment-hunks',
+        'symbols': '--symbols',
+        'no_dedup': '--no-dedup',
+        'no_importance_index': '--no-importance-index',
+    }
+    for name, flag in flags.items():
+        if getattr(args, name):
+            forwarded.append(flag)
+    options = {
+        'base_branch': '--base-branch',
+        'context_lines': '--context-lines',
+        'rename_similarity': '--rename-similarity',
+        'find_copies': '--find-copies',
+        'fallback_encoding': '--fallback-encoding',
+        'cache_dir': '--cache-dir',
+    }
+    for name, option in options.items():
+        value = getattr(args, name)
+        if value is not None:
+            forwarded.extend([option, str(value)])
+    for item in args.file_encoding:
+        forwarded.extend(['--file-encoding', item])
+    # Подписи разделов сводки diff'а зависят от языка промпта
+    if args.language != 'ru':
+        forwarded.extend(['--language', args.language])
+    return forwarded
+
+
+def install_precompute_hooks(generator: MRDescriptionGenerator, args: argparse.Namespace):
+    """Устанавливает hook'и, которые в фоне запускают precompute для текущей ветки"""
+    if generator.git_helper.cache is None:
+        raise Exception("Кэш diff'ов выключен: hook'и для предварительного расчета бесполезны")
+    
+    command = [sys.executable, '-m', 'mr_generator.cli', 'precompute',
+               '--repo-path', os.path.abspath(args.repo_path)] + _forwarded_diff_args(args)
+    # Пакет должен импортироваться и без установки (запуск из исходников)
+    env = {'PYTHONPATH': str(current_dir.parent)}
+    
+    for path in install_hooks(generator.git_helper.get_hooks_dir(), command, env):
+        print(f"🪝 Установлен hook: {path}")
+    print("✅ После commit и перед push diff будет готовиться в фоне")
+
+
 def main():
     """Основная функция CLI"""
+    registry = get_provider_registry()
     parser = argparse.ArgumentParser(
         description="Генератор описаний Merge Request на основе git diff",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -255,29 +922,177 @@ def main():
   # Подробное описание на английском
   python mr_generator.py --provider gigachat --repo-path /path/to/your/repo --api-key YOUR_KEY --language en --prompt-type detailed
 
+  # Hook'и post-commit/pre-push, заранее готовящие diff в фоне
+  python mr_generator.py install-hooks --repo-path /path/to/your/repo
+
+  # Подготовить diff текущей ветки вручную (без запроса к модели)
+  python mr_generator.py precompute --repo-path /path/to/your/repo
+
+  # Локальный сервер llama.cpp или vLLM с OpenAI-совместимым API (без ключа)
+  python mr_generator.py --provider local --base-url http://gpu-box:8000/v1 --model qwen2.5-coder --repo-path /path/to/your/repo
+
+  # GigaChat, а при ошибке или без ответа 5 секунд - DeepSeek; не дольше 30 секунд всего
+  python mr_generator.py --provider gigachat --fallback-providers deepseek --race-mode staggered --hedge-delay 5 --latency-budget 30 --repo-path /path/to/your/repo
+
+  # Описания для стека веток: каждая ветка сравнивается с предыдущей
+  python mr_generator.py batch --provider deepseek --branches feature-1,feature-2,feature-3 --repo-path /path/to/your/repo --output description.md
+
+  # CI или bare/mirror клон: два коммита без checkout'а (или --from-ci-env)
+  python mr_generator.py --provider deepseek --repo-path /srv/mirrors/repo.git --base-sha 1a2b3c4 --head-sha 5d6e7f8
+
+  # Обновлять описание в файле после каждого нового коммита
+  python mr_generator.py watch --provider deepseek --repo-path /path/to/your/repo --output description.md
+
 Переменные окружения:
   GIGACHAT_API_KEY  - API ключ для GigaChat
   DEEPSEEK_API_KEY  - API ключ для DeepSeek
+  LOCAL_API_KEY     - API ключ локального сервера (если он его требует)
+  LOCAL_BASE_URL    - адрес локального сервера, LOCAL_MODEL - модель
         """
     )
     
+    parser.add_argument(
+        'command',
+        nargs='?',
+        choices=COMMANDS,
+        default='generate',
+        help='generate - сгенерировать описание (по умолчанию), '
+             'precompute - заранее подготовить diff в кэше, '
+             'install-hooks - установить git hook\'и для фоновой подготовки, '
+             'watch - обновлять описание при новых коммитах в ветке, '
+             'batch - описания для нескольких веток (стеков веток) из --branches'
+    )
+    
     parser.add_argument(
         '--branch', '-b',
         help='Название ветки (по умолчанию текущая ветка)',
         default=None
     )
     
+    parser.add_argument(
+        '--branches',
+        default=None,
+        help='Команда batch: ветки через запятую, например "feature-1,feature-2,feature-3"; '
+             'ветки стека сравниваются с предыдущей веткой стека'
+    )
+    
     parser.add_argument(
         '--base-branch',
         help='Базовая ветка для сравнения (определяется автоматически)',
         default=None
     )
     
+    parser.add_argument(
+        '--base-sha',
+        default=None,
+        help='SHA базового коммита MR: сравнение по коммитам без рабочей копии '
+             '(CI, bare и mirror клоны), базовая ветка не определяется'
+    )
+    
+    parser.add_argument(
+        '--head-sha',
+        default=None,
+        help='SHA последнего коммита MR (вместе с --base-sha); '
+             'имя ветки для промпта - из --branch'
+    )
+    
+    parser.add_argument(
+        '--from-ci-env',
+        action='store_true',
+        help='Взять SHA коммитов MR из переменных окружения CI (GitLab CI, GitHub Actions, '
+             'Bitbucket Pipelines или MR_GENERATOR_BASE_SHA / MR_GENERATOR_HEAD_SHA)'
+    )
+    
     parser.add_argument(
         '--provider', '-p',
-        choices=['gigachat', 'deepseek'],
-        required=True,
-        help='Провайдер языковой модели'
+        choices=registry.names(),
+        help='Провайдер языковой модели (обязателен для generate); '
+             'local - свой сервер с OpenAI-совместимым API; другие провайдеры '
+             'подключаются пакетами через entry points "mr_generator.providers"'
+    )
+    
+    parser.add_argument(
+        '--fallback-providers',
+        default=None,
+        metavar='NAMES',
+        help='Резервные провайдеры через запятую, например "deepseek,local"; '
+             'ключи и адреса берутся из переменных окружения <PROVIDER>_*'
+    )
+    
+    parser.add_argument(
+        '--race-mode',
+        choices=FallbackProvider.RACE_MODES,
+        default='fallback',
+        help='Запуск резервных провайдеров: fallback - при ошибке, staggered - при ошибке '
+             'или после --hedge-delay без ответа, parallel - сразу все (по умолчанию fallback)'
+    )
+    
+    parser.add_argument(
+        '--hedge-delay',
+        type=float,
+        default=3.0,
+        metavar='SECONDS',
+        help='Режим staggered: через сколько секунд без ответа запускать следующего провайдера'
+    )
+    
+    parser.add_argument(
+        '--latency-budget',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Общее время ожидания ответа от провайдеров (по умолчанию без ограничения)'
+    )
+    
+    parser.add_argument(
+        '--base-url',
+        default=None,
+        help='Адрес API провайдера (можно задать переменной окружения <PROVIDER>_BASE_URL)'
+    )
+    
+    parser.add_argument(
+        '--model',
+        default=None,
+        help='Название модели (можно задать переменной окружения <PROVIDER>_MODEL)'
+    )
+    
+    parser.add_argument(
+        '--rpm',
+        type=float,
+        default=None,
+        help='Лимит запросов в минуту на API ключ для всех процессов на машине '
+             '(по умолчанию <PROVIDER>_RPM)'
+    )
+    
+    parser.add_argument(
+        '--tpm',
+        type=float,
+        default=None,
+        help='Лимит токенов в минуту на API ключ (по умолчанию <PROVIDER>_TPM)'
+    )
+    
+    parser.add_argument(
+        '--no-circuit-breaker',
+        action='store_true',
+        help='Не пропускать запросы к endpoint\'у после серии его ошибок'
+    )
+    
+    parser.add_argument(
+        '--auth-header',
+        default=None,
+        help='Провайдер local: заголовок для API ключа (по умолчанию Authorization: Bearer)'
+    )
+    
+    parser.add_argument(
+        '--auth-scheme',
+        default=None,
+        help='Провайдер local: схема перед API ключом в заголовке (по умолчанию Bearer, '
+             'с --auth-header - без схемы)'
+    )
+    
+    parser.add_argument(
+        '--no-stream',
+        action='store_true',
+        help='Провайдер local: получать ответ целиком, без потоковой передачи'
     )
     
     parser.add_argument(
@@ -320,8 +1135,16 @@ def main():
     parser.add_argument(
         '--max-tokens',
         type=int,
-        default=1000,
-        help='Максимальное количество токенов в ответе'
+        default=None,
+        help=f'Максимальное количество токенов в ответе (по умолчанию 1000, '
+             f'с --all-formats {STRUCTURED_MAX_TOKENS})'
+    )
+    
+    parser.add_argument(
+        '--all-formats',
+        action='store_true',
+        help='Один запрос к модели для всех форматов (basic, detailed, concise) '
+             'на обоих языках; варианты собираются локально'
     )
     
     parser.add_argument(
@@ -330,75 +1153,417 @@ def main():
         help='Путь к Git репозиторию'
     )
     
+    parser.add_argument(
+        '--ignore-whitespace',
+        action='store_true',
+        help='Игнорировать изменения только в пробелах (git diff -w)'
+    )
+    
+    parser.add_argument(
+        '--ignore-blank-lines',
+        action='store_true',
+        help='Игнорировать добавление и удаление пустых строк'
+    )
+    
+    parser.add_argument(
+        '--context-lines',
+        type=int,
+        default=None,
+        help='Количество строк контекста вокруг изменений (git diff -U)'
+    )
+    
+    parser.add_argument(
+        '--rename-similarity',
+        type=int,
+        default=None,
+        help='Порог сходства для поиска переименований в процентах (0 - отключить)'
+    )
+    
+    parser.add_argument(
+        '--find-copies',
+        type=int,
+        default=None,
+        metavar='SIMILARITY',
+        help='Искать копии файлов с указанным порогом сходства в процентах'
+    )
+    
+    parser.add_argument(
+        '--fallback-encoding',
+        default=None,
+        help='Кодировка для файлов не в UTF-8 (по умолчанию cp1251)'
+    )
+    
+    parser.add_argument(
+        '--file-encoding',
+        action='append',
+        default=[],
+        metavar='PATTERN=ENCODING',
+        help='Явная кодировка для файлов по шаблону пути, например "legacy/*.pas=cp866"'
+    )
+    
+    parser.add_argument(
+        '--drop-comment-hunks',
+        action='store_true',
+        help='Исключить hunk\'и, в которых изменены только комментарии'
+    )
+    
+    parser.add_argument(
+        '--symbols',
+        action='store_true',
+        help='Добавить сводку измененных функций и классов (Python)'
+    )
+    
+    parser.add_argument(
+        '--no-dedup',
+        action='store_true',
+        help='Не схлопывать одинаковые правки в разных файлах'
+    )
+    
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='Количество процессов для обработки больших diff\'ов (по умолчанию по числу ядер)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Не использовать кэш diff\'ов на диске'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help='Каталог кэша diff\'ов (по умолчанию .git/mr-generator/cache)'
+    )
+    
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=2.0,
+        metavar='SECONDS',
+        help='Режим watch: как часто проверять ветку, в секундах (по умолчанию 2)'
+    )
+    
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=5.0,
+        metavar='SECONDS',
+        help='Режим watch: сколько ветка должна не меняться перед пересчетом (по умолчанию 5)'
+    )
+    
+    parser.add_argument(
+        '--no-importance-index',
+        action='store_true',
+        help='Не упорядочивать файлы большого diff\'а по истории изменений и импортам'
+    )
+    
+    parser.add_argument(
+        '--commit-log-tokens',
+        type=int,
+        default=None,
+        metavar='TOKENS',
+        help='Бюджет токенов на список коммитов после сжатия (0 - без ограничения, '
+             'по умолчанию 500)'
+    )
+    
+    parser.add_argument(
+        '--max-memory',
+        default=None,
+        metavar='SIZE',
+        help='Лимит памяти, например 1.5G или 512M: diff пишется во временный файл '
+             '(каталог TMPDIR) и обрабатывается без загрузки в память целиком'
+    )
+    
+    parser.add_argument(
+        '--diff-stats',
+        action='store_true',
+        help='Показать экономию токенов по каждому шагу нормализации diff'
+    )
+    
     parser.add_argument(
         '--dry-run',
         action='store_true',
-        help='Режим тестирования без реальных API запросов'
+        help='Режим тестирования без реальных API запросов: размер промпта, токены и время этапов'
+    )
+    
+    parser.add_argument(
+        '--dump-prompt',
+        metavar='FILE',
+        default=None,
+        help='В режиме --dry-run сохранить промпт в файл ("-" - вывести в консоль)'
     )
     
     args = parser.parse_args()
+    if args.command in PROVIDER_COMMANDS and not args.provider:
+        parser.error(f"для команды {args.command} требуется аргумент --provider/-p")
+    if args.command == 'batch' and not args.branches:
+        parser.error("для команды batch требуется аргумент --branches")
+    if args.command == 'batch' and args.all_formats:
+        parser.error("команда batch не поддерживает --all-formats")
+    explicit_revisions = args.base_sha or args.head_sha or args.from_ci_env
+    if explicit_revisions and args.command not in ('generate', 'precompute'):
+        parser.error(f"команда {args.command} не поддерживает --base-sha/--head-sha/--from-ci-env")
+    if explicit_revisions and args.base_branch:
+        parser.error("--base-branch нельзя указывать вместе с --base-sha/--head-sha/--from-ci-env")
+    if bool(args.base_sha) != bool(args.head_sha) and not args.from_ci_env:
+        parser.error("--base-sha и --head-sha указываются вместе")
     
     try:
         # Получаем API ключ
         api_key = args.api_key
-        if not api_key:
-            env_key = f"{args.provider.upper()}_API_KEY"
+        if not api_key and args.command in PROVIDER_COMMANDS:
+            env_key = f"{_env_prefix(args.provider)}_API_KEY"
             api_key = os.getenv(env_key)
-            if not api_key:
+            if (not api_key and not args.dry_run
+                    and registry.requires_api_key(args.provider)):
                 print(f"❌ Ошибка: API ключ не найден. "
                       f"Укажите --api-key или установите переменную окружения {env_key}")
                 sys.exit(1)
         
+        # Параметры получения и нормализации diff
+        diff_options = {}
+        if args.ignore_whitespace:
+            diff_options['ignore_whitespace'] = True
+        if args.ignore_blank_lines:
+            diff_options['ignore_blank_lines'] = True
+        if args.context_lines is not None:
+            diff_options['context_lines'] = args.context_lines
+        if args.rename_similarity is not None:
+            diff_options['find_renames'] = args.rename_similarity
+        if args.find_copies is not None:
+            diff_options['find_copies'] = args.find_copies
+        if args.drop_comment_hunks:
+            diff_options['drop_comment_hunks'] = True
+        if args.no_dedup:
+            diff_options['dedup_hunks'] = False
+        if args.symbols:
+            diff_options['symbols'] = True
+        if args.fallback_encoding:
+            diff_options['fallback_encoding'] = args.fallback_encoding
+        if args.jobs is not None:
+            diff_options['jobs'] = args.jobs
+        if args.file_encoding:
+            diff_options['file_encodings'] = dict(
+                item.split('=', 1) for item in args.file_encoding if '=' in item
+            )
+        
+        # Параметры кэша diff'ов
+        cache_options = {}
+        if args.no_cache:
+            cache_options['enabled'] = False
+        if args.cache_dir:
+            cache_options['dir'] = args.cache_dir
+        
+        # Параметры индекса важности файлов
+        importance_options = {}
+        if args.no_importance_index:
+            importance_options['enabled'] = False
+        
+        # Лимит памяти запуска
+        memory_options = {}
+        if args.max_memory:
+            memory_options['max_memory'] = parse_size(args.max_memory)
+        
+        # Параметры circuit breaker'а провайдеров
+        health_options = {}
+        if args.no_circuit_breaker:
+            health_options['enabled'] = False
+        
         # Создаем генератор
-        generator = MRDescriptionGenerator(args.repo_path)
+        generator = MRDescriptionGenerator(args.repo_path, diff_options=diff_options,
+                                           diff_stats=args.diff_stats,
+                                           cache_options=cache_options,
+                                           health_options=health_options,
+                                           importance_options=importance_options,
+                                           memory_options=memory_options)
+        
+        if args.commit_log_tokens is not None:
+            generator.commit_log_tokens = args.commit_log_tokens
         
         # Определяем ветку
         branch = args.branch
-        if not branch:
+        base_branch = args.base_branch
+        branch_name = None
+        if explicit_revisions:
+            # Явные SHA коммитов: рабочая копия и поиск базовой ветки не нужны
+            revisions = read_ci_revisions() if args.from_ci_env else None
+            if args.base_sha and args.head_sha:
+                revisions = Revisions(args.base_sha, args.head_sha)
+            elif revisions is None:
+                raise ValueError("SHA коммитов MR не найдены в переменных окружения CI: "
+                                 "задайте MR_GENERATOR_BASE_SHA и MR_GENERATOR_HEAD_SHA "
+                                 "или --base-sha и --head-sha")
+            elif args.base_sha or args.head_sha:
+                revisions = revisions._replace(base=args.base_sha or revisions.base,
+                                               head=args.head_sha or revisions.head)
+            base_branch, branch = generator.git_helper.resolve_commits(revisions.base,
+                                                                       revisions.head)
+            branch_name = args.branch or revisions.branch or branch[:12]
+            print(f"🔖 Коммиты ({revisions.source}): {base_branch[:12]}..{branch[:12]}")
+        elif not branch and args.command != 'batch':
             branch = generator.git_helper.get_current_branch()
             print(f"🌿 Используем текущую ветку: {branch}")
         
+        if args.command == 'install-hooks':
+            install_precompute_hooks(generator, args)
+            return
+        
+        if args.command == 'precompute':
+            # Запускается из hook'а: расчеты одного репозитория идут по очереди
+            with precompute_lock(os.path.join(generator.git_helper.get_git_common_dir(),
+                                              'mr-generator')):
+                print(f"🧮 Подготовка diff'а для ветки '{branch}'...")
+                generator.precompute(branch, base_branch, args.language)
+            print("✅ Diff подготовлен и сохранен в кэше")
+            return
+        
         # Подготавливаем параметры
         kwargs = {
             'language': args.language,
-            'prompt_type': args.prompt_type,
+            'prompt_type': 'structured' if args.all_formats else args.prompt_type,
             'include_technical': not args.no_technical,
             'temperature': args.temperature,
-            'max_tokens': args.max_tokens
+            'max_tokens': args.max_tokens or (STRUCTURED_MAX_TOKENS if args.all_formats
+                                              else 1000)
         }
+        # Адрес и модель: из аргументов или из <PROVIDER>_BASE_URL / <PROVIDER>_MODEL
+        if args.provider:
+            kwargs.update(_provider_env_options(args.provider))
+            if args.base_url:
+                kwargs['base_url'] = args.base_url
+            if args.model:
+                kwargs['model'] = args.model
+            if args.rpm:
+                kwargs['requests_per_minute'] = args.rpm
+            if args.tpm:
+                kwargs['tokens_per_minute'] = args.tpm
+        if args.auth_header:
+            kwargs['auth_header'] = args.auth_header
+            # Нестандартный заголовок (например, X-API-Key) - по умолчанию ключ без схемы
+            kwargs['auth_scheme'] = ''
+        if args.auth_scheme is not None:
+            kwargs['auth_scheme'] = args.auth_scheme
+        if args.no_stream:
+            kwargs['stream'] = False
+        if branch_name:
+            kwargs['branch_name'] = branch_name
+        
+        # Резервные провайдеры: ключи, адреса и модели только из окружения
+        if args.fallback_providers and args.command in PROVIDER_COMMANDS:
+            for name in filter(None, (item.strip() for item in args.fallback_providers.split(','))):
+                if name not in registry:
+                    raise ValueError(f"Неподдерживаемый резервный провайдер: {name}")
+                fallback_key = os.getenv(f"{_env_prefix(name)}_API_KEY") or ''
+                if (not fallback_key and not args.dry_run
+                        and registry.requires_api_key(name)):
+                    raise ValueError(f"API ключ резервного провайдера {name} не найден: "
+                                     f"установите переменную окружения {_env_prefix(name)}_API_KEY")
+                generator.fallback_providers.append(
+                    (name, fallback_key, _provider_env_options(name)))
+            generator.race_options = {
+                'race_mode': args.race_mode,
+                'hedge_delay': args.hedge_delay,
+                'latency_budget': args.latency_budget,
+            }
+        
+        if args.command == 'batch':
+            branches = [item.strip() for item in args.branches.split(',') if item.strip()]
+            if args.dry_run:
+                print("🧪 Режим тестирования (dry-run): запрос к модели не отправляется")
+                parents = {}
+                for batch_branch, parent in generator.plan_stack(branches, args.base_branch):
+                    parents[batch_branch] = parent
+                    ancestors = [(name, '') for name in stack_ancestors(parent, parents)]
+                    print(f"\n🌿 Ветка '{batch_branch}'")
+                    _, prompt = generator.prepare_prompt(
+                        batch_branch, args.provider, api_key or '', parent or args.base_branch,
+                        stack_context=stack_context(ancestors), **kwargs)
+                    print(f"📊 Размер промпта: {len(prompt):,} символов "
+                          f"(~{estimate_tokens(len(prompt)):,} токенов)")
+                print("\n✅ Dry-run завершен успешно!")
+                return
+            
+            descriptions = generator.generate_batch(branches, args.provider, api_key,
+                                                    args.base_branch, **kwargs)
+            generator.save_batch(descriptions, args.output)
+            print(f"✅ Готово! Описаний: {len(descriptions)}")
+            return
+        
+        if args.command == 'watch':
+            def refresh(head: str):
+                if args.dry_run:
+                    _, prompt = generator.prepare_prompt(branch, args.provider, api_key or '',
+                                                         args.base_branch, **kwargs)
+                    print(f"📊 Размер промпта: {len(prompt):,} символов "
+                          f"(~{estimate_tokens(len(prompt)):,} токенов)")
+                elif args.all_formats:
+                    data, variants = generator.generate_all_formats(
+                        branch, args.provider, api_key, args.base_branch, **kwargs)
+                    generator.save_all_formats(data, variants, args.output)
+                else:
+                    description = generator.generate_description(
+                        branch, args.provider, api_key, args.base_branch, **kwargs)
+                    generator.save_description(description, args.output)
+                print(f"⏱️  Пересчет для {head[:12]}: {generator.timer.total * 1000:,.0f} мс")
+            
+            print(f"👀 Режим наблюдения за веткой '{branch}'")
+            try:
+                generator.watch(branch, refresh, interval=args.watch_interval,
+                                debounce=args.debounce)
+            except KeyboardInterrupt:
+                print("\n👋 Наблюдение остановлено")
+            return
         
         # Проверяем dry-run режим
         if args.dry_run:
-            print("🧪 Режим тестирования (dry-run)")
+            print("🧪 Режим тестирования (dry-run): запрос к модели не отправляется")
             print("=" * 50)
             
-            # Показываем информацию о том, что будет отправлено
-            base_branch = args.base_branch or generator.git_helper.get_base_branch(branch)
-            diff_content = generator.git_helper.get_diff(branch, base_branch)
+            # Весь путь до HTTP запроса: diff, упаковка, метаданные, промпт
+            provider, prompt = generator.prepare_prompt(
+                branch=branch,
+                provider_name=args.provider,
+                api_key=api_key or '',
+                base_branch=base_branch,
+                **kwargs
+            )
             
-            print(f"📊 Ветка: {branch}")
-            print(f"📊 Базовая ветка: {base_branch}")
-            print(f"📊 Провайдер: {args.provider}")
+            print("=" * 50)
+            print(f"📊 Ветка: {branch_name or branch}")
+            print(f"📊 Провайдер: {args.provider} ({provider.get_model_name()})")
             print(f"📊 Язык: {args.language}")
-            print(f"📊 Тип промпта: {args.prompt_type}")
-            print(f"📊 Размер diff: {len(diff_content)} символов")
+            if args.all_formats:
+                print(f"📊 Тип промпта: structured (форматы {', '.join(PROMPT_TYPES)} "
+                      f"на языках {', '.join(LANGUAGES)} из одного ответа)")
+            else:
+                print(f"📊 Тип промпта: {args.prompt_type}")
+            print(f"📊 Размер промпта: {len(prompt):,} символов "
+                  f"({len(prompt.encode('utf-8')):,} байт)")
+            print(f"📊 Оценка токенов промпта: ~{estimate_tokens(len(prompt)):,}")
             print(f"📊 Параметры: {kwargs}")
+            print("⏱️  Время этапов:")
+            for line in generator.timer.format_lines():
+                print(f"   • {line}")
+            print(f"🧠 Память: {generator.memory_report()}")
             
-            if diff_content.strip():
-                print("\n📋 Первые 500 символов diff:")
+            if args.dump_prompt == '-':
+                print("\n📋 Промпт:")
                 print("-" * 50)
-                print(diff_content[:500])
-                if len(diff_content) > 500:
-                    print("...")
+                print(prompt)
                 print("-" * 50)
-                
-                # Симулируем ответ
-                mock_description = f"""## Сводка
-Тестовое описание MR для ветки {branch}
+            elif args.dump_prompt:
+                Path(args.dump_prompt).write_text(prompt, encoding='utf-8')
+                print(f"💾 Промпт сохранен в: {args.dump_prompt}")
+            
+            # Симулируем ответ
+            mock_description = f"""## Сводка
+Тестовое описание MR для ветки {branch_name or branch}
 
 ## Изменения  
-- Обнаружены изменения в {len(diff_content)} символов
-- Базовая ветка: {base_branch}
+- Размер промпта: {len(prompt)} символов (~{estimate_tokens(len(prompt))} токенов)
 - Провайдер: {args.provider}
 
 ## Технические заметки
@@ -406,12 +1571,21 @@ def main():
 Для получения реального описания запустите без флага --dry-run.
 
 *Параметры генерации: {kwargs}*"""
-                
-                generator.save_description(mock_description, args.output)
-                print("\n✅ Dry-run завершен успешно!")
-            else:
-                print("⚠️  Изменения между ветками не найдены")
             
+            generator.save_description(mock_description, args.output)
+            print("\n✅ Dry-run завершен успешно!")
+            return
+        
+        if args.all_formats:
+            data, variants = generator.generate_all_formats(
+                branch=branch,
+                provider_name=args.provider,
+                api_key=api_key,
+                base_branch=base_branch,
+                **kwargs
+            )
+            generator.save_all_formats(data, variants, args.output)
+            print(f"✅ Готово! Вариантов описания: {len(variants)} за один запрос")
             return
         
         # Генерируем описание
@@ -419,13 +1593,15 @@ def main():
             branch=branch,
             provider_name=args.provider,
             api_key=api_key,
-            base_branch=args.base_branch,
+            base_branch=base_branch,
             **kwargs
         )
         
         # Сохраняем результат
         generator.save_description(description, args.output)
         
+        if generator.memory_budget is not None:
+            print(f"🧠 Память: {generator.memory_report()}")
         print("✅ Готово!")
         
     except Exception as e:
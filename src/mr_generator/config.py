@@ -16,6 +16,17 @@ DEFAULT_CONFIGS = {
         "base_url": "https://api.deepseek.com/v1",
         "max_tokens": 1000,
     },
+    # Локальный сервер с OpenAI-совместимым API (llama.cpp, vLLM); ключ не обязателен
+    "local": {
+        "model": "local-model",
+        "temperature": 0.7,
+        "base_url": "http://localhost:8080/v1",
+        "max_tokens": 1000,
+        "auth_header": "Authorization",
+        "auth_scheme": "Bearer",
+        "stream": True,
+        "timeout": 300,
+    },
 }
 
 # Шаблоны промптов
@@ -30,6 +41,8 @@ PROMPT_TEMPLATES = {
 - "вероятно"
 - "судя по всему"
 
+Тип MR: {mr_type}
+
 Diff для ветки '{branch_name}':
 ```
 {diff_content}
@@ -57,6 +70,8 @@ BANNED PHRASES:
 - "this suggests"
 - "based on the changes"
 
+MR type: {mr_type}
+
 Diff for branch '{branch_name}':
 ```
 {diff_content}
@@ -77,7 +92,7 @@ STRICT FORMAT:
 
     "detailed_ru": """ЗАДАЧА: Создать описание MR для '{branch_name}' по ТОЧНОМУ шаблону.
 
-КОНТЕКСТ: {repo_name}, файлов: {changed_files_count}, коммитов: {commits_count}
+КОНТЕКСТ: {repo_name}, тип MR: {mr_type}, файлов: {changed_files_count}, коммитов: {commits_count}
 
 DIFF:
 ```
@@ -155,7 +170,7 @@ DIFF:
 
     "detailed_en": """TASK: Create MR description for '{branch_name}' following EXACT template.
 
-CONTEXT: {repo_name}, files: {changed_files_count}, commits: {commits_count}
+CONTEXT: {repo_name}, MR type: {mr_type}, files: {changed_files_count}, commits: {commits_count}
 
 DIFF:
 ```
@@ -239,6 +254,8 @@ Protect API endpoints from unauthorized access
 - Максимум 5 слов на пункт
 - Начинать с действия (добавлен, удален, изменен)
 
+ТИП MR: {mr_type}
+
 DIFF:
 ```
 {diff_content}
@@ -280,6 +297,8 @@ RULES:
 - Maximum 5 words per bullet
 - Start with action (added, removed, changed)
 
+MR TYPE: {mr_type}
+
 DIFF:
 ```
 {diff_content}
@@ -312,11 +331,161 @@ Simplify authentication system
 • `models.py` - added User class
 • `auth.py` - removed old_auth
 • `settings.json` - updated config""",
+
+    # Один запрос для всех форматов и языков: ответ - JSON, варианты собираются локально
+    "structured": """ЗАДАЧА: Описать MR для ветки '{branch_name}' в виде JSON на русском и английском.
+
+КОНТЕКСТ: {repo_name}, тип MR: {mr_type}, файлов: {changed_files_count}, коммитов: {commits_count}
+
+DIFF:
+```
+{diff_content}
+```
+
+ПРАВИЛА:
+- Только факты из diff, без вводных и общих фраз
+- Каждый текст - объект {{"ru": "...", "en": "..."}} с одинаковым смыслом
+- highlights - до 5 пунктов, не больше 5 слов, начинаются с действия
+- Пустой раздел - пустой список
+- Ответ - ТОЛЬКО JSON, без пояснений и без блока ```
+
+ФОРМАТ ОТВЕТА:
+{{
+  "summary": {{"ru": "одно предложение: что сделано", "en": "one sentence: what was done"}},
+  "highlights": [{{"ru": "Добавлен класс User", "en": "Added User class"}}],
+  "changes": {{
+    "code": [{{"ru": "конкретная функция/класс/метод", "en": "specific function/class/method"}}],
+    "config": [{{"ru": "файл конфига и что изменено", "en": "config file and what changed"}}],
+    "tests": [{{"ru": "тест и что проверяет", "en": "test and what it checks"}}]
+  }},
+  "purpose": {{"ru": "конкретная техническая цель", "en": "concrete technical goal"}},
+  "technical": [{{"ru": "технология/алгоритм/подход", "en": "technology/algorithm/approach"}}],
+  "files": [{{"path": "точное/имя/файла.py", "change": {{"ru": "что изменено", "en": "what changed"}}}}]
+}}""",
+}
+
+# Подписи разделов, которые нормализация diff'а добавляет в промпт, по языку промпта
+DIFF_LABELS = {
+    "ru": {
+        "clusters_title": "=== ПОВТОРЯЮЩИЕСЯ ИЗМЕНЕНИЯ ===",
+        "rest_title": "=== ОСТАЛЬНЫЕ ИЗМЕНЕНИЯ ===",
+        "cluster": "# Одинаковое изменение: {hunks:,} hunk'ов в {files:,} файлах (пример: {path})",
+        "cluster_files": "# Файлы: {paths}",
+        "more_directories": "и еще {count} директорий",
+        "moves_title": "=== ПЕРЕМЕЩЕННЫЕ ФАЙЛЫ ===",
+        "rename": "перемещен",
+        "copy": "скопирован",
+        "moved_files": "файлов: {count:,}",
+        "symbols_title": "=== ИЗМЕНЕННЫЕ СИМВОЛЫ ===",
+    },
+    "en": {
+        "clusters_title": "=== REPEATED CHANGES ===",
+        "rest_title": "=== OTHER CHANGES ===",
+        "cluster": "# Same change: {hunks:,} hunks in {files:,} files (example: {path})",
+        "cluster_files": "# Files: {paths}",
+        "more_directories": "and {count} more directories",
+        "moves_title": "=== MOVED FILES ===",
+        "rename": "moved",
+        "copy": "copied",
+        "moved_files": "files: {count:,}",
+        "symbols_title": "=== CHANGED SYMBOLS ===",
+    },
 }
 
+# Ответ structured содержит оба языка и все разделы: нужен больший лимит токенов
+STRUCTURED_MAX_TOKENS = 3000
+
 # Ограничения размера diff для отправки в API
 MAX_DIFF_SIZE = 50000  # символов
 
+# Среднее количество символов на токен для грубой оценки размера промпта
+CHARS_PER_TOKEN = 4
+
+# Бюджет токенов на сжатый список коммитов (merge убраны, повторы сгруппированы)
+COMMIT_LOG_MAX_TOKENS = 500
+
+# Параметры получения и нормализации diff
+DIFF_OPTIONS = {
+    "ignore_whitespace": False,  # git diff -w
+    "ignore_blank_lines": False,  # git diff --ignore-blank-lines
+    "context_lines": None,  # git diff -U<n>, None - значение git по умолчанию
+    "find_renames": 50,  # git diff -M<n>%, порог сходства для переименований
+    "find_copies": None,  # git diff -C<n>%, порог сходства для копий
+    "drop_blank_hunks": True,  # выбрасывать hunk'и только из пустых строк
+    "drop_comment_hunks": False,  # выбрасывать hunk'и только из комментариев
+    "minify": True,  # убирать строки index и хвостовые пробелы
+    "dedup_hunks": True,  # схлопывать одинаковые правки в разных файлах
+    "dedup_min_files": 3,  # минимальное число файлов с одинаковой правкой
+    "symbols": False,  # сводка измененных функций и классов по AST
+    "fallback_encoding": "cp1251",  # кодировка для файлов, которые не в UTF-8
+    "file_encodings": {},  # явные кодировки по шаблонам путей: {"legacy/*": "cp866"}
+    "jobs": None,  # процессов для обработки больших diff'ов, None - по числу ядер
+    "parallel_min_files": 2000,  # измененных файлов, с которых git diff делится на части
+    "parallel_min_size": 16 * 1024 * 1024,  # размер diff'а, с которого включается пул
+}
+
+# Кэш diff'ов и метаданных на диске
+CACHE_CONFIG = {
+    "enabled": True,
+    "dir": None,  # None - <git common dir>/mr-generator/cache
+    "max_size": 512 * 1024 * 1024,  # байт на диске, старые записи вытесняются
+}
+
+# Лимит памяти запуска: diff пишется во временный файл и отображается в память
+MEMORY_CONFIG = {
+    "max_memory": None,  # байт, None - без ограничения (diff целиком в памяти)
+    "spool_dir": None,  # None - системный каталог временных файлов (TMPDIR)
+}
+
+# Circuit breaker для endpoint'ов провайдеров (общее состояние процессов в файле)
+HEALTH_CONFIG = {
+    "enabled": True,
+    "state_file": None,  # None - ~/.cache/mr-generator/health.json
+    "failure_threshold": 5,  # ошибок подряд до размыкания цепи
+    "open_seconds": 60.0,  # ожидание до пробного запроса, удваивается после неудачных проб
+    "max_open_seconds": 900.0,
+    "ewma_alpha": 0.3,  # вес нового запроса в сглаженных доле ошибок и задержке
+}
+
+# Индекс важности файлов для упаковки больших diff'ов (<git common dir>/mr-generator)
+IMPORTANCE_CONFIG = {
+    "enabled": True,
+    "half_life_days": 90.0,  # через сколько дней вес изменения файла падает вдвое
+    "max_commits": 10000,  # коммитов истории при первом построении индекса
+}
+
+# Ограничение частоты запросов на API ключ, общее для процессов на машине.
+# Лимиты задаются для провайдера: <PROVIDER>_RPM и <PROVIDER>_TPM или --rpm / --tpm
+RATE_LIMIT_CONFIG = {
+    "state_file": None,  # None - ~/.cache/mr-generator/rate_limits.json
+    "max_wait": 300.0,  # секунд ожидания лимита, дольше - ошибка
+}
+
+# Переменные окружения CI с SHA коммитов MR (--from-ci-env). Источники проверяются
+# по порядку, для каждого поля берется первая непустая переменная. GitHub Actions
+# не передает SHA в переменных: они читаются из файла события GITHUB_EVENT_PATH
+CI_REVISION_VARIABLES = [
+    {
+        "source": "MR_GENERATOR",
+        "base": ["MR_GENERATOR_BASE_SHA"],
+        "head": ["MR_GENERATOR_HEAD_SHA"],
+        "branch": ["MR_GENERATOR_BRANCH"],
+    },
+    {
+        "source": "GitLab CI",
+        "base": ["CI_MERGE_REQUEST_DIFF_BASE_SHA"],
+        # В merged results pipeline CI_COMMIT_SHA - коммит слияния, а не ветки
+        "head": ["CI_MERGE_REQUEST_SOURCE_BRANCH_SHA", "CI_COMMIT_SHA"],
+        "branch": ["CI_MERGE_REQUEST_SOURCE_BRANCH_NAME", "CI_COMMIT_REF_NAME"],
+    },
+    {
+        "source": "Bitbucket Pipelines",
+        "base": ["BITBUCKET_PR_DESTINATION_COMMIT"],
+        "head": ["BITBUCKET_COMMIT"],
+        "branch": ["BITBUCKET_BRANCH"],
+    },
+]
+
 # Файлы которые нужно исключить из анализа
 EXCLUDE_FILES = [
     "*.lock",
@@ -341,7 +510,7 @@ class Config:
     @staticmethod
     def get_provider_config(provider_name):
         """Получить конфигурацию для провайдера"""
-        return DEFAULT_CONFIGS.get(provider_name, {})
+        return dict(DEFAULT_CONFIGS.get(provider_name, {}))
 
     @staticmethod
     def get_prompt_template(template_name):
@@ -353,6 +522,44 @@ class Config:
         """Получить максимальный размер diff"""
         return MAX_DIFF_SIZE
 
+    @staticmethod
+    def get_commit_log_tokens():
+        """Получить бюджет токенов на список коммитов"""
+        return COMMIT_LOG_MAX_TOKENS
+
+    @staticmethod
+    def get_diff_options():
+        """Получить параметры получения и нормализации diff"""
+        options = dict(DIFF_OPTIONS)
+        # Вложенный словарь копируется, чтобы правки не меняли значения по умолчанию
+        options["file_encodings"] = dict(DIFF_OPTIONS["file_encodings"])
+        return options
+
+    @staticmethod
+    def get_cache_config():
+        """Получить параметры кэша diff'ов"""
+        return dict(CACHE_CONFIG)
+
+    @staticmethod
+    def get_memory_config():
+        """Получить параметры лимита памяти"""
+        return dict(MEMORY_CONFIG)
+
+    @staticmethod
+    def get_health_config():
+        """Получить параметры circuit breaker'а провайдеров"""
+        return dict(HEALTH_CONFIG)
+
+    @staticmethod
+    def get_importance_config():
+        """Получить параметры индекса важности файлов"""
+        return dict(IMPORTANCE_CONFIG)
+
+    @staticmethod
+    def get_rate_limit_config():
+        """Получить параметры ограничения частоты запросов"""
+        return dict(RATE_LIMIT_CONFIG)
+
     @staticmethod
     def get_exclude_files():
         """Получить список исключаемых файлов"""
@@ -3,17 +3,32 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+from .prompt_builder import get_prompt_builder
+
+
+class Prompt(str):
+    """
+    Текст промпта вместе с исходным запросом (diff, ветка, параметры)
+
+    Запрос нужен провайдерам под прежний контракт, которые реализуют только
+    generate_description и сами строят промпт из diff'а.
+    """
+
+    request: Optional[Tuple[str, str, Dict[str, Any]]] = None
 
 
 class LLMProvider(ABC):
     """Абстрактный класс для провайдеров языковых моделей"""
 
+    # False - ключ не обязателен (например, сервер в локальной сети)
+    REQUIRES_API_KEY = True
+
     def __init__(self, api_key: str, **kwargs):
         self.api_key = api_key
         self.config = kwargs
 
-    @abstractmethod
     def generate_description(
         self, diff_content: str, branch_name: str, **kwargs
     ) -> str:
@@ -28,7 +43,48 @@ class LLMProvider(ABC):
         Returns:
             Сгенерированное описание MR
         """
-        pass
+        return self.complete(self.build_prompt(diff_content, branch_name, **kwargs), **kwargs)
+
+    def build_prompt(self, diff_content: str, branch_name: str, **kwargs) -> str:
+        """
+        Собирает промпт без обращения к API
+
+        Args:
+            diff_content: Содержимое git diff
+            branch_name: Название ветки
+            **kwargs: Дополнительные параметры
+
+        Returns:
+            Текст промпта, который будет отправлен в модель
+        """
+        prompt = Prompt(self._build_prompt(diff_content, branch_name, **kwargs))
+        prompt.request = (diff_content, branch_name, dict(kwargs))
+        return prompt
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        """
+        Отправляет готовый промпт в модель
+
+        Провайдер под прежний контракт (переопределен только generate_description)
+        получает исходный запрос, из которого был собран промпт.
+
+        Args:
+            prompt: Текст промпта
+            **kwargs: Дополнительные параметры (max_tokens)
+
+        Returns:
+            Ответ модели
+        """
+        request = getattr(prompt, "request", None)
+        if is_legacy_provider(type(self)) and request is not None:
+            diff_content, branch_name, options = request
+            return self.generate_description(diff_content, branch_name,
+                                             **{**options, **kwargs})
+        raise NotImplementedError(f"{type(self).__name__} не реализует complete")
+
+    def _build_prompt(self, diff_content: str, branch_name: str, **kwargs) -> str:
+        """Строит промпт по общим шаблонам из config"""
+        return get_prompt_builder().build(diff_content, branch_name, **kwargs)
 
     @abstractmethod
     def get_model_name(self) -> str:
@@ -38,3 +94,18 @@ class LLMProvider(ABC):
     def validate_api_key(self) -> bool:
         """Проверяет валидность API ключа"""
         return bool(self.api_key)
+
+
+def is_legacy_provider(provider_class: type) -> bool:
+    """Провайдер реализует только generate_description (прежний контракт)"""
+    return (
+        provider_class.complete is LLMProvider.complete
+        and provider_class.generate_description is not LLMProvider.generate_description
+    )
+
+
+def implements_complete(provider_class: type) -> bool:
+    """Провайдер умеет отвечать на промпт: complete или прежний generate_description"""
+    return provider_class.complete is not LLMProvider.complete or is_legacy_provider(
+        provider_class
+    )
@@ -0,0 +1,98 @@
+"""
+Сжатие списка коммитов ветки до бюджета токенов
+
+Длинные ветки содержат тысячи коммитов, большая часть которых - merge,
+"fix", "wip" и повторы. Сжатие убирает merge-коммиты, объединяет почти
+одинаковые сообщения в группы с количеством и оставляет самые
+содержательные сообщения в пределах бюджета.
+"""
+
+import re
+from typing import Dict, List, NamedTuple
+
+from .tokens import estimate_tokens
+
+_MERGE_RE = re.compile(
+    r"^(?:Merge (?:branch|remote-tracking branch|pull request|tag|commit)\b|"
+    r"Merge '[^']*' into\b|Merged? in\b)"
+)
+# Conventional commits: type(scope)!: описание
+_CONVENTIONAL_RE = re.compile(r"^([a-z]+)(\([^)]*\))?!?:\s*", re.IGNORECASE)
+# fixup!/squash! повторяют сообщение исходного коммита
+_AUTOSQUASH_RE = re.compile(r"^(?:fixup|squash|amend)!\s*", re.IGNORECASE)
+# Сообщения без содержания: уходят в конец при нехватке бюджета
+_NOISE_RE = re.compile(
+    r"^(?:wip|fix(?:es|ed)?|fixup|tmp|temp|typo|minor|update|cleanup|review|"
+    r"tests?|lint|format|style|\W*|правки|исправления|фикс)\W*$",
+    re.IGNORECASE,
+)
+# Номера задач, хэши и числа не различают сообщения по смыслу
+_VARIABLE_RE = re.compile(r"\b(?:[A-Z][A-Z0-9]+-\d+|[0-9a-f]{7,40}|\d+)\b")
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+class CompactLog(NamedTuple):
+    """Результат сжатия: строки для контекста и статистика"""
+
+    lines: List[str]
+    total: int
+    merges: int
+    omitted: int
+
+
+def _cluster_key(subject: str) -> str:
+    """Ключ группы: сообщение без чисел, номеров задач и знаков препинания"""
+    subject = _AUTOSQUASH_RE.sub("", subject)
+    return _NON_WORD_RE.sub(" ", _VARIABLE_RE.sub("#", subject)).strip().lower()
+
+
+def compact_commit_log(messages: List[str], max_tokens: int = 500) -> CompactLog:
+    """
+    Сжимает сообщения коммитов (в порядке git log, новые первыми)
+
+    Args:
+        messages: Заголовки коммитов
+        max_tokens: Бюджет токенов на весь список (0 - без ограничения)
+
+    Returns:
+        CompactLog: строки "сообщение (×N)" в исходном порядке первых вхождений
+    """
+    merges = 0
+    clusters: Dict[str, List] = {}
+    for subject in messages:
+        subject = subject.strip()
+        if not subject:
+            continue
+        if _MERGE_RE.match(subject):
+            merges += 1
+            continue
+        key = _cluster_key(subject)
+        if key in clusters:
+            clusters[key][1] += 1
+        else:
+            # Представитель группы - самый свежий коммит; fixup! без префикса
+            clusters[key] = [_AUTOSQUASH_RE.sub("", subject), 1, len(clusters)]
+
+    def priority(cluster: List) -> tuple:
+        subject, count, order = cluster
+        # Сначала conventional commits, затем остальные, "wip"/"fix" - последними
+        rank = 2 if _NOISE_RE.match(subject) else 0 if _CONVENTIONAL_RE.match(subject) else 1
+        return rank, -count, order
+
+    selected = []
+    used = 0
+    for cluster in sorted(clusters.values(), key=priority):
+        subject, count, _ = cluster
+        line = f"{subject} (×{count})" if count > 1 else subject
+        cost = estimate_tokens(len(line) + 1)
+        if max_tokens and used + cost > max_tokens:
+            continue
+        selected.append(cluster)
+        used += cost
+
+    selected.sort(key=lambda cluster: cluster[2])
+    lines = [f"{subject} (×{count})" if count > 1 else subject for subject, count, _ in selected]
+    omitted = sum(count for _, count, _ in clusters.values()) - sum(
+        count for _, count, _ in selected
+    )
+    return CompactLog(lines, len(messages), merges, omitted)
@@ -0,0 +1,174 @@
+"""
+Кэш diff'ов и метаданных на диске
+
+Записи адресуются содержимым: ключ строится из SHA коммитов и параметров
+git, поэтому при сдвиге ветки или базы старые записи просто перестают
+использоваться и со временем вытесняются.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from typing import Any, BinaryIO, Callable, Iterable, Optional
+
+# Уровень сжатия: diff'ы хорошо сжимаются уже на быстрых уровнях
+COMPRESSION_LEVEL = 3
+
+# Размер блока при потоковом чтении и записи записей
+CHUNK_SIZE = 1024 * 1024
+
+# До какой доли max_size вытеснение освобождает кэш: запас, чтобы следующие
+# записи не запускали обход директории сразу снова
+EVICT_TARGET = 0.9
+
+
+class DiffCache:
+    """Сжатый кэш с вытеснением давно не использованных записей по общему размеру"""
+
+    def __init__(self, directory: str, max_size: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        # Оценка общего размера записей: директория обходится при первой записи
+        # и при превышении max_size, а не на каждую запись
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def make_key(namespace: str, parts: Iterable[Any]) -> str:
+        """Ключ записи: пространство имен и хэш частей ключа"""
+        digest = hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8"))
+        return f"{namespace}-{digest.hexdigest()}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".z")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Возвращает данные записи или None, если ее нет или она повреждена"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+        try:
+            # Время доступа - для вытеснения давно не использованных записей
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Сохраняет запись атомарно и вытесняет старые записи при переполнении"""
+        self._store(key, lambda f: f.write(zlib.compress(data, COMPRESSION_LEVEL)))
+
+    def _store(self, key: str, write: Callable[[BinaryIO], Any]):
+        """Пишет запись во временный файл и переносит его на место записи"""
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                size = f.tell()
+            path = self._path(key)
+            try:
+                size -= os.stat(path).st_size
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            tmp_path = None
+        except OSError as e:
+            # Кэш не должен ломать генерацию описания
+            print(f"⚠️  Не удалось сохранить кэш diff: {e}")
+            return
+        finally:
+            # Недописанный файл не должен оставаться в директории кэша
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_size:
+            self._evict()
+
+    def get_stream(self, key: str, target: BinaryIO) -> bool:
+        """
+        Распаковывает запись в файл target блоками, не загружая ее в память
+
+        Returns:
+            True, если запись найдена; при повреждении target может быть заполнен частично
+        """
+        path = self._path(key)
+        decompressor = zlib.decompressobj()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    target.write(decompressor.decompress(chunk))
+            target.write(decompressor.flush())
+        except (OSError, zlib.error):
+            return False
+        if not decompressor.eof:
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def put_stream(self, key: str, source: BinaryIO):
+        """Сохраняет содержимое файла source, сжимая его блоками"""
+
+        def write(f: BinaryIO):
+            compressor = zlib.compressobj(COMPRESSION_LEVEL)
+            source.seek(0)
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                f.write(compressor.compress(chunk))
+            f.write(compressor.flush())
+
+        self._store(key, write)
+
+    def get_json(self, key: str) -> Any:
+        data = self.get(key)
+        return None if data is None else json.loads(data.decode("utf-8"))
+
+    def put_json(self, key: str, value: Any):
+        self.put(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def _evict(self):
+        """
+        Пересчитывает размер кэша и, если он больше max_size, удаляет самые
+        давно использованные записи до EVICT_TARGET от max_size
+        """
+        try:
+            entries = [
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(".z")
+            ]
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_size:
+            for _, size, path in sorted(entries):
+                if total <= self.max_size * EVICT_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+        self._size = total
+
+    def clear(self):
+        """Удаляет все записи кэша"""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".z"):
+                os.remove(entry.path)
+        self._size = 0
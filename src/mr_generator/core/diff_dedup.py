@@ -0,0 +1,160 @@
+"""
+Схлопывание одинаковых и механических hunk'ов (массовые переименования, автозамены)
+"""
+
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from ..config import DIFF_LABELS
+from .diff_model import DiffFile, Hunk
+
+_TOKEN_RE = re.compile(rb"\w+|[^\w\s]")
+_NUMBER_RE = re.compile(rb"^\d+$")
+
+
+def fingerprint_hunk(hunk: Hunk) -> Optional[str]:
+    """
+    Строит отпечаток правки в hunk'е
+
+    Отпечаток - это множество токенов, которые исчезли, и множество токенов,
+    которые появились. Контекст и положение правки в него не входят, поэтому
+    замена old_name на new_name дает одинаковый отпечаток в любом файле.
+    Числа маскируются, чтобы номера строк и версии не разбивали кластеры.
+
+    Returns:
+        Хэш отпечатка или None, если правка не меняет набор токенов
+    """
+    removed: Counter = Counter()
+    added: Counter = Counter()
+    for line in hunk.changed_lines:
+        target = added if line[:1] == b"+" else removed
+        for token in _TOKEN_RE.findall(line[1:]):
+            target[b"0" if _NUMBER_RE.match(token) else token] += 1
+
+    gone = sorted((removed - added).keys())
+    new = sorted((added - removed).keys())
+    if not gone and not new:
+        return None
+    digest = hashlib.sha1()
+    digest.update(b"\0".join(gone))
+    digest.update(b"\1")
+    digest.update(b"\0".join(new))
+    return digest.hexdigest()
+
+
+class HunkCluster:
+    """Группа одинаковых правок в разных файлах"""
+
+    def __init__(self, diff_file: DiffFile, hunk: Hunk):
+        self.diff_file = diff_file
+        self.path = diff_file.path
+        self.hunk = hunk
+        self.paths: List[str] = []
+        self.hunks_count = 0
+
+    def render_lines(self, max_listed_files: int = 20, language: str = "ru") -> List[str]:
+        labels = DIFF_LABELS.get(language, DIFF_LABELS["ru"])
+        lines = [
+            labels["cluster"].format(hunks=self.hunks_count, files=len(self.paths),
+                                     path=self.path)
+        ]
+        lines.extend(self.diff_file.render_hunk_lines(self.hunk))
+        lines.append(labels["cluster_files"].format(
+            paths=summarize_paths(self.paths, max_listed_files, language)))
+        return lines
+
+
+def summarize_paths(paths: List[str], limit: int = 20, language: str = "ru") -> str:
+    """Короткий список путей: сами пути или, если их много, директории со счетчиками"""
+    if len(paths) <= limit:
+        return ", ".join(paths)
+
+    directories = Counter(
+        path.rsplit("/", 1)[0] + "/" if "/" in path else "./" for path in paths
+    )
+    shown = directories.most_common(limit)
+    parts = [f"{directory} ({count})" for directory, count in shown]
+    rest = len(directories) - len(shown)
+    if rest > 0:
+        labels = DIFF_LABELS.get(language, DIFF_LABELS["ru"])
+        parts.append(labels["more_directories"].format(count=rest))
+    return ", ".join(parts)
+
+
+class HunkDeduplicator:
+    """Оставляет по одному представителю для повторяющихся правок"""
+
+    def __init__(self, min_files: int = 3, max_listed_files: int = 20, language: str = "ru"):
+        self.min_files = min_files
+        self.max_listed_files = max_listed_files
+        # Язык подписей раздела: тот же, что у промпта
+        self.language = language
+
+    def deduplicate(
+        self,
+        files: List[DiffFile],
+        fingerprints: Optional[Dict[int, Optional[str]]] = None,
+    ) -> Tuple[List[DiffFile], List[HunkCluster]]:
+        """
+        Выносит повторяющиеся правки в кластеры
+
+        Args:
+            files: Разобранный diff
+            fingerprints: Уже посчитанные отпечатки по смещению начала hunk'а
+
+        Returns:
+            Файлы без повторяющихся hunk'ов и список кластеров
+        """
+        by_file: List[List[Optional[str]]] = []
+        files_per_fingerprint: Counter = Counter()
+        for diff_file in files:
+            if fingerprints is None:
+                file_fingerprints = [fingerprint_hunk(hunk) for hunk in diff_file.hunks]
+            else:
+                file_fingerprints = [
+                    fingerprints.get(hunk.start) for hunk in diff_file.hunks
+                ]
+            by_file.append(file_fingerprints)
+            files_per_fingerprint.update(set(filter(None, file_fingerprints)))
+
+        clustered = {
+            fingerprint
+            for fingerprint, count in files_per_fingerprint.items()
+            if count >= self.min_files
+        }
+        if not clustered:
+            return files, []
+
+        clusters: Dict[str, HunkCluster] = {}
+        result = []
+        for diff_file, file_fingerprints in zip(files, by_file):
+            kept = []
+            for hunk, fingerprint in zip(diff_file.hunks, file_fingerprints):
+                if fingerprint not in clustered:
+                    kept.append(hunk)
+                    continue
+                cluster = clusters.get(fingerprint)
+                if cluster is None:
+                    cluster = clusters[fingerprint] = HunkCluster(diff_file, hunk)
+                if not cluster.paths or cluster.paths[-1] != diff_file.path:
+                    cluster.paths.append(diff_file.path)
+                cluster.hunks_count += 1
+
+            if kept or not diff_file.hunks:
+                diff_file.hunks = kept
+                result.append(diff_file)
+        return result, list(clusters.values())
+
+    def render_clusters(self, clusters: List[HunkCluster]) -> str:
+        """Текст раздела с повторяющимися изменениями"""
+        if not clusters:
+            return ""
+        labels = DIFF_LABELS.get(self.language, DIFF_LABELS["ru"])
+        lines = [labels["clusters_title"], ""]
+        for cluster in sorted(clusters, key=lambda c: -len(c.paths)):
+            lines.extend(cluster.render_lines(self.max_listed_files, self.language))
+            lines.append("")
+        lines.extend([labels["rest_title"], ""])
+        return "\n".join(lines) + "\n"
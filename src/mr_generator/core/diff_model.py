@@ -0,0 +1,373 @@
+"""
+Модель git diff: файлы и hunk'и
+
+Весь diff хранится одним буфером байтов, а файлы и hunk'и - это смещения
+в нем (объекты со __slots__). Строки не копируются в отдельные объекты
+до тех пор, пока их не нужно проверить или вывести. Декодирование в str
+происходит только при сборке текста промпта, поэтому файлы не в UTF-8
+не ломают обработку, а его стоимость пропорциональна размеру промпта.
+"""
+
+import codecs
+import fnmatch
+from typing import Dict, Iterator, List, Optional
+
+# Размер блока при проверке, декодируется ли секция файла как UTF-8
+DETECT_CHUNK_SIZE = 1024 * 1024
+
+
+def _unquote_path(path: bytes) -> str:
+    """Убирает кавычки git (с octal-экранированием) и префикс a/ или b/"""
+    if path[-1:] == b"\t":
+        # git дописывает табуляцию в ---/+++, если в имени файла есть пробел
+        path = path[:-1]
+    if len(path) >= 2 and path[:1] == b'"' and path[-1:] == b'"':
+        path = codecs.escape_decode(path[1:-1])[0]
+    if path[:2] in (b"a/", b"b/"):
+        path = path[2:]
+    return path.decode("utf-8", errors="replace")
+
+
+def _count(buffer, needle: bytes, start: int, end: int) -> int:
+    """Количество вхождений needle в диапазоне буфера"""
+    count_method = getattr(buffer, "count", None)
+    if count_method is not None:
+        return count_method(needle, start, end)
+    count = 0
+    position = buffer.find(needle, start, end)
+    while position != -1:
+        count += 1
+        position = buffer.find(needle, position + len(needle), end)
+    return count
+
+
+def _iter_lines(buffer, start: int, end: int) -> Iterator[bytes]:
+    """Строки диапазона [start, end) буфера без переводов строк"""
+    while start < end:
+        newline = buffer.find(b"\n", start, end)
+        if newline == -1:
+            newline = end
+        yield buffer[start:newline]
+        start = newline + 1
+
+
+class Hunk:
+    """
+    Один hunk diff'а: заголовок @@ и строки изменений
+
+    Хранит только смещения в общем буфере: [start, body) - заголовок,
+    [body, end) - строки hunk'а вместе с завершающими переводами строк.
+    """
+
+    __slots__ = ("buffer", "start", "body", "end")
+
+    def __init__(self, buffer, start: int, body: int, end: int):
+        self.buffer = buffer
+        self.start = start
+        self.body = body
+        self.end = end
+
+    @property
+    def header(self) -> bytes:
+        return self.buffer[self.start : self.body].rstrip(b"\n")
+
+    def iter_lines(self) -> Iterator[bytes]:
+        return _iter_lines(self.buffer, self.body, self.end)
+
+    @property
+    def changed_lines(self) -> Iterator[bytes]:
+        """Добавленные и удаленные строки hunk'а"""
+        return (line for line in self.iter_lines() if line[:1] in (b"+", b"-"))
+
+    @property
+    def additions(self) -> int:
+        return _count(self.buffer, b"\n+", self.body - 1, self.end)
+
+    @property
+    def deletions(self) -> int:
+        return _count(self.buffer, b"\n-", self.body - 1, self.end)
+
+    @property
+    def size(self) -> int:
+        """Размер hunk'а в байтах вместе с переводами строк"""
+        return self.end - self.start
+
+    @property
+    def minified_size(self) -> int:
+        """Размер hunk'а без хвостовых пробелов в строках"""
+        return (self.body - self.start) + sum(
+            len(line.rstrip()) + 1 for line in self.iter_lines()
+        )
+
+    def raw(self) -> memoryview:
+        """Срез буфера с hunk'ом без копирования"""
+        return memoryview(self.buffer)[self.start : self.end]
+
+
+class DiffFile:
+    """
+    Изменения одного файла: заголовок diff --git и список hunk'ов
+
+    Заголовок занимает диапазон [start, header_end) общего буфера,
+    вся секция файла - [start, end).
+    """
+
+    __slots__ = (
+        "buffer",
+        "start",
+        "header_end",
+        "end",
+        "hunks",
+        "old_path",
+        "path",
+        "status",
+        "similarity",
+        "encoding",
+        "fallback_encoding",
+        "minify",
+    )
+
+    def __init__(
+        self,
+        buffer,
+        start: int,
+        header_end: int,
+        end: int,
+        hunks: Optional[List[Hunk]] = None,
+        encoding: Optional[str] = None,
+        fallback_encoding: str = "cp1251",
+    ):
+        self.buffer = buffer
+        self.start = start
+        self.header_end = header_end
+        self.end = end
+        self.hunks = hunks if hunks is not None else []
+        self.encoding = encoding
+        self.fallback_encoding = fallback_encoding
+        # Убирать строки index и хвостовые пробелы при выводе
+        self.minify = False
+
+        header_lines = list(_iter_lines(buffer, start, header_end))
+        self.old_path, self.path = self._parse_paths(header_lines)
+        self.status, self.similarity = self._parse_status(header_lines)
+
+    @staticmethod
+    def _parse_paths(header_lines: List[bytes]):
+        """Определяет старый и новый путь файла по заголовку"""
+        old_path = new_path = None
+        for line in header_lines:
+            if line.startswith(b"--- "):
+                old_path = None if line[4:] == b"/dev/null" else _unquote_path(line[4:])
+            elif line.startswith(b"+++ "):
+                new_path = None if line[4:] == b"/dev/null" else _unquote_path(line[4:])
+            elif line.startswith(b"rename from ") or line.startswith(b"copy from "):
+                old_path = _unquote_path(line.split(b" from ", 1)[1])
+            elif line.startswith(b"rename to ") or line.startswith(b"copy to "):
+                new_path = _unquote_path(line.split(b" to ", 1)[1])
+
+        if old_path is None and new_path is None and header_lines:
+            # Бинарные файлы и смена режима: путь есть только в diff --git
+            first = header_lines[0][len(b"diff --git ") :]
+            if b" b/" in first:
+                old, new = first.split(b" b/", 1)
+                old_path, new_path = _unquote_path(old), _unquote_path(new)
+        return old_path or new_path or "", new_path or old_path or ""
+
+    @staticmethod
+    def _parse_status(header_lines: List[bytes]):
+        """Определяет переименование/копирование и процент сходства"""
+        status = None
+        similarity = None
+        for line in header_lines:
+            if line.startswith(b"rename from "):
+                status = "rename"
+            elif line.startswith(b"copy from "):
+                status = "copy"
+            elif line.startswith(b"similarity index "):
+                similarity = int(line[len(b"similarity index ") :].rstrip(b"%"))
+        return status, similarity
+
+    @property
+    def header_lines(self) -> List[bytes]:
+        """Строки заголовка с учетом минификации"""
+        lines = _iter_lines(self.buffer, self.start, self.header_end)
+        if self.minify:
+            return [line for line in lines if not line.startswith(b"index ")]
+        return list(lines)
+
+    @property
+    def is_pure_move(self) -> bool:
+        """Файл переименован или скопирован без изменения содержимого"""
+        # У измененного бинарного файла тоже нет hunk'ов, но сходство меньше 100%
+        return self.status is not None and self.similarity == 100 and not self.hunks
+
+    @property
+    def extension(self) -> str:
+        name = self.path.rsplit("/", 1)[-1]
+        return "." + name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+    @property
+    def additions(self) -> int:
+        return sum(hunk.additions for hunk in self.hunks)
+
+    @property
+    def deletions(self) -> int:
+        return sum(hunk.deletions for hunk in self.hunks)
+
+    @property
+    def size(self) -> int:
+        """Размер секции файла в байтах вместе с переводами строк"""
+        if not self.minify:
+            return (self.header_end - self.start) + sum(
+                hunk.size for hunk in self.hunks
+            )
+        return sum(len(line) + 1 for line in self.header_lines) + sum(
+            hunk.minified_size for hunk in self.hunks
+        )
+
+    def raw(self) -> memoryview:
+        """Срез буфера с исходной секцией файла без копирования"""
+        return memoryview(self.buffer)[self.start : self.end]
+
+    def _detect_encoding(self) -> str:
+        """
+        Кодировка всей секции файла: UTF-8, если она целиком декодируется, иначе запасная
+
+        Секция проверяется блоками, чтобы не копировать большой файл целиком.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            for position in range(self.start, self.end, DETECT_CHUNK_SIZE):
+                decoder.decode(self.buffer[position : min(position + DETECT_CHUNK_SIZE,
+                                                          self.end)])
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return self.fallback_encoding
+        return "utf-8"
+
+    def decode(self, data: bytes) -> str:
+        """
+        Декодирует фрагмент файла
+
+        Если кодировка файла не задана явно, она определяется один раз по всей
+        секции файла (UTF-8 или запасная), чтобы все фрагменты файла декодировались
+        одинаково. Непредставимые байты заменяются, а не роняют обработку.
+        """
+        if not self.encoding:
+            self.encoding = self._detect_encoding()
+        return data.decode(self.encoding, errors="replace")
+
+    def render_header_lines(self) -> List[str]:
+        return [self.decode(line) for line in self.header_lines]
+
+    def render_hunk_lines(self, hunk: Hunk) -> List[str]:
+        lines = [self.decode(hunk.header)]
+        if self.minify:
+            lines.extend(self.decode(line.rstrip()) for line in hunk.iter_lines())
+        elif hunk.body < hunk.end:
+            # Тело hunk'а декодируется одним куском
+            body = self.decode(self.buffer[hunk.body : hunk.end])
+            lines.extend(body[:-1].split("\n") if body.endswith("\n") else body.split("\n"))
+        return lines
+
+    def render_lines(self) -> List[str]:
+        lines = self.render_header_lines()
+        for hunk in self.hunks:
+            lines.extend(self.render_hunk_lines(hunk))
+        return lines
+
+
+def _resolve_encoding(path: str, file_encodings: Dict[str, str]) -> Optional[str]:
+    """Находит явно заданную кодировку файла по шаблону пути"""
+    for pattern, encoding in file_encodings.items():
+        if fnmatch.fnmatch(path, pattern):
+            return encoding
+    return None
+
+
+def make_file(
+    buffer,
+    start: int,
+    header_end: int,
+    end: int,
+    hunks: List[Hunk],
+    fallback_encoding: str = "cp1251",
+    file_encodings: Optional[Dict[str, str]] = None,
+) -> DiffFile:
+    """Создает файл diff'а по смещениям в буфере с учетом кодировок по шаблонам"""
+    diff_file = DiffFile(
+        buffer, start, header_end, end, hunks, fallback_encoding=fallback_encoding
+    )
+    if file_encodings:
+        diff_file.encoding = _resolve_encoding(diff_file.path, file_encodings)
+    return diff_file
+
+
+def _parse_hunks(buffer, start: int, end: int) -> List[Hunk]:
+    """Находит hunk'и в диапазоне [start, end), начинающемся с @@"""
+    hunks = []
+    while start < end:
+        body = buffer.find(b"\n", start, end)
+        body = end if body == -1 else body + 1
+        next_hunk = buffer.find(b"\n@@", body - 1, end)
+        hunk_end = end if next_hunk == -1 else next_hunk + 1
+        hunks.append(Hunk(buffer, start, body, hunk_end))
+        start = hunk_end
+    return hunks
+
+
+def parse_diff(
+    diff_content,
+    fallback_encoding: str = "cp1251",
+    file_encodings: Optional[Dict[str, str]] = None,
+) -> List[DiffFile]:
+    """
+    Разбирает git diff на файлы и hunk'и без копирования и декодирования строк
+
+    Args:
+        diff_content: Вывод git diff в байтах (или другой буфер с find/срезами)
+        fallback_encoding: Кодировка для файлов, которые не декодируются как UTF-8
+        file_encodings: Явные кодировки по шаблонам путей (fnmatch)
+
+    Returns:
+        Список файлов diff'а, ссылающихся на общий буфер
+    """
+    buffer = diff_content
+    size = len(buffer)
+    files: List[DiffFile] = []
+
+    if buffer[:11] == b"diff --git ":
+        start = 0
+    else:
+        start = buffer.find(b"\ndiff --git ")
+        start = -1 if start == -1 else start + 1
+
+    while start != -1 and start < size:
+        next_file = buffer.find(b"\ndiff --git ", start)
+        end = size if next_file == -1 else next_file + 1
+
+        # Секция всегда начинается с "diff --git", поэтому hunk ищется после перевода строки
+        first_hunk = buffer.find(b"\n@@", start, end)
+        header_end = end if first_hunk == -1 else first_hunk + 1
+
+        files.append(
+            make_file(
+                buffer,
+                start,
+                header_end,
+                end,
+                _parse_hunks(buffer, header_end, end),
+                fallback_encoding,
+                file_encodings,
+            )
+        )
+        start = -1 if next_file == -1 else end
+    return files
+
+
+def render_diff(files: List[DiffFile]) -> str:
+    """Собирает текст diff из файлов"""
+    lines: List[str] = []
+    for diff_file in files:
+        lines.extend(diff_file.render_lines())
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+"""
+Нормализация diff перед отправкой в модель
+"""
+
+from typing import Dict, List, Tuple
+
+from .diff_model import DiffFile, Hunk
+from .tokens import estimate_tokens
+
+# Префиксы однострочных комментариев по расширению файла. Блочные комментарии
+# /* ... */ разбираются отдельно: строка "* ..." - комментарий только внутри
+# открытого блока (иначе это разыменование указателя или селектор CSS "*")
+_HASH_COMMENTS = (b"#",)
+_C_COMMENTS = (b"//", b"/*")
+_DASH_COMMENTS = (b"--",)
+
+COMMENT_PREFIXES: Dict[str, Tuple[bytes, ...]] = {
+    **dict.fromkeys(
+        (".py", ".sh", ".bash", ".rb", ".pl", ".r", ".yml", ".yaml", ".toml",
+         ".cfg", ".ini", ".conf", ".mk", ".dockerfile"),
+        _HASH_COMMENTS,
+    ),
+    **dict.fromkeys(
+        (".js", ".jsx", ".ts", ".tsx", ".java", ".kt", ".go", ".c", ".h", ".cc",
+         ".cpp", ".hpp", ".cs", ".swift", ".rs", ".scala", ".php", ".dart",
+         ".css", ".scss", ".less"),
+        _C_COMMENTS,
+    ),
+    **dict.fromkeys((".sql", ".lua", ".hs"), _DASH_COMMENTS),
+}
+
+
+class NormalizationStats:
+    """Статистика экономии токенов по шагам нормализации"""
+
+    def __init__(self):
+        self.steps: List[Tuple[str, int, int]] = []
+
+    def record(self, step: str, size_before: int, size_after: int):
+        """Запоминает размер diff до и после шага"""
+        self.steps.append((step, size_before, size_after))
+
+    @property
+    def tokens_saved(self) -> int:
+        return sum(
+            estimate_tokens(before) - estimate_tokens(after)
+            for _, before, after in self.steps
+        )
+
+    def format_lines(self) -> List[str]:
+        """Строки отчета для вывода пользователю"""
+        lines = []
+        for step, before, after in self.steps:
+            saved = estimate_tokens(before) - estimate_tokens(after)
+            percent = (before - after) * 100 // before if before else 0
+            lines.append(f"{step}: -{saved:,} токенов ({percent}%)")
+        return lines
+
+
+class DiffNormalizer:
+    """Убирает из diff изменения, не несущие смысла для описания MR"""
+
+    def __init__(
+        self,
+        drop_blank_hunks: bool = True,
+        drop_comment_hunks: bool = False,
+        minify: bool = True,
+        **kwargs,
+    ):
+        self.drop_blank_hunks = drop_blank_hunks
+        self.drop_comment_hunks = drop_comment_hunks
+        self.minify = minify
+
+    def normalize(
+        self, files: List[DiffFile], stats: NormalizationStats
+    ) -> List[DiffFile]:
+        """
+        Применяет включенные шаги нормализации
+
+        Args:
+            files: Разобранный diff
+            stats: Статистика, в которую записывается экономия каждого шага
+
+        Returns:
+            Нормализованный список файлов
+        """
+        steps = []
+        if self.drop_blank_hunks:
+            steps.append(("blank_hunks", self._drop_blank_hunks))
+        if self.drop_comment_hunks:
+            steps.append(("comment_hunks", self._drop_comment_hunks))
+        if self.minify:
+            steps.append(("minify", self._minify))
+
+        size = sum(diff_file.size for diff_file in files)
+        for name, step in steps:
+            files = step(files)
+            new_size = sum(diff_file.size for diff_file in files)
+            stats.record(name, size, new_size)
+            size = new_size
+        return files
+
+    @staticmethod
+    def _filter_hunks(files: List[DiffFile], is_noise) -> List[DiffFile]:
+        """Выбрасывает hunk'и-шум и файлы, от которых ничего не осталось"""
+        result = []
+        for diff_file in files:
+            if not diff_file.hunks:
+                # Бинарные файлы, смена режима, переименования
+                result.append(diff_file)
+                continue
+            diff_file.hunks = [
+                hunk for hunk in diff_file.hunks if not is_noise(diff_file, hunk)
+            ]
+            if diff_file.hunks:
+                result.append(diff_file)
+        return result
+
+    def _drop_blank_hunks(self, files: List[DiffFile]) -> List[DiffFile]:
+        def is_blank(diff_file: DiffFile, hunk: Hunk) -> bool:
+            return all(not line[1:].strip() for line in hunk.changed_lines)
+
+        return self._filter_hunks(files, is_blank)
+
+    def _drop_comment_hunks(self, files: List[DiffFile]) -> List[DiffFile]:
+        def is_comment(diff_file: DiffFile, hunk: Hunk) -> bool:
+            prefixes = COMMENT_PREFIXES.get(diff_file.extension)
+            if not prefixes:
+                return False
+            block = b"/*" in prefixes
+            in_block = False
+            # Контекстные строки тоже учитываются: по ним видно открытый блок
+            for line in hunk.iter_lines():
+                text = line[1:].strip()
+                comment = in_block or text.startswith(prefixes)
+                if block and (in_block or text.startswith(b"/*")):
+                    in_block = b"*/" not in text[0 if in_block else 2:]
+                if line[:1] in (b"+", b"-") and text and not comment:
+                    return False
+            return True
+
+        return self._filter_hunks(files, is_comment)
+
+    @staticmethod
+    def _minify(files: List[DiffFile]) -> List[DiffFile]:
+        """Убирает строки index и хвостовые пробелы (применяется при выводе)"""
+        for diff_file in files:
+            diff_file.minify = True
+        return files
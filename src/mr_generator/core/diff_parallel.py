@@ -0,0 +1,138 @@
+"""
+Параллельная обработка больших diff'ов в пуле процессов
+
+Diff один раз копируется в разделяемую память и делится на куски по границам
+файлов. Каждый процесс разбирает свой кусок, нормализует его и считает
+отпечатки hunk'ов для схлопывания повторов, а возвращает только смещения
+оставшихся файлов и hunk'ов. Результаты собираются в порядке кусков, поэтому
+итог не зависит от числа процессов.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from .diff_dedup import fingerprint_hunk
+from .diff_model import DiffFile, Hunk, make_file, parse_diff
+from .diff_normalizer import DiffNormalizer, NormalizationStats
+
+# Diff меньше этого размера обрабатывается в текущем процессе:
+# запуск пула дороже выигрыша
+PARALLEL_MIN_SIZE = 16 * 1024 * 1024
+
+# Кусков на процесс: мелкие куски выравнивают нагрузку при неравных файлах
+CHUNKS_PER_JOB = 4
+
+# Смещения файла: (start, header_end, end, [(start, body, end, отпечаток), ...])
+FileOffsets = Tuple[int, int, int, List[Tuple[int, int, int, Optional[str]]]]
+
+
+def split_buffer(buffer: bytes, parts: int) -> List[Tuple[int, int]]:
+    """Делит diff на диапазоны примерно равного размера по границам файлов"""
+    size = len(buffer)
+    bounds = [0]
+    for part in range(1, parts):
+        position = buffer.find(b"\ndiff --git ", max(size * part // parts, bounds[-1]))
+        if position == -1:
+            break
+        if position + 1 > bounds[-1]:
+            bounds.append(position + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _process_chunk(task) -> Tuple[List[Tuple[str, int, int]], List[FileOffsets]]:
+    """Разбирает и нормализует кусок diff'а в процессе пула"""
+    name, start, end, options = task
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(memory.buf[start:end])
+    finally:
+        memory.close()
+
+    stats = NormalizationStats()
+    files = DiffNormalizer(**options).normalize(parse_diff(data), stats)
+    with_fingerprints = bool(options.get("dedup_hunks"))
+
+    result = []
+    for diff_file in files:
+        hunks = [
+            (
+                start + hunk.start,
+                start + hunk.body,
+                start + hunk.end,
+                fingerprint_hunk(hunk) if with_fingerprints else None,
+            )
+            for hunk in diff_file.hunks
+        ]
+        result.append(
+            (start + diff_file.start, start + diff_file.header_end, start + diff_file.end, hunks)
+        )
+    return stats.steps, result
+
+
+class ParallelDiffProcessor:
+    """Разбор, нормализация и отпечатки hunk'ов в нескольких процессах"""
+
+    def __init__(self, jobs: Optional[int] = None, min_size: Optional[int] = None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.min_size = PARALLEL_MIN_SIZE if min_size is None else min_size
+
+    def should_run(self, size: int) -> bool:
+        """Стоит ли запускать пул для diff'а такого размера"""
+        return self.jobs > 1 and size >= self.min_size
+
+    def process(
+        self, buffer: bytes, options: dict, stats: NormalizationStats
+    ) -> Tuple[List[DiffFile], Dict[int, Optional[str]]]:
+        """
+        Обрабатывает diff в пуле процессов
+
+        Args:
+            buffer: Вывод git diff в байтах
+            options: Параметры обработки diff (Config.get_diff_options)
+            stats: Статистика, в которую записывается экономия шагов нормализации
+
+        Returns:
+            Нормализованные файлы, ссылающиеся на buffer, и отпечатки hunk'ов
+            по смещению начала hunk'а (для HunkDeduplicator)
+        """
+        ranges = split_buffer(buffer, self.jobs * CHUNKS_PER_JOB)
+        memory = shared_memory.SharedMemory(create=True, size=max(len(buffer), 1))
+        try:
+            memory.buf[: len(buffer)] = buffer
+            tasks = [(memory.name, start, end, options) for start, end in ranges]
+            with ProcessPoolExecutor(max_workers=min(self.jobs, len(tasks))) as pool:
+                results = list(pool.map(_process_chunk, tasks))
+        finally:
+            memory.close()
+            memory.unlink()
+
+        minify = DiffNormalizer(**options).minify
+        fallback_encoding = options.get("fallback_encoding", "cp1251")
+        file_encodings = options.get("file_encodings")
+
+        files: List[DiffFile] = []
+        fingerprints: Dict[int, Optional[str]] = {}
+        merged_steps: List[List] = []
+        for steps, chunk_files in results:
+            for index, (step, before, after) in enumerate(steps):
+                if index == len(merged_steps):
+                    merged_steps.append([step, 0, 0])
+                merged_steps[index][1] += before
+                merged_steps[index][2] += after
+            for start, header_end, end, hunk_offsets in chunk_files:
+                hunks = []
+                for hunk_start, body, hunk_end, fingerprint in hunk_offsets:
+                    hunks.append(Hunk(buffer, hunk_start, body, hunk_end))
+                    fingerprints[hunk_start] = fingerprint
+                diff_file = make_file(
+                    buffer, start, header_end, end, hunks, fallback_encoding, file_encodings
+                )
+                diff_file.minify = minify
+                files.append(diff_file)
+
+        for step, before, after in merged_steps:
+            stats.record(step, before, after)
+        return files, fingerprints
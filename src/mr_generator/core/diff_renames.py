@@ -0,0 +1,73 @@
+"""
+Схлопывание переименований и копирований файлов
+"""
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from ..config import DIFF_LABELS
+from .diff_model import DiffFile
+
+
+def _moved_prefixes(old_path: str, new_path: str) -> Optional[Tuple[str, str]]:
+    """
+    Находит перемещенные директории по общему хвосту путей
+
+    Например, для src/a/x.py -> lib/a/x.py это пара ("src", "lib").
+
+    Returns:
+        Пара (старый префикс, новый префикс) или None, если изменилось имя файла
+    """
+    old_parts = old_path.split("/")
+    new_parts = new_path.split("/")
+    common = 0
+    while (
+        common < min(len(old_parts), len(new_parts))
+        and old_parts[-1 - common] == new_parts[-1 - common]
+    ):
+        common += 1
+    if common == 0:
+        return None
+    old_prefix = "/".join(old_parts[: len(old_parts) - common])
+    new_prefix = "/".join(new_parts[: len(new_parts) - common])
+    return old_prefix, new_prefix
+
+
+def collapse_renames(
+    files: List[DiffFile], language: str = "ru"
+) -> Tuple[List[DiffFile], List[str]]:
+    """
+    Убирает из diff чистые переименования и копирования
+
+    Файлы с изменениями после переименования остаются в diff (git уже
+    показывает для них только разницу), а чистые перемещения превращаются
+    в строки сводки на языке промпта. Перемещения целых директорий
+    группируются в одну строку.
+
+    Returns:
+        Оставшиеся файлы и строки сводки
+    """
+    remaining = []
+    groups: "OrderedDict[Tuple[str, str, str], List[DiffFile]]" = OrderedDict()
+    for diff_file in files:
+        if not diff_file.is_pure_move:
+            remaining.append(diff_file)
+            continue
+        prefixes = _moved_prefixes(diff_file.old_path, diff_file.path)
+        key = (diff_file.status,) + (
+            prefixes or (diff_file.old_path, diff_file.path)
+        )
+        groups.setdefault(key, []).append(diff_file)
+
+    labels = DIFF_LABELS.get(language, DIFF_LABELS["ru"])
+    summary = []
+    for (status, old_prefix, new_prefix), moved in groups.items():
+        label = labels[status]
+        if len(moved) == 1:
+            summary.append(f"{label}: {moved[0].old_path} → {moved[0].path}")
+        else:
+            summary.append(
+                f"{label}: {old_prefix or '.'}/ → {new_prefix or '.'}/ "
+                f"({labels['moved_files'].format(count=len(moved))})"
+            )
+    return remaining, summary
@@ -0,0 +1,69 @@
+"""
+Кэш diff'а по файлам (сегментам) для инкрементального пересчета
+
+Сегмент - это секция diff'а одного файла. Она полностью определяется путями,
+SHA и режимами blob'ов до и после изменения и аргументами git diff, поэтому
+при сдвиге ветки заново считаются только файлы, которые изменились.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .diff_model import parse_diff
+
+SegmentKey = Tuple[Any, ...]
+
+
+def segment_key(change: Dict[str, str], args) -> SegmentKey:
+    """Ключ сегмента по записи из GitHelper.get_raw_changes"""
+    return (
+        change["status"],
+        change["old_path"],
+        change["path"],
+        change["old_mode"],
+        change["new_mode"],
+        change["old_sha"],
+        change["new_sha"],
+        tuple(args),
+    )
+
+
+def split_segments(diff_content: bytes) -> Dict[Tuple[str, str], bytes]:
+    """Делит вывод git diff на секции файлов по паре (старый путь, новый путь)"""
+    return {
+        (diff_file.old_path, diff_file.path): diff_content[diff_file.start : diff_file.end]
+        for diff_file in parse_diff(diff_content)
+    }
+
+
+class SegmentCache:
+    """Сегменты diff'а в памяти с вытеснением давно не использованных по общему размеру"""
+
+    def __init__(self, max_size: int = 256 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._segments: "OrderedDict[SegmentKey, bytes]" = OrderedDict()
+
+    def get(self, key: SegmentKey) -> Optional[bytes]:
+        segment = self._segments.get(key)
+        if segment is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._segments.move_to_end(key)
+        return segment
+
+    def put(self, key: SegmentKey, segment: bytes):
+        previous = self._segments.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._segments[key] = segment
+        self.size += len(segment)
+        while self.size > self.max_size and len(self._segments) > 1:
+            _, evicted = self._segments.popitem(last=False)
+            self.size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._segments)
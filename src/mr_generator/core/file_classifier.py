@@ -0,0 +1,233 @@
+"""
+Классификация измененных файлов и определение типа MR
+"""
+
+import fnmatch
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from ..config import EXCLUDE_FILES
+
+SOURCE = "source"
+TEST = "test"
+CI = "ci"
+DOCS = "docs"
+CONFIG = "config"
+GENERATED = "generated"
+OTHER = "other"
+
+# Порядок категорий при нескольких совпадениях одного уровня
+CATEGORY_ORDER = (GENERATED, CI, TEST, DOCS, CONFIG, SOURCE)
+
+# Приоритет при упаковке diff в промпт: чем меньше, тем раньше
+CATEGORY_PRIORITY = {
+    SOURCE: 0,
+    CONFIG: 1,
+    TEST: 2,
+    CI: 3,
+    DOCS: 4,
+    OTHER: 5,
+    GENERATED: 6,
+}
+
+# Шаблоны имен файлов (fnmatch, без учета регистра) по категориям
+_GLOBS: Dict[str, Tuple[str, ...]] = {
+    GENERATED: tuple(EXCLUDE_FILES)
+    + (
+        "*_pb2.py",
+        "*_pb2_grpc.py",
+        "*.pb.go",
+        "*.generated.*",
+        "*.g.dart",
+        "*.snap",
+        "*.map",
+        "go.sum",
+        "poetry.lock",
+        "cargo.lock",
+    ),
+    CI: (
+        ".gitlab-ci.yml",
+        ".travis.yml",
+        "azure-pipelines.yml",
+        "jenkinsfile",
+        "dockerfile",
+        "dockerfile.*",
+        "*.dockerfile",
+        "docker-compose*.yml",
+        "docker-compose*.yaml",
+        ".dockerignore",
+        "makefile",
+        "*.mk",
+    ),
+    TEST: (
+        "test_*.py",
+        "*_test.py",
+        "*_test.go",
+        "*.test.*",
+        "*.spec.*",
+        "*test.java",
+        "*tests.cs",
+        "conftest.py",
+    ),
+    DOCS: ("readme*", "changelog*", "license*", "contributing*", "authors*"),
+    CONFIG: (
+        "requirements*.txt",
+        "setup.py",
+        "setup.cfg",
+        ".env*",
+        ".gitignore",
+        ".gitattributes",
+        ".editorconfig",
+        ".pre-commit-config.yaml",
+    ),
+}
+
+# Имена директорий по категориям
+_DIRECTORIES: Dict[str, Tuple[str, ...]] = {
+    GENERATED: ("node_modules", "vendor", "dist", "build", "generated", "__pycache__"),
+    CI: (".github", ".gitlab", ".circleci", ".ci", "ci", "deploy", "k8s", "helm"),
+    TEST: ("test", "tests", "__tests__", "spec", "specs", "testdata", "fixtures"),
+    DOCS: ("docs", "doc", "documentation"),
+}
+
+# Расширения файлов по категориям
+_EXTENSIONS: Dict[str, Tuple[str, ...]] = {
+    DOCS: (".md", ".rst", ".txt", ".adoc"),
+    CONFIG: (
+        ".json",
+        ".toml",
+        ".yaml",
+        ".yml",
+        ".ini",
+        ".cfg",
+        ".conf",
+        ".properties",
+        ".xml",
+        ".env",
+    ),
+    SOURCE: (
+        ".py",
+        ".pyi",
+        ".js",
+        ".jsx",
+        ".ts",
+        ".tsx",
+        ".vue",
+        ".java",
+        ".kt",
+        ".go",
+        ".rs",
+        ".c",
+        ".h",
+        ".cc",
+        ".cpp",
+        ".hpp",
+        ".cs",
+        ".swift",
+        ".rb",
+        ".php",
+        ".scala",
+        ".dart",
+        ".sql",
+        ".sh",
+        ".lua",
+        ".html",
+        ".css",
+        ".scss",
+    ),
+}
+
+
+def _compile_globs(patterns: Iterable[str]) -> "re.Pattern":
+    return re.compile("|".join(fnmatch.translate(p.lower()) for p in patterns))
+
+
+_GLOB_RES = {category: _compile_globs(patterns) for category, patterns in _GLOBS.items()}
+_DIRECTORY_INDEX = {
+    name: category for category, names in _DIRECTORIES.items() for name in names
+}
+_EXTENSION_INDEX = {
+    ext: category for category, exts in _EXTENSIONS.items() for ext in exts
+}
+
+
+@lru_cache(maxsize=65536)
+def classify_path(path: str) -> str:
+    """
+    Определяет категорию файла: source, test, ci, docs, config, generated или other
+
+    Результат кэшируется для каждого пути.
+    """
+    lowered = path.lower()
+    parts = lowered.split("/")
+    name = parts[-1]
+    ext = "." + name.rsplit(".", 1)[-1] if "." in name else ""
+
+    by_name = {
+        category
+        for category, pattern in _GLOB_RES.items()
+        if pattern.match(name) or pattern.match(lowered)
+    }
+    by_directory = {
+        _DIRECTORY_INDEX[directory]
+        for directory in parts[:-1]
+        if directory in _DIRECTORY_INDEX
+    }
+
+    # Сгенерированный код побеждает всегда, затем имя файла, директория, расширение
+    if GENERATED in by_name or GENERATED in by_directory:
+        return GENERATED
+    for matched in (by_name, by_directory):
+        for category in CATEGORY_ORDER:
+            if category in matched:
+                return category
+    return _EXTENSION_INDEX.get(ext, OTHER)
+
+
+def classify_files(paths: Iterable[str]) -> Dict[str, List[str]]:
+    """Группирует пути по категориям"""
+    groups: Dict[str, List[str]] = {}
+    for path in paths:
+        groups.setdefault(classify_path(path), []).append(path)
+    return groups
+
+
+_FIX_RE = re.compile(r"\b(?:fix\w*|bug\w*|hotfix\w*|bagfix\w*)|исправ")
+_FEAT_RE = re.compile(r"\b(?:feat\w*|add(?:s|ed|ing)?\b|new\b)|добав")
+_REFACTOR_RE = re.compile(r"\b(?:refactor\w*|clean\w*|restructur\w*)|рефактор")
+_DOCS_RE = re.compile(r"\b(?:docs?\b|documentation|readme)|документ")
+# "ci"/"pipeline" встречаются в обычном тексте, поэтому ci учитывается только как
+# префикс conventional commits в начале сообщения; остальное - по категориям файлов
+_INFRA_RE = re.compile(r"\b(?:docker\w*|deploy\w*)|^ci(?:\(.*?\))?!?:", re.MULTILINE)
+
+
+def detect_mr_type(changed_files: List[str], commit_messages: List[str]) -> str:
+    """
+    Определяет тип MR для выбора подходящего промпта
+
+    Returns:
+        infrastructure, bugfix, refactor, docs, feature или default
+    """
+    counts = Counter(classify_path(path) for path in changed_files)
+    commits_text = "\n".join(commit_messages).lower()
+
+    is_fix = bool(_FIX_RE.search(commits_text))
+    is_feat = bool(_FEAT_RE.search(commits_text))
+    is_refactor = bool(_REFACTOR_RE.search(commits_text))
+    is_docs = bool(_DOCS_RE.search(commits_text))
+    only_docs = bool(changed_files) and counts[DOCS] == len(changed_files)
+
+    if (counts[CI] and not counts[SOURCE]) or _INFRA_RE.search(commits_text):
+        return "infrastructure"
+    elif is_fix and not is_feat:
+        return "bugfix"
+    elif is_refactor and not is_feat:
+        return "refactor"
+    elif only_docs or (counts[DOCS] and is_docs and len(changed_files) <= 5):
+        return "docs"
+    elif is_feat:
+        return "feature"
+    else:
+        return "default"
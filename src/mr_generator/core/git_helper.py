@@ -4,14 +4,95 @@
 
 import subprocess
 import os
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .diff_cache import DiffCache
+from .diff_segments import SegmentCache, segment_key, split_segments
+from .memory_budget import MemoryBudget, map_file
+
+# Минимальное число измененных файлов для параллельного git diff
+PARALLEL_MIN_FILES = 2000
+
+# Максимум путей в одном вызове git diff (ограничение длины командной строки)
+MAX_PATHSPEC_PATHS = 4000
 
 
 class GitHelper:
     """Помощник для работы с Git командами"""
 
-    def __init__(self, repo_path: str = "."):
+    def __init__(self, repo_path: str = ".", cache: Optional[DiffCache] = None):
         self.repo_path = repo_path
+        self.cache = cache
+        # Лимит памяти: diff пишется во временный файл и отображается в память
+        self.memory_budget: Optional[MemoryBudget] = None
+
+    def get_git_common_dir(self) -> str:
+        """Получает общий каталог .git (один для всех рабочих копий worktree)"""
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "--git-common-dir"],
+                cwd=self.repo_path,
+                capture_output=True,
+                encoding="utf-8",
+                errors="replace",
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка получения каталога .git: {e}")
+        return os.path.abspath(os.path.join(self.repo_path, result.stdout.strip()))
+
+    def get_hooks_dir(self) -> str:
+        """Получает каталог git hook'ов с учетом core.hooksPath"""
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "--git-path", "hooks"],
+                cwd=self.repo_path,
+                capture_output=True,
+                encoding="utf-8",
+                errors="replace",
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка получения каталога hook'ов: {e}")
+        return os.path.abspath(os.path.join(self.repo_path, result.stdout.strip()))
+
+    def resolve_commits(self, *refs: str) -> List[str]:
+        """Получает SHA коммитов для веток и ссылок"""
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", *[f"{ref}^{{commit}}" for ref in refs], "--"],
+                cwd=self.repo_path,
+                capture_output=True,
+                encoding="utf-8",
+                errors="replace",
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка получения SHA коммита: {e}")
+        return [line for line in result.stdout.split() if line != "--"]
+
+    def _cached(self, namespace: str, parts: List[Any], compute: Callable[[], bytes]) -> bytes:
+        """Берет результат из кэша или вычисляет и сохраняет его"""
+        if self.cache is None:
+            return compute()
+        key = DiffCache.make_key(namespace, parts)
+        data = self.cache.get(key)
+        if data is None:
+            data = compute()
+            self.cache.put(key, data)
+        return data
+
+    def _cached_json(self, namespace: str, parts: List[Any], compute: Callable[[], Any]) -> Any:
+        """То же, что _cached, для данных, сериализуемых в JSON"""
+        if self.cache is None:
+            return compute()
+        key = DiffCache.make_key(namespace, parts)
+        value = self.cache.get_json(key)
+        if value is None:
+            value = compute()
+            self.cache.put_json(key, value)
+        return value
 
     def get_current_branch(self) -> str:
         """Получает название текущей ветки"""
@@ -20,7 +101,8 @@ class GitHelper:
                 ["git", "rev-parse", "--abbrev-ref", "HEAD"],
                 cwd=self.repo_path,
                 capture_output=True,
-                text=True,
+                encoding="utf-8",
+                errors="replace",
                 check=True,
             )
             return result.stdout.strip()
@@ -38,7 +120,8 @@ class GitHelper:
                     ["git", "merge-base", branch, base],
                     cwd=self.repo_path,
                     capture_output=True,
-                    text=True,
+                    encoding="utf-8",
+                    errors="replace",
                     check=True,
                 )
                 if result.returncode == 0:
@@ -49,44 +132,488 @@ class GitHelper:
         # Если не найдено, используем master по умолчанию
         return "master"
 
-    def get_diff(self, branch: str, base_branch: Optional[str] = None) -> str:
+    @staticmethod
+    def _diff_args(options: Dict[str, Any]) -> List[str]:
+        """Преобразует параметры diff в аргументы git diff"""
+        args = []
+        if options.get("ignore_whitespace"):
+            args.append("-w")
+        if options.get("ignore_blank_lines"):
+            args.append("--ignore-blank-lines")
+        if options.get("context_lines") is not None:
+            args.append(f"-U{int(options['context_lines'])}")
+        if options.get("find_renames") == 0:
+            args.append("--no-renames")
+        elif options.get("find_renames"):
+            args.append(f"-M{int(options['find_renames'])}%")
+        if options.get("find_copies"):
+            args.append(f"-C{int(options['find_copies'])}%")
+        return args
+
+    def get_diff(
+        self, branch: str, base_branch: Optional[str] = None, **options
+    ) -> str:
         """
         Получает diff между веткой и базовой веткой
 
         Args:
             branch: Название ветки для сравнения
             base_branch: Базовая ветка (если не указана, определяется автоматически)
+            **options: Параметры diff (ignore_whitespace, ignore_blank_lines,
+                context_lines, find_renames, find_copies); jobs и
+                parallel_min_files включают параллельный git diff по частям
+                списка файлов; остальные ключи игнорируются
 
         Returns:
-            Содержимое git diff
+            Содержимое git diff (байты не в UTF-8 заменяются)
+        """
+        # str() вместо .decode(): в режиме лимита памяти diff - буфер mmap
+        return str(self.get_diff_bytes(branch, base_branch, **options), "utf-8", "replace")
+
+    def get_diff_bytes(
+        self, branch: str, base_branch: Optional[str] = None, **options
+    ) -> bytes:
+        """
+        Получает diff между веткой и базовой веткой без декодирования
+
+        Параметры те же, что у get_diff.
+
+        Returns:
+            Содержимое git diff в байтах; при заданном memory_budget - буфер mmap
+            временного файла с тем же интерфейсом (срезы, find, len)
+        """
+        merge_base = self.get_merge_base(branch, base_branch)
+        args = self._diff_args(options)
+        if self.memory_budget is not None:
+            return self._spooled_diff(args, merge_base, branch)
+        if self.cache is None:
+            return self._compute_diff(args, merge_base, branch, options)
+
+        # Результат зависит только от двух коммитов и аргументов git diff
+        head = self.resolve_commits(branch)[0]
+        return self._cached(
+            "diff",
+            [merge_base, head, *args],
+            lambda: self._compute_diff(args, merge_base, head, options),
+        )
+
+    def _spooled_diff(self, args: List[str], merge_base: str, branch: str):
+        """
+        Diff через временный файл: ни вывод git, ни запись кэша не читаются в память целиком
+
+        Returns:
+            Буфер mmap с diff'ом (пустые байты для пустого diff'а)
+        """
+        spool = self.memory_budget.spool_file()
+        try:
+            key = None
+            if self.cache is not None:
+                # Ключ тот же, что у get_diff_bytes без лимита памяти
+                key = DiffCache.make_key("diff", [merge_base, self.resolve_commits(branch)[0], *args])
+                if self.cache.get_stream(key, spool):
+                    return map_file(spool)
+                spool.seek(0)
+                spool.truncate()
+            try:
+                self.memory_budget.run_to_file(
+                    ["git", "diff", *args, merge_base, branch], self.repo_path, spool
+                )
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"Ошибка получения diff: {e}")
+            if key is not None:
+                self.cache.put_stream(key, spool)
+            return map_file(spool)
+        finally:
+            spool.close()
+
+    def _compute_diff(
+        self, args: List[str], merge_base: str, branch: str, options: Dict[str, Any]
+    ) -> bytes:
+        """Запускает git diff, при большом числе файлов - по частям параллельно"""
+        jobs = options.get("jobs") or os.cpu_count() or 1
+        min_files = options.get("parallel_min_files")
+        min_files = PARALLEL_MIN_FILES if min_files is None else min_files
+        # Список путей с поиском переименований нужен только большим diff'ам:
+        # сначала дешево (без чтения blob'ов) считаем измененные файлы
+        if jobs > 1 and self._count_changed_paths(merge_base, branch) >= max(min_files, 2):
+            partitions = self._partition_paths(
+                self._changed_path_groups(merge_base, branch, args), jobs, min_files
+            )
+            if len(partitions) > 1:
+                # Части diff'а собираются в порядке разбиения, как в одном git diff
+                with ThreadPoolExecutor(max_workers=jobs) as pool:
+                    return b"".join(
+                        pool.map(
+                            lambda paths: self._run_diff(args, merge_base, branch, paths),
+                            partitions,
+                        )
+                    )
+
+        return self._run_diff(args, merge_base, branch)
+
+    def _run_diff(
+        self,
+        args: List[str],
+        merge_base: str,
+        branch: str,
+        paths: Optional[List[str]] = None,
+    ) -> bytes:
+        """Запускает git diff от merge-base до branch, при необходимости по списку путей"""
+        command = ["git", "diff", *args, merge_base, branch]
+        env = None
+        if paths is not None:
+            command += ["--", *paths]
+            # Пути передаются как есть, без разбора шаблонов pathspec
+            env = {**os.environ, "GIT_LITERAL_PATHSPECS": "1"}
+
+        try:
+            # Получаем diff от merge-base до branch
+            diff_result = subprocess.run(
+                command,
+                cwd=self.repo_path,
+                capture_output=True,
+                env=env,
+                check=True,
+            )
+
+            return diff_result.stdout
+
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка получения diff: {e}")
+
+    def _count_changed_paths(self, merge_base: str, branch: str) -> int:
+        """Число измененных путей без поиска переименований (сравниваются только деревья)"""
+        try:
+            result = subprocess.run(
+                ["git", "diff", "--name-only", "--no-renames", "-z", merge_base, branch],
+                cwd=self.repo_path,
+                capture_output=True,
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка получения измененных файлов: {e}")
+        return result.stdout.count(b"\0")
+
+    def _changed_path_groups(
+        self, merge_base: str, branch: str, args: List[str]
+    ) -> List[List[str]]:
+        """
+        Получает измененные пути (git diff --name-status) в порядке вывода git diff
+
+        Пути переименований и копий объединяются в одну группу, чтобы git нашел
+        ту же пару при diff'е по части путей.
         """
+        try:
+            result = subprocess.run(
+                ["git", "diff", "--name-status", "-z", *args, merge_base, branch],
+                cwd=self.repo_path,
+                capture_output=True,
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка получения измененных файлов: {e}")
+
+        groups: List[List[str]] = []
+        owner: Dict[str, int] = {}
+        fields = result.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+        i = 0
+        while i < len(fields) - 1:
+            count = 2 if fields[i][:1] in ("R", "C") else 1
+            paths = fields[i + 1 : i + 1 + count]
+            i += 1 + count
+
+            # Путь уже встречался (источник копии) - сливаем группы
+            existing = sorted({owner[path] for path in paths if path in owner})
+            if existing:
+                target = existing[0]
+                for other in existing[1:]:
+                    for path in groups[other]:
+                        owner[path] = target
+                    groups[target].extend(groups[other])
+                    groups[other] = []
+            else:
+                target = len(groups)
+                groups.append([])
+            for path in paths:
+                if path not in owner:
+                    owner[path] = target
+                    groups[target].append(path)
+        return [group for group in groups if group]
+
+    @staticmethod
+    def _partition_paths(
+        groups: List[List[str]], jobs: int, min_files: int
+    ) -> List[List[str]]:
+        """Делит группы путей на последовательные части примерно равного размера"""
+        total = sum(len(group) for group in groups)
+        if total < max(min_files, 2):
+            return []
+
+        limit = min(-(-total // jobs), MAX_PATHSPEC_PATHS)
+        partitions: List[List[str]] = [[]]
+        for group in groups:
+            if partitions[-1] and len(partitions[-1]) + len(group) > limit:
+                partitions.append([])
+            partitions[-1].extend(group)
+        return partitions
+
+    def get_merge_base(self, branch: str, base_branch: Optional[str] = None) -> str:
+        """Получает merge-base ветки и базовой ветки для точного сравнения"""
         if not base_branch:
             base_branch = self.get_base_branch(branch)
+        if self.cache is not None:
+            base_branch, branch = self.resolve_commits(base_branch, branch)
+
+        def compute() -> bytes:
+            try:
+                result = subprocess.run(
+                    ["git", "merge-base", base_branch, branch],
+                    cwd=self.repo_path,
+                    capture_output=True,
+                    check=True,
+                )
+                return result.stdout.strip()
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"Ошибка получения merge-base: {e}")
+
+        return self._cached("merge-base", [base_branch, branch], compute).decode("ascii")
+
+    def is_ancestor(self, ancestor: str, commit: str) -> bool:
+        """Проверяет, входит ли коммит ancestor в историю коммита commit"""
+        result = subprocess.run(
+            ["git", "merge-base", "--is-ancestor", ancestor, commit],
+            cwd=self.repo_path,
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        if result.returncode not in (0, 1):
+            raise Exception(f"Ошибка проверки истории коммитов: {result.stderr.strip()}")
+        return result.returncode == 0
+
+    def get_raw_changes(
+        self, branch: str, base_branch: Optional[str] = None, **options
+    ) -> List[Dict[str, str]]:
+        """
+        Получает список изменений с полными SHA blob'ов (git diff --raw)
+
+        Args:
+            branch: Название ветки
+            base_branch: Базовая ветка
+            **options: Параметры diff (учитываются find_renames и find_copies)
+
+        Returns:
+            Список словарей status, old_mode, new_mode, old_sha, new_sha, old_path, path
+        """
+        merge_base = self.get_merge_base(branch, base_branch)
+        rename_options = {
+            key: options[key] for key in ("find_renames", "find_copies") if key in options
+        }
+        args = self._diff_args(rename_options)
+        if self.cache is not None:
+            branch = self.resolve_commits(branch)[0]
+
+        def compute() -> bytes:
+            try:
+                result = subprocess.run(
+                    ["git", "diff", "--raw", "--no-abbrev", "-z", *args, merge_base, branch],
+                    cwd=self.repo_path,
+                    capture_output=True,
+                    check=True,
+                )
+                return result.stdout
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"Ошибка получения списка изменений: {e}")
+
+        output = self._cached("raw", [merge_base, branch, *args], compute)
+
+        changes = []
+        fields = output.decode("utf-8", errors="surrogateescape").split("\0")
+        i = 0
+        while i < len(fields) - 1:
+            meta = fields[i][1:].split()
+            status = meta[4]
+            old_path = fields[i + 1]
+            if status[0] in ("R", "C"):
+                path = fields[i + 2]
+                i += 3
+            else:
+                path = old_path
+                i += 2
+            changes.append(
+                {
+                    "status": status[0],
+                    "old_mode": meta[0],
+                    "new_mode": meta[1],
+                    "old_sha": meta[2],
+                    "new_sha": meta[3],
+                    "old_path": old_path,
+                    "path": path,
+                }
+            )
+        return changes
+
+    def get_diff_segments(
+        self,
+        branch: str,
+        base_branch: Optional[str] = None,
+        segments: Optional[SegmentCache] = None,
+        **options,
+    ) -> bytes:
+        """
+        Собирает diff из секций отдельных файлов, пересчитывая только новые
+
+        Секции берутся из кэша сегментов по путям, SHA и режимам blob'ов;
+        git diff запускается только для файлов, которых в кэше нет.
+        Параметры diff те же, что у get_diff.
+
+        Returns:
+            Содержимое git diff в байтах
+        """
+        if segments is None:
+            return self.get_diff_bytes(branch, base_branch, **options)
+
+        merge_base = self.get_merge_base(branch, base_branch)
+        head = self.resolve_commits(branch)[0]
+        args = self._diff_args(options)
+        changes = self.get_raw_changes(head, merge_base, **options)
+
+        keys = [segment_key(change, args) for change in changes]
+        found = [segments.get(key) for key in keys]
+        missing = [change for change, segment in zip(changes, found) if segment is None]
+        if missing:
+            # Пути переименования в одной группе: git найдет ту же пару в своей части
+            groups: List[List[str]] = []
+            seen = set()
+            for change in missing:
+                group = [path for path in dict.fromkeys((change["old_path"], change["path"]))
+                         if path not in seen]
+                seen.update(group)
+                if group:
+                    groups.append(group)
+            # Длинный список путей делится на части: иначе "Argument list too long"
+            partitions = self._partition_paths(groups, 1, 0) or [
+                [path for group in groups for path in group]
+            ]
+            sections = {}
+            for paths in partitions:
+                sections.update(split_segments(self._run_diff(args, merge_base, head, paths)))
+            for index, (change, key) in enumerate(zip(changes, keys)):
+                if found[index] is None:
+                    # Пустая секция: файл без изменений с учетом аргументов (например, -w)
+                    found[index] = sections.get((change["old_path"], change["path"]), b"")
+                    segments.put(key, found[index])
+        return b"".join(found)
+
+    def get_blob_sizes(self, shas: List[str]) -> Dict[str, int]:
+        """
+        Получает размеры blob'ов (git cat-file --batch-check) без чтения содержимого
+
+        Returns:
+            Словарь SHA -> размер в байтах; отсутствующие объекты пропускаются
+        """
+        if not shas:
+            return {}
 
         try:
-            # Получаем merge-base для точного сравнения
-            merge_base_result = subprocess.run(
-                ["git", "merge-base", base_branch, branch],
+            result = subprocess.run(
+                ["git", "cat-file", "--batch-check"],
                 cwd=self.repo_path,
+                input="".join(f"{sha}\n" for sha in shas).encode("ascii"),
                 capture_output=True,
-                text=True,
                 check=True,
             )
-            merge_base = merge_base_result.stdout.strip()
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка чтения объектов git: {e}")
 
-            # Получаем diff от merge-base до branch
-            diff_result = subprocess.run(
-                ["git", "diff", merge_base, branch],
+        sizes = {}
+        for line in result.stdout.splitlines():
+            header = line.split()
+            if len(header) == 3 and header[1] != b"missing":
+                sizes[header[0].decode("ascii")] = int(header[2])
+        return sizes
+
+    def read_blobs(self, shas: List[str]) -> Dict[str, bytes]:
+        """
+        Читает содержимое blob'ов одним процессом git cat-file --batch
+
+        Returns:
+            Словарь SHA -> содержимое; отсутствующие объекты пропускаются
+        """
+        if not shas:
+            return {}
+
+        try:
+            result = subprocess.run(
+                ["git", "cat-file", "--batch"],
                 cwd=self.repo_path,
+                input="".join(f"{sha}\n" for sha in shas).encode("ascii"),
                 capture_output=True,
-                text=True,
                 check=True,
             )
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Ошибка чтения объектов git: {e}")
+
+        blobs = {}
+        data = result.stdout
+        position = 0
+        while position < len(data):
+            header_end = data.index(b"\n", position)
+            header = data[position:header_end].split()
+            position = header_end + 1
+            if len(header) < 3 or header[1] == b"missing":
+                continue
+            size = int(header[2])
+            blobs[header[0].decode("ascii")] = data[position : position + size]
+            position += size + 1
+        return blobs
 
-            return diff_result.stdout
+    def get_file_history(self, revisions: List[str], max_commits: int = 0) -> List[Dict[str, Any]]:
+        """
+        Получает историю изменений файлов (git log --raw, без merge-коммитов)
 
+        Args:
+            revisions: Диапазон для git log, например ["<старый SHA>..<новый SHA>"]
+            max_commits: Максимум коммитов (0 - без ограничения)
+
+        Returns:
+            Коммиты от новых к старым: словари time, author и changes - список
+            кортежей (статус, старый путь, путь, SHA нового blob'а)
+        """
+        limit = [f"--max-count={max_commits}"] if max_commits else []
+        try:
+            result = subprocess.run(
+                ["git", "log", "-z", "--raw", "--no-abbrev", "-M", "--no-merges",
+                 "--format=%x01%ct %ae", *limit, *revisions, "--"],
+                cwd=self.repo_path,
+                capture_output=True,
+                check=True,
+            )
         except subprocess.CalledProcessError as e:
-            raise Exception(f"Ошибка получения diff: {e}")
+            raise Exception(f"Ошибка получения истории файлов: {e}")
+
+        commits: List[Dict[str, Any]] = []
+        fields = result.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+        i = 0
+        while i < len(fields):
+            field = fields[i].lstrip("\n")
+            if field.startswith("\x01"):
+                timestamp, _, author = field[1:].partition(" ")
+                commits.append({"time": int(timestamp), "author": author, "changes": []})
+                i += 1
+            elif field.startswith(":") and commits:
+                meta = field[1:].split()
+                status = meta[4][0]
+                if status in ("R", "C"):
+                    old_path, path = fields[i + 1], fields[i + 2]
+                    i += 3
+                else:
+                    old_path = path = fields[i + 1]
+                    i += 2
+                commits[-1]["changes"].append((status, old_path, path, meta[3]))
+            else:
+                i += 1
+        return commits
 
     def get_commit_messages(
         self, branch: str, base_branch: Optional[str] = None
@@ -103,20 +630,26 @@ class GitHelper:
         """
         if not base_branch:
             base_branch = self.get_base_branch(branch)
+        if self.cache is not None:
+            base_branch, branch = self.resolve_commits(base_branch, branch)
 
-        try:
-            result = subprocess.run(
-                ["git", "log", f"{base_branch}..{branch}", "--pretty=format:%s"],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+        def compute() -> list:
+            try:
+                result = subprocess.run(
+                    ["git", "log", f"{base_branch}..{branch}", "--pretty=format:%s"],
+                    cwd=self.repo_path,
+                    capture_output=True,
+                    encoding="utf-8",
+                    errors="replace",
+                    check=True,
+                )
 
-            return [line.strip() for line in result.stdout.split("\n") if line.strip()]
+                return [line.strip() for line in result.stdout.split("\n") if line.strip()]
 
-        except subprocess.CalledProcessError as e:
-            raise Exception(f"Ошибка получения коммитов: {e}")
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"Ошибка получения коммитов: {e}")
+
+        return self._cached_json("commits", [base_branch, branch], compute)
 
     def get_changed_files(self, branch: str, base_branch: Optional[str] = None) -> list:
         """
@@ -131,20 +664,26 @@ class GitHelper:
         """
         if not base_branch:
             base_branch = self.get_base_branch(branch)
+        if self.cache is not None:
+            base_branch, branch = self.resolve_commits(base_branch, branch)
 
-        try:
-            result = subprocess.run(
-                ["git", "diff", "--name-only", f"{base_branch}...{branch}"],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+        def compute() -> list:
+            try:
+                result = subprocess.run(
+                    ["git", "diff", "--name-only", f"{base_branch}...{branch}"],
+                    cwd=self.repo_path,
+                    capture_output=True,
+                    encoding="utf-8",
+                    errors="replace",
+                    check=True,
+                )
 
-            return [line.strip() for line in result.stdout.split("\n") if line.strip()]
+                return [line.strip() for line in result.stdout.split("\n") if line.strip()]
 
-        except subprocess.CalledProcessError as e:
-            raise Exception(f"Ошибка получения измененных файлов: {e}")
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"Ошибка получения измененных файлов: {e}")
+
+        return self._cached_json("files", [base_branch, branch], compute)
 
     def is_git_repo(self) -> bool:
         """Проверяет, является ли директория Git репозиторием"""
@@ -159,8 +698,14 @@ class GitHelper:
         except subprocess.CalledProcessError:
             return False
 
-    def get_repo_info(self) -> dict:
-        """Получает общую информацию о репозитории"""
+    def get_repo_info(self, include_branch: bool = True) -> dict:
+        """
+        Получает общую информацию о репозитории
+
+        Args:
+            include_branch: Определять текущую ветку (не нужно при работе по
+                явным SHA: в CI HEAD часто отсоединен, в bare репозитории его нет)
+        """
         if not self.is_git_repo():
             raise Exception("Директория не является Git репозиторием")
 
@@ -172,7 +717,8 @@ class GitHelper:
                 ["git", "config", "--get", "remote.origin.url"],
                 cwd=self.repo_path,
                 capture_output=True,
-                text=True,
+                encoding="utf-8",
+                errors="replace",
             )
             if remote_result.returncode == 0:
                 remote_url = remote_result.stdout.strip()
@@ -185,14 +731,16 @@ class GitHelper:
                 info["repo_name"] = repo_name
 
             # Текущая ветка
-            info["current_branch"] = self.get_current_branch()
+            if include_branch:
+                info["current_branch"] = self.get_current_branch()
 
             # Последний коммит
             last_commit_result = subprocess.run(
                 ["git", "log", "-1", "--pretty=format:%H %s"],
                 cwd=self.repo_path,
                 capture_output=True,
-                text=True,
+                encoding="utf-8",
+                errors="replace",
             )
             if last_commit_result.returncode == 0:
                 info["last_commit"] = last_commit_result.stdout.strip()
@@ -0,0 +1,130 @@
+"""
+Состояние endpoint'ов провайдеров и circuit breaker
+
+Для каждого endpoint'а (провайдер, адрес, модель) хранятся экспоненциально
+сглаженные доля ошибок и задержка и состояние автомата:
+
+    closed    - запросы идут как обычно
+    open      - после серии ошибок запросы сразу завершаются ошибкой
+    half_open - время open вышло, один пробный запрос решает, закрыть ли цепь
+
+Состояние лежит в JSON-файле и общее для всех процессов на машине.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from .base_provider import LLMProvider
+from .state_file import locked_state
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Endpoint недоступен: цепь разомкнута после серии ошибок"""
+
+
+class CircuitBreaker:
+    """Circuit breaker с общим для процессов состоянием в файле"""
+
+    def __init__(
+        self,
+        state_path: str,
+        failure_threshold: int = 5,
+        open_seconds: float = 60.0,
+        max_open_seconds: float = 900.0,
+        alpha: float = 0.3,
+    ):
+        self.state_path = state_path
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.alpha = alpha
+
+    def allow(self, endpoint: str):
+        """
+        Проверяет, можно ли отправить запрос на endpoint
+
+        Raises:
+            CircuitOpenError: Цепь разомкнута или пробный запрос уже выполняет другой процесс
+        """
+        now = time.time()
+        with locked_state(self.state_path) as state:
+            health = state.get(endpoint)
+            if health is None or health["state"] == CLOSED:
+                return
+            if now < health["retry_at"]:
+                raise CircuitOpenError(
+                    f"{endpoint} недоступен (ошибок подряд: {health['failures']}, "
+                    f"доля ошибок: {health['error_rate']:.0%}), "
+                    f"повтор через {health['retry_at'] - now:.0f} с"
+                )
+            # Пробный запрос; пока он идет, остальные процессы ждут его результата
+            health["state"] = HALF_OPEN
+            health["retry_at"] = now + self.open_seconds
+
+    def record(self, endpoint: str, ok: bool, latency: float):
+        """Учитывает результат запроса и переключает состояние цепи"""
+        now = time.time()
+        with locked_state(self.state_path) as state:
+            health = state.setdefault(
+                endpoint,
+                {
+                    "state": CLOSED,
+                    "failures": 0,
+                    "trips": 0,
+                    "error_rate": 0.0,
+                    "latency": latency,
+                    "retry_at": 0.0,
+                },
+            )
+            health["error_rate"] += self.alpha * ((0.0 if ok else 1.0) - health["error_rate"])
+            health["latency"] += self.alpha * (latency - health["latency"])
+            health["updated_at"] = now
+
+            if ok:
+                health.update(state=CLOSED, failures=0, trips=0, retry_at=0.0)
+                return
+
+            health["failures"] += 1
+            if health["state"] == HALF_OPEN or health["failures"] >= self.failure_threshold:
+                # Каждая неудачная проба удваивает время ожидания
+                health["trips"] += 1
+                delay = min(
+                    self.open_seconds * 2 ** (health["trips"] - 1), self.max_open_seconds
+                )
+                health.update(state=OPEN, retry_at=now + delay)
+
+    def snapshot(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        """Текущее состояние endpoint'а или None, если запросов еще не было"""
+        with locked_state(self.state_path) as state:
+            return state.get(endpoint)
+
+
+class HealthCheckedProvider(LLMProvider):
+    """Провайдер, запросы которого проходят через circuit breaker"""
+
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker, endpoint: str):
+        super().__init__(provider.api_key)
+        self.provider = provider
+        self.breaker = breaker
+        self.endpoint = endpoint
+
+    def build_prompt(self, diff_content: str, branch_name: str, **kwargs) -> str:
+        return self.provider.build_prompt(diff_content, branch_name, **kwargs)
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        self.breaker.allow(self.endpoint)
+        start = time.monotonic()
+        try:
+            result = self.provider.complete(prompt, **kwargs)
+        except Exception:
+            self.breaker.record(self.endpoint, False, time.monotonic() - start)
+            raise
+        self.breaker.record(self.endpoint, True, time.monotonic() - start)
+        return result
+
+    def get_model_name(self) -> str:
+        return self.provider.get_model_name()
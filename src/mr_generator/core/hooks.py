@@ -0,0 +1,99 @@
+"""
+Git hook'и для фоновой подготовки diff'а к генерации описания
+"""
+
+import os
+import shlex
+import stat
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from .state_file import file_lock
+
+# Hook'и, после которых ветка обычно готова к созданию MR
+HOOK_NAMES = ("post-commit", "pre-push")
+
+# Границы нашего блока внутри hook'а: остальное содержимое не трогаем
+MARKER_BEGIN = "# >>> mr-generator >>>"
+MARKER_END = "# <<< mr-generator <<<"
+
+
+def hook_block(command: List[str], env: Optional[Dict[str, str]] = None) -> str:
+    """
+    Блок hook'а, запускающий команду в фоне
+
+    Процесс отвязывается от git (nohup, без stdin/stdout), поэтому commit
+    и push не ждут окончания расчета.
+    """
+    assignments = " ".join(
+        f"{name}={shlex.quote(value)}" for name, value in (env or {}).items()
+    )
+    line = " ".join(shlex.quote(part) for part in command)
+    if assignments:
+        line = f"{assignments} nohup {line}"
+    else:
+        line = f"nohup {line}"
+    return "\n".join(
+        [
+            MARKER_BEGIN,
+            "# Фоновая подготовка diff'а для описания MR (не задерживает git)",
+            f"{line} </dev/null >/dev/null 2>&1 &",
+            MARKER_END,
+        ]
+    )
+
+
+def install_hook(path: str, block: str):
+    """Добавляет или обновляет наш блок в hook'е, сохраняя чужое содержимое"""
+    content = ""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+
+    if MARKER_BEGIN in content and MARKER_END in content:
+        start = content.index(MARKER_BEGIN)
+        end = content.index(MARKER_END, start) + len(MARKER_END)
+        content = content[:start] + block + content[end:]
+    elif content.startswith("#!"):
+        # Сразу после shebang: exit в конце чужого hook'а не помешает запуску
+        first_line_end = content.find("\n") + 1 or len(content)
+        content = content[:first_line_end] + block + "\n" + content[first_line_end:]
+    else:
+        content = "#!/bin/sh\n" + block + "\n" + content
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    mode = os.stat(path).st_mode
+    os.chmod(path, mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def install_hooks(
+    hooks_dir: str, command: List[str], env: Optional[Dict[str, str]] = None
+) -> List[str]:
+    """
+    Устанавливает hook'и post-commit и pre-push
+
+    Returns:
+        Пути установленных hook'ов
+    """
+    block = hook_block(command, env)
+    paths = []
+    for name in HOOK_NAMES:
+        path = os.path.join(hooks_dir, name)
+        install_hook(path, block)
+        paths.append(path)
+    return paths
+
+
+@contextmanager
+def precompute_lock(directory: str) -> Iterator[None]:
+    """
+    Блокировка, чтобы фоновые расчеты одного репозитория шли по очереди
+
+    При серии коммитов процессы ждут друг друга; каждый следующий считает
+    актуальную на момент запуска ветку, а уже посчитанное берется из кэша.
+    На Windows блокировки нет, расчеты могут идти параллельно.
+    """
+    with file_lock(os.path.join(directory, "precompute.lock")):
+        yield
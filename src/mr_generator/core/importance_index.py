@@ -0,0 +1,214 @@
+"""
+Индекс важности файлов репозитория для упаковки больших diff'ов
+
+Для каждого файла хранятся churn (число изменений с затуханием по времени),
+авторы и импортируемые модули. Важность складывается из churn'а, числа
+файлов, импортирующих модуль (fan-in), и числа авторов. Индекс лежит в
+.git/mr-generator и при обновлении читает только новые коммиты.
+"""
+
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+from .git_helper import GitHelper
+from .state_file import locked_state
+
+# Версия формата индекса: менять при изменении структуры записей
+INDEX_FORMAT = 1
+
+# Веса изменений считаются от 2020-01-01, чтобы не переполнять float
+CHURN_EPOCH = 1577836800
+
+# Сколько авторов файла запоминать (больше для оценки не нужно)
+MAX_AUTHORS = 8
+
+# Файлы больше этого размера не разбираются на импорты
+MAX_SOURCE_SIZE = 256 * 1024
+
+# Сколько байт содержимого blob'ов читать одним процессом git cat-file
+READ_BATCH_SIZE = 16 * 1024 * 1024
+
+_PYTHON_IMPORT_RE = re.compile(
+    rb"^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import|import[ \t]+([\w.]+))", re.M
+)
+_JS_IMPORT_RE = re.compile(
+    rb"""(?:\bfrom[ \t]+|\brequire\([ \t]*|\bimport[ \t]*\(?[ \t]*)['"]([^'"]+)['"]"""
+)
+
+_IMPORT_PATTERNS = {
+    ".py": _PYTHON_IMPORT_RE,
+    ".js": _JS_IMPORT_RE,
+    ".jsx": _JS_IMPORT_RE,
+    ".ts": _JS_IMPORT_RE,
+    ".tsx": _JS_IMPORT_RE,
+    ".mjs": _JS_IMPORT_RE,
+    ".vue": _JS_IMPORT_RE,
+}
+
+# Имена файлов пакета: модуль называется по каталогу
+_PACKAGE_STEMS = ("__init__", "index")
+
+
+def module_name(path: str) -> str:
+    """Короткое имя модуля файла, по которому его находят импорты"""
+    parts = path.replace("\\", "/").split("/")
+    stem = os.path.splitext(parts[-1])[0]
+    if stem in _PACKAGE_STEMS and len(parts) > 1:
+        stem = parts[-2]
+    return stem.lower()
+
+
+def extract_imports(path: str, content: bytes) -> List[str]:
+    """Короткие имена импортируемых модулей (последний компонент пути или имени)"""
+    pattern = _IMPORT_PATTERNS.get(os.path.splitext(path)[1].lower())
+    if pattern is None:
+        return []
+    modules = set()
+    for match in pattern.finditer(content):
+        name = next(group for group in match.groups() if group is not None)
+        name = name.decode("utf-8", errors="replace")
+        separator = "." if pattern is _PYTHON_IMPORT_RE else "/"
+        last = os.path.splitext(name.rstrip(separator).rsplit(separator, 1)[-1])[0]
+        if last and last not in (".", ".."):
+            modules.add(last.lower())
+    return sorted(modules)
+
+
+class ImportanceIndex:
+    """Инкрементальный индекс важности файлов в JSON-файле под блокировкой"""
+
+    def __init__(
+        self,
+        path: str,
+        git_helper: GitHelper,
+        half_life_days: float = 90.0,
+        max_commits: int = 10000,
+    ):
+        self.path = path
+        self.git_helper = git_helper
+        self.half_life = half_life_days * 24 * 3600
+        self.max_commits = max_commits
+
+    def update(self, head: str) -> int:
+        """
+        Добавляет в индекс коммиты до head, которых в нем еще нет
+
+        Если прошлый проиндексированный коммит не входит в историю head
+        (история переписана), индекс строится заново по последним
+        max_commits коммитам. История и blob'ы читаются без блокировки
+        файла индекса: другие процессы в это время читают прежний индекс.
+        Если индекс успел обновить другой процесс, результат отбрасывается.
+
+        Returns:
+            Количество прочитанных коммитов
+        """
+        with locked_state(self.path) as state:
+            last = state.get("head")
+            if last == head and state.get("format") == INDEX_FORMAT:
+                return 0
+            valid = state.get("format") == INDEX_FORMAT
+            # Состояние прочитано из файла заново: записи можно менять без копий
+            files = state.get("files", {}) if valid else {}
+
+        if last and valid and self.git_helper.is_ancestor(last, head):
+            revisions = [f"{last}..{head}"]
+        else:
+            files = {}
+            revisions = [head]
+
+        commits = self.git_helper.get_file_history(revisions, self.max_commits)
+        self._apply_commits(files, commits)
+
+        with locked_state(self.path) as state:
+            if state.get("head") != last:
+                # Другой процесс уже обновил индекс
+                return 0
+            state.clear()
+            state.update({"format": INDEX_FORMAT, "files": files, "head": head})
+        return len(commits)
+
+    def _apply_commits(self, files: Dict[str, dict], commits: List[Dict]):
+        """Добавляет в записи файлов churn, авторов и импорты из коммитов"""
+        newest_blobs: Dict[str, str] = {}
+        # От старых коммитов к новым: переименования применяются по порядку
+        for commit in reversed(commits):
+            weight = 2 ** ((commit["time"] - CHURN_EPOCH) / self.half_life)
+            for status, old_path, path, sha in commit["changes"]:
+                if status == "D":
+                    files.pop(path, None)
+                    newest_blobs.pop(path, None)
+                    continue
+                if status == "R" and old_path in files:
+                    entry = files.pop(old_path)
+                    newest_blobs.pop(old_path, None)
+                else:
+                    entry = files.get(path) or {
+                        "churn": 0.0, "commits": 0, "authors": [], "imports": []
+                    }
+                entry["churn"] += weight
+                entry["commits"] += 1
+                authors = entry["authors"]
+                if commit["author"] not in authors and len(authors) < MAX_AUTHORS:
+                    authors.append(commit["author"])
+                files[path] = entry
+                newest_blobs[path] = sha
+
+        # Импорты перечитываются только у файлов, измененных в новых коммитах
+        parsed = {
+            path: sha for path, sha in newest_blobs.items()
+            if os.path.splitext(path)[1].lower() in _IMPORT_PATTERNS
+        }
+        for blobs in self._read_sources(sorted(set(parsed.values()))):
+            for path, sha in parsed.items():
+                if sha in blobs:
+                    files[path]["imports"] = extract_imports(path, blobs[sha])
+
+    def _read_sources(self, shas: List[str]) -> Iterator[Dict[str, bytes]]:
+        """
+        Читает blob'ы не больше MAX_SOURCE_SIZE частями до READ_BATCH_SIZE байт
+
+        Размеры проверяются заранее (cat-file --batch-check), поэтому большие
+        файлы не читаются в память вовсе.
+        """
+        sizes = self.git_helper.get_blob_sizes(shas)
+        batch: List[str] = []
+        batch_size = 0
+        for sha in shas:
+            size = sizes.get(sha)
+            if size is None or size > MAX_SOURCE_SIZE:
+                continue
+            if batch and batch_size + size > READ_BATCH_SIZE:
+                yield self.git_helper.read_blobs(batch)
+                batch, batch_size = [], 0
+            batch.append(sha)
+            batch_size += size
+        if batch:
+            yield self.git_helper.read_blobs(batch)
+
+    def scores(self, paths: List[str], now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Важность файлов: log2 churn'а на текущий момент, fan-in и числа авторов
+
+        Файлы, которых нет в индексе (например, новые), получают 0.
+        """
+        with locked_state(self.path) as state:
+            files = state.get("files", {}) if state.get("format") == INDEX_FORMAT else {}
+            fan_in = Counter(module for entry in files.values() for module in entry["imports"])
+
+        decay = 2 ** (-((now or time.time()) - CHURN_EPOCH) / self.half_life)
+        result = {}
+        for path in paths:
+            entry = files.get(path)
+            if entry is None:
+                result[path] = 0.0
+                continue
+            result[path] = (
+                math.log2(1 + entry["churn"] * decay)
+                + math.log2(1 + fan_in[module_name(path)])
+                + 0.5 * math.log2(1 + len(entry["authors"]))
+            )
+        return result
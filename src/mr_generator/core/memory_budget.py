@@ -0,0 +1,103 @@
+"""
+Ограничение памяти одного запуска
+
+В режиме с лимитом (--max-memory) вывод git diff не собирается в памяти,
+а пишется во временный файл и отображается в память (mmap). Разбор diff'а
+хранит только смещения в этом буфере, поэтому страницы diff'а читаются с
+диска по мере обработки файлов, и ядро может вытеснить их без OOM: они не
+занимают анонимную память процесса.
+"""
+
+import mmap
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import BinaryIO, List, Optional, Union
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(value: str) -> int:
+    """Размер из строки вида "2G", "512M", "1.5g" или числа байт"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*", str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Некорректный размер памяти: {value} (пример: 2G, 512M)")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def format_size(size: int) -> str:
+    """Размер в мегабайтах для вывода"""
+    return f"{size / 1024 ** 2:,.0f} МБ"
+
+
+def peak_rss() -> Optional[int]:
+    """Пиковый объем резидентной памяти процесса в байтах (None, если неизвестен)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss() -> Optional[int]:
+    """Текущий объем резидентной памяти процесса в байтах"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss()
+
+
+def map_file(spool: BinaryIO) -> Union[mmap.mmap, bytes]:
+    """
+    Отображает временный файл в память только для чтения и закрывает его
+
+    Пустой файл отобразить нельзя, для него возвращаются пустые байты.
+    """
+    spool.flush()
+    size = spool.seek(0, os.SEEK_END)
+    if size == 0:
+        spool.close()
+        return b""
+    buffer = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+    spool.close()
+    if hasattr(buffer, "madvise"):
+        # Diff читается от начала к концу: ядро заранее подгружает следующие страницы
+        buffer.madvise(mmap.MADV_SEQUENTIAL)
+    return buffer
+
+
+class MemoryBudget:
+    """Лимит памяти запуска и временные файлы для данных, которые в него не входят"""
+
+    def __init__(self, max_bytes: int, spool_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.spool_dir = spool_dir
+
+    def spool_file(self) -> BinaryIO:
+        """Временный файл, который удаляется при закрытии"""
+        return tempfile.TemporaryFile(dir=self.spool_dir, prefix="mr-generator-")
+
+    @staticmethod
+    def run_to_file(command: List[str], cwd: str, target: BinaryIO):
+        """Запускает команду с выводом прямо в файл target, минуя память процесса"""
+        result = subprocess.run(command, cwd=cwd, stdout=target, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, command, stderr=result.stderr)
+
+    def can_allocate(self, size: int) -> bool:
+        """Поместится ли еще size байт анонимной памяти в лимит"""
+        rss = current_rss()
+        return rss is None or rss + size <= self.max_bytes
+
+    def report(self) -> str:
+        """Строка о пиковой памяти процесса относительно лимита"""
+        peak = peak_rss()
+        if peak is None:
+            return f"лимит {format_size(self.max_bytes)}, пиковая память неизвестна"
+        mark = "⚠️ " if peak > self.max_bytes else ""
+        return f"{mark}пиковая память {format_size(peak)} из {format_size(self.max_bytes)}"
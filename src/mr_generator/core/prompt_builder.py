@@ -0,0 +1,130 @@
+"""
+Построение промптов из шаблонов для всех провайдеров
+"""
+
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+from ..config import PROMPT_TEMPLATES
+
+# Плейсхолдеры, которые умеет заполнять построитель промптов
+PROMPT_FIELDS = (
+    "branch_name",
+    "diff_content",
+    "repo_name",
+    "changed_files_count",
+    "commits_count",
+    "mr_type",
+)
+
+
+class PromptTemplate:
+    """Шаблон промпта, заранее разобранный на сегменты"""
+
+    def __init__(self, key: str, text: str):
+        self.key = key
+        self.segments: List[Tuple[str, Optional[str]]] = self._compile(key, text)
+        self.fields = frozenset(field for _, field in self.segments if field)
+
+    @staticmethod
+    def _compile(key: str, text: str) -> List[Tuple[str, Optional[str]]]:
+        """Разбирает шаблон на пары (литерал, плейсхолдер) и проверяет плейсхолдеры"""
+        segments = []
+        for literal, field, format_spec, conversion in Formatter().parse(text):
+            if field is not None:
+                if field not in PROMPT_FIELDS:
+                    raise ValueError(
+                        f"Неизвестный плейсхолдер '{{{field}}}' в шаблоне '{key}'. "
+                        f"Доступные: {', '.join(PROMPT_FIELDS)}"
+                    )
+                if format_spec or conversion:
+                    raise ValueError(
+                        f"Форматирование плейсхолдера '{{{field}}}' в шаблоне '{key}' "
+                        f"не поддерживается"
+                    )
+            segments.append((literal, field))
+        return segments
+
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Собирает промпт из сегментов
+
+        diff_content вставляется как есть, без промежуточного форматирования,
+        поэтому итоговая строка - единственная копия diff'а в промпте.
+        """
+        parts = []
+        for literal, field in self.segments:
+            if literal:
+                parts.append(literal)
+            if field:
+                parts.append(values[field])
+        return "".join(parts)
+
+
+class PromptBuilder:
+    """Единый построитель промптов для всех провайдеров"""
+
+    def __init__(self, templates: Dict[str, str]):
+        self.templates = {
+            key: PromptTemplate(key, text) for key, text in templates.items()
+        }
+
+    def get_template(
+        self, prompt_type: str, language: str, mr_type: Optional[str] = None
+    ) -> PromptTemplate:
+        """
+        Выбирает шаблон по типу промпта и языку с fallback к базовому
+
+        Тип MR попадает во все шаблоны через плейсхолдер {mr_type}; отдельный
+        шаблон для типа ({prompt_type}_{mr_type}_{language}), если он добавлен
+        в config, имеет приоритет. Шаблон без языка ({prompt_type}) подходит
+        для любого языка.
+        """
+        keys = [f"{prompt_type}_{language}", prompt_type, f"basic_{language}", "basic_ru"]
+        if mr_type:
+            keys.insert(0, f"{prompt_type}_{mr_type}_{language}")
+        for key in keys:
+            if key in self.templates:
+                return self.templates[key]
+        raise ValueError(f"Шаблон промпта для '{prompt_type}_{language}' не найден")
+
+    def build(self, diff_content: str, branch_name: str, **kwargs) -> str:
+        """
+        Строит промпт для генерации описания
+
+        Args:
+            diff_content: Содержимое git diff (возможно, уже сокращенное)
+            branch_name: Название ветки
+            **kwargs: language, prompt_type, mr_type, changed_files, commit_messages,
+                commits_count (если список коммитов сжат), repo_name
+
+        Returns:
+            Готовый текст промпта
+        """
+        template = self.get_template(
+            kwargs.get("prompt_type", "detailed"),
+            kwargs.get("language", "ru"),
+            kwargs.get("mr_type"),
+        )
+        values = {
+            "branch_name": branch_name,
+            "diff_content": diff_content,
+            "repo_name": kwargs.get("repo_name") or "Unknown",
+            "changed_files_count": str(len(kwargs.get("changed_files", []))),
+            "commits_count": str(
+                kwargs.get("commits_count", len(kwargs.get("commit_messages", [])))
+            ),
+            "mr_type": kwargs.get("mr_type") or "default",
+        }
+        return template.render(values)
+
+
+_default_builder: Optional[PromptBuilder] = None
+
+
+def get_prompt_builder() -> PromptBuilder:
+    """Возвращает построитель промптов по шаблонам из config (создается один раз)"""
+    global _default_builder
+    if _default_builder is None:
+        _default_builder = PromptBuilder(PROMPT_TEMPLATES)
+    return _default_builder
@@ -0,0 +1,111 @@
+"""
+Ограничение частоты запросов к провайдеру, общее для процессов на машине
+
+Два token bucket'а на API ключ: запросы в минуту и токены в минуту. Запрос
+сразу резервирует свою долю (баланс может уйти в минус) и ждет, пока баланс
+не восстановится. Процессы становятся в очередь в порядке резервирования,
+и суммарный поток держится у лимита, без всплесков и 429.
+"""
+
+import hashlib
+import time
+from typing import Optional
+
+from .base_provider import LLMProvider
+from .state_file import locked_state
+from .tokens import estimate_tokens
+
+
+class RateLimitExceeded(Exception):
+    """Ожидание свободного лимита дольше допустимого"""
+
+
+class RateLimiter:
+    """Token bucket'ы запросов и токенов с состоянием в общем файле"""
+
+    def __init__(
+        self,
+        state_path: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_wait: float = 300.0,
+    ):
+        self.state_path = state_path
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+
+    @staticmethod
+    def make_key(provider_name: str, api_key: str) -> str:
+        """Ключ лимита: провайдер и хэш API ключа (сам ключ в файл не пишется)"""
+        digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        return f"{provider_name}-{digest}"
+
+    def reserve(self, key: str, tokens: int) -> float:
+        """
+        Резервирует запрос и tokens токенов
+
+        Returns:
+            Сколько секунд нужно подождать перед отправкой запроса
+
+        Raises:
+            RateLimitExceeded: Ожидание дольше max_wait (резерв не выполняется)
+        """
+        buckets = []
+        if self.requests_per_minute:
+            buckets.append(("requests", self.requests_per_minute, 1))
+        if self.tokens_per_minute:
+            # Запрос больше минутного лимита ждет полного bucket'а, а не вечно
+            buckets.append(
+                ("tokens", self.tokens_per_minute, min(tokens, self.tokens_per_minute))
+            )
+        if not buckets:
+            return 0.0
+
+        now = time.time()
+        with locked_state(self.state_path) as state:
+            entry = state.get(key, {})
+            elapsed = max(now - entry.get("updated_at", now), 0.0)
+            balances = {}
+            wait = 0.0
+            for name, per_minute, amount in buckets:
+                rate = per_minute / 60.0
+                balance = min(entry.get(name, per_minute) + elapsed * rate, per_minute)
+                balances[name] = balance - amount
+                wait = max(wait, -balances[name] / rate)
+
+            if wait > self.max_wait:
+                raise RateLimitExceeded(
+                    f"Лимит запросов {key} исчерпан: ожидание {wait:.0f} с "
+                    f"больше допустимых {self.max_wait:.0f} с"
+                )
+            entry.update(balances)
+            entry["updated_at"] = now
+            state[key] = entry
+        return wait
+
+
+class RateLimitedProvider(LLMProvider):
+    """Провайдер, запросы которого ждут свободного лимита запросов и токенов"""
+
+    def __init__(self, provider: LLMProvider, limiter: RateLimiter, key: str):
+        super().__init__(provider.api_key)
+        self.provider = provider
+        self.limiter = limiter
+        self.key = key
+
+    def build_prompt(self, diff_content: str, branch_name: str, **kwargs) -> str:
+        return self.provider.build_prompt(diff_content, branch_name, **kwargs)
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        # Лимит TPM считает и промпт, и ответ: резервируем ответ по max_tokens
+        tokens = estimate_tokens(len(prompt)) + kwargs.get("max_tokens", 1000)
+        wait = self.limiter.reserve(self.key, tokens)
+        if wait > 0:
+            if wait >= 1:
+                print(f"⏳ Ждем лимита запросов {self.provider.get_model_name()}: {wait:.0f} с")
+            time.sleep(wait)
+        return self.provider.complete(prompt, **kwargs)
+
+    def get_model_name(self) -> str:
+        return self.provider.get_model_name()
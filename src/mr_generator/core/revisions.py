@@ -0,0 +1,77 @@
+"""
+Явные SHA коммитов MR (--base-sha / --head-sha / --from-ci-env)
+
+Режим для CI и bare/mirror клонов: diff строится между двумя коммитами,
+поэтому не нужны ни рабочая копия, ни текущая ветка, ни поиск базовой
+ветки по имени. Все используемые команды git (merge-base, diff, log,
+cat-file) работают с объектами репозитория и не читают файлы checkout'а.
+"""
+
+import json
+import os
+from typing import List, Mapping, NamedTuple, Optional
+
+from ..config import CI_REVISION_VARIABLES
+
+
+class Revisions(NamedTuple):
+    """Коммиты MR и имя ветки для промпта (если известно)"""
+
+    base: str
+    head: str
+    branch: Optional[str] = None
+    source: str = "аргументы"
+
+
+def _first(env: Mapping[str, str], names: List[str]) -> Optional[str]:
+    """Значение первой непустой переменной окружения из списка"""
+    for name in names:
+        value = env.get(name, "").strip()
+        if value:
+            return value
+    return None
+
+
+def _github_revisions(env: Mapping[str, str]) -> Optional[Revisions]:
+    """SHA из файла события GitHub Actions (pull_request, pull_request_target)"""
+    event_path = env.get("GITHUB_EVENT_PATH")
+    if not event_path:
+        return None
+    try:
+        with open(event_path, encoding="utf-8") as f:
+            event = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    pull_request = event.get("pull_request") if isinstance(event, dict) else None
+    if not isinstance(pull_request, dict):
+        return None
+    base = (pull_request.get("base") or {}).get("sha")
+    head = (pull_request.get("head") or {}).get("sha")
+    if not base or not head:
+        return None
+    branch = env.get("GITHUB_HEAD_REF") or (pull_request.get("head") or {}).get("ref")
+    return Revisions(base, head, branch or None, "GitHub Actions")
+
+
+def read_ci_revisions(environ: Optional[Mapping[str, str]] = None) -> Optional[Revisions]:
+    """
+    Находит SHA коммитов MR в переменных окружения CI
+
+    Args:
+        environ: Переменные окружения (по умолчанию os.environ)
+
+    Returns:
+        Коммиты первого источника, в котором заданы и base, и head, или None
+    """
+    if environ is None:
+        environ = os.environ
+
+    for variables in CI_REVISION_VARIABLES:
+        base = _first(environ, variables["base"])
+        head = _first(environ, variables["head"])
+        if base and head:
+            return Revisions(base, head, _first(environ, variables["branch"]),
+                             variables["source"])
+    return _github_revisions(environ)
+
@@ -0,0 +1,91 @@
+"""
+Стек веток (feature-1 → feature-2 → feature-3) для пакетной генерации
+
+Diff каждой ветки стека относительно main повторяет изменения всех
+предыдущих веток. Пакетная генерация сравнивает ветку с ближайшей
+предыдущей веткой стека, а изменения предыдущих веток передает в промпт
+короткой сводкой из их уже готовых описаний.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Максимальная длина сводки описания предыдущей ветки в контексте промпта
+SUMMARY_MAX_CHARS = 300
+
+
+def build_stack(
+    heads: Dict[str, str], is_ancestor: Callable[[str, str], bool]
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    Упорядочивает ветки стека и находит для каждой родительскую ветку
+
+    Args:
+        heads: SHA последнего коммита каждой ветки
+        is_ancestor: is_ancestor(a, b) - коммит a является предком коммита b
+
+    Returns:
+        Пары (ветка, родительская ветка или None) так, что родитель всегда
+        идет раньше потомка. Родитель - ближайшая из запрошенных веток,
+        последний коммит которой входит в историю ветки.
+    """
+    ancestors: Dict[str, List[str]] = {}
+    for branch, head in heads.items():
+        ancestors[branch] = [
+            other
+            for other, other_head in heads.items()
+            if other_head != head and is_ancestor(other_head, head)
+        ]
+
+    stack = []
+    # У предка строго меньше предков среди запрошенных веток, чем у потомка
+    for branch in sorted(heads, key=lambda name: len(ancestors[name])):
+        parent = max(ancestors[branch], key=lambda name: len(ancestors[name]), default=None)
+        stack.append((branch, parent))
+    return stack
+
+
+def stack_ancestors(parent: Optional[str], parents: Dict[str, Optional[str]]) -> List[str]:
+    """Цепочка предков ветки с родителем parent, от основания стека"""
+    chain = []
+    while parent:
+        chain.insert(0, parent)
+        parent = parents[parent]
+    return chain
+
+
+def summarize_description(description: str, max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    """Первый абзац описания без заголовков и маркеров списка"""
+    lines = []
+    for line in description.splitlines():
+        line = line.strip().lstrip("•-* ").strip()
+        if not line or line.startswith("#"):
+            if lines:
+                break
+            continue
+        lines.append(line)
+    summary = " ".join(lines)
+    if len(summary) > max_chars:
+        summary = summary[: max_chars - 1].rstrip() + "…"
+    return summary
+
+
+def stack_context(ancestors: List[Tuple[str, str]]) -> str:
+    """
+    Контекст стека для промпта ветки
+
+    Args:
+        ancestors: Пары (ветка, сводка ее описания) от основания стека
+
+    Returns:
+        Текст перед diff'ом или пустая строка для ветки без предков
+    """
+    if not ancestors:
+        return ""
+    lines = ["=== СТЕК ВЕТОК ===", ""]
+    lines.append(
+        "Ветка продолжает " + " → ".join(branch for branch, _ in ancestors)
+        + ". Изменения этих веток описаны в их MR и в diff не входят:"
+    )
+    for branch, summary in ancestors:
+        lines.append(f"  {branch}: {summary}" if summary else f"  {branch}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,76 @@
+"""
+Общее состояние нескольких процессов в JSON-файле под блокировкой
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+def default_state_dir() -> str:
+    """Каталог общего состояния процессов (~/.cache/mr-generator)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "mr-generator")
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Эксклюзивная блокировка файла (fcntl.flock), ожидает освобождения
+
+    На Windows блокировка не поддерживается и не выполняется.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def locked_state(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Читает состояние из JSON-файла и записывает изменения обратно
+
+    Все время работы блока файл заблокирован для других процессов (отдельный
+    файл .lock), поэтому чтение-изменение-запись атомарны. Поврежденный или
+    отсутствующий файл читается как пустое состояние.
+    """
+    with file_lock(path + ".lock"):
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if not isinstance(state, dict):
+                state = {}
+        except (OSError, ValueError):
+            state = {}
+        original = json.dumps(state, sort_keys=True)
+
+        yield state
+
+        content = json.dumps(state, sort_keys=True)
+        if content == original:
+            return
+        # Атомарная замена: читатель без блокировки не увидит недописанный файл
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,157 @@
+"""
+Структурированное описание MR и его локальный рендеринг во все форматы
+
+Модель один раз возвращает JSON с описанием на двух языках (шаблон промпта
+"structured"); варианты basic, detailed и concise на ru и en собираются из
+него без дополнительных запросов.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+PROMPT_TYPES = ("basic", "detailed", "concise")
+LANGUAGES = ("ru", "en")
+
+# Разделы подробного описания: ключ в JSON и заголовки на двух языках
+CHANGE_SECTIONS = (
+    ("code", "Код", "Code"),
+    ("config", "Конфигурация", "Configuration"),
+    ("tests", "Тесты", "Tests"),
+)
+
+HEADINGS = {
+    "ru": {
+        "changes": "Изменения",
+        "purpose": "Цель",
+        "components": "Компоненты",
+        "files": "Файлы",
+        "summary": "📋 Сводка",
+        "detailed_changes": "🔧 Изменения",
+        "detailed_purpose": "🎯 Цель",
+        "technical": "🏗️ Технические детали",
+        "key_files": "📁 Ключевые файлы",
+    },
+    "en": {
+        "changes": "Changes",
+        "purpose": "Purpose",
+        "components": "Components",
+        "files": "Files",
+        "summary": "📋 Summary",
+        "detailed_changes": "🔧 Changes",
+        "detailed_purpose": "🎯 Purpose",
+        "technical": "🏗️ Technical Details",
+        "key_files": "📁 Key Files",
+    },
+}
+
+
+def parse_structured(response: str) -> Dict[str, Any]:
+    """
+    Извлекает JSON описания из ответа модели
+
+    Модели часто оборачивают JSON в блок ```json или добавляют текст вокруг,
+    поэтому берется фрагмент от первой { до последней }.
+    """
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not match:
+        raise ValueError("Ответ модели не содержит JSON описания")
+    try:
+        data = json.loads(match.group(0))
+    except ValueError as e:
+        raise ValueError(f"Ответ модели содержит некорректный JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("JSON описания должен быть объектом")
+    return data
+
+
+def _text(value: Any, language: str) -> str:
+    """Текст на нужном языке: {"ru": ..., "en": ...} или одна строка для обоих"""
+    if isinstance(value, dict):
+        text = value.get(language) or next(
+            (item for item in value.values() if isinstance(item, str) and item), ""
+        )
+    else:
+        text = value
+    return str(text or "").strip()
+
+
+def _items(value: Any, language: str) -> List[str]:
+    """Непустые пункты списка на нужном языке"""
+    if not isinstance(value, list):
+        return []
+    return [text for text in (_text(item, language) for item in value) if text]
+
+
+def _files(data: Dict[str, Any], language: str) -> List[Tuple[str, str]]:
+    """Пары (путь, что изменено) ключевых файлов"""
+    files = []
+    for item in data.get("files") or []:
+        if isinstance(item, dict) and item.get("path"):
+            files.append((str(item["path"]), _text(item.get("change", item), language)))
+    return files
+
+
+def _bullets(items: List[str]) -> List[str]:
+    return [f"• {item}" for item in items]
+
+
+def _file_bullets(files: List[Tuple[str, str]]) -> List[str]:
+    return [f"• `{path}` - {change}" if change else f"• `{path}`" for path, change in files]
+
+
+def _all_changes(data: Dict[str, Any], language: str) -> List[str]:
+    changes = data.get("changes") or {}
+    if not isinstance(changes, dict):
+        return _items(changes, language)
+    return [item for key, _, _ in CHANGE_SECTIONS for item in _items(changes.get(key), language)]
+
+
+def render_description(data: Dict[str, Any], prompt_type: str, language: str) -> str:
+    """Собирает описание в формате prompt_type на языке language"""
+    headings = HEADINGS[language]
+    purpose = _text(data.get("purpose"), language)
+    files = _files(data, language)
+
+    if prompt_type == "basic":
+        blocks = [
+            [f"## {headings['changes']}", *_bullets(_all_changes(data, language))],
+            [f"## {headings['purpose']}", purpose],
+            [f"## {headings['components']}", *_bullets([path for path, _ in files])],
+        ]
+    elif prompt_type == "concise":
+        highlights = _items(data.get("highlights"), language) or _all_changes(data, language)
+        blocks = [
+            [f"## {headings['changes']}", *_bullets(highlights)],
+            [f"## {headings['purpose']}", purpose],
+            [f"## {headings['files']}", *_file_bullets(files)],
+        ]
+    elif prompt_type == "detailed":
+        changes = data.get("changes") if isinstance(data.get("changes"), dict) else {}
+        change_lines = [f"## {headings['detailed_changes']}"]
+        for key, title_ru, title_en in CHANGE_SECTIONS:
+            items = _items(changes.get(key), language)
+            if items:
+                title = title_ru if language == "ru" else title_en
+                change_lines += ["", f"### {title}", *_bullets(items)]
+        blocks = [
+            [f"## {headings['summary']}", _text(data.get("summary"), language)],
+            change_lines,
+            [f"## {headings['detailed_purpose']}", purpose],
+            [f"## {headings['technical']}", *_bullets(_items(data.get("technical"), language))],
+            [f"## {headings['key_files']}", *_file_bullets(files)],
+        ]
+    else:
+        raise ValueError(f"Неизвестный тип описания: {prompt_type}")
+
+    # Разделы без содержимого не выводим
+    return "\n\n".join("\n".join(block) for block in blocks if any(block[1:]))
+
+
+def render_all(data: Dict[str, Any]) -> Dict[Tuple[str, str], str]:
+    """Все варианты описания: ключ - (тип, язык)"""
+    return {
+        (prompt_type, language): render_description(data, prompt_type, language)
+        for prompt_type in PROMPT_TYPES
+        for language in LANGUAGES
+    }
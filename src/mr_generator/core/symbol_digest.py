@@ -0,0 +1,182 @@
+"""
+Сводка изменений на уровне символов (функции, классы, сигнатуры)
+"""
+
+import ast
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .git_helper import GitHelper
+
+# Blob'ы больше этого размера не разбираются
+MAX_BLOB_SIZE = 1024 * 1024
+
+# SHA отсутствующего blob'а (файл добавлен или удален)
+NULL_SHA = "0" * 40
+
+# Символ: (вид, сигнатура, хэш содержимого)
+Symbol = Tuple[str, str, str]
+
+
+def _format_arguments(args: ast.arguments) -> str:
+    """Компактная запись аргументов функции без аннотаций и значений по умолчанию"""
+    positional = list(getattr(args, "posonlyargs", [])) + list(args.args)
+    defaults_start = len(positional) - len(args.defaults)
+    parts = []
+    for index, arg in enumerate(positional):
+        parts.append(arg.arg + ("=…" if index >= defaults_start else ""))
+    if args.vararg:
+        parts.append("*" + args.vararg.arg)
+    elif args.kwonlyargs:
+        parts.append("*")
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        parts.append(arg.arg + ("=…" if default is not None else ""))
+    if args.kwarg:
+        parts.append("**" + args.kwarg.arg)
+    return ", ".join(parts)
+
+
+def _digest(node: ast.AST) -> str:
+    return hashlib.sha1(ast.dump(node).encode("utf-8")).hexdigest()
+
+
+def parse_python_symbols(source: bytes) -> Optional[Dict[str, Symbol]]:
+    """
+    Собирает функции и классы модуля Python
+
+    Returns:
+        Словарь "квалифицированное имя -> символ" или None при синтаксической ошибке
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    symbols: Dict[str, Symbol] = {}
+
+    def visit(body: List[ast.stmt], prefix: str):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+                name = prefix + node.name
+                signature = f"{kind} {name}({_format_arguments(node.args)})"
+                symbols[name] = (kind, signature, _digest(node))
+                visit(node.body, name + ".")
+            elif isinstance(node, ast.ClassDef):
+                name = prefix + node.name
+                bases = ", ".join(
+                    base.id if isinstance(base, ast.Name) else "…" for base in node.bases
+                )
+                signature = f"class {name}({bases})" if bases else f"class {name}"
+                # Изменения методов не считаются изменением самого класса
+                own = [
+                    child
+                    for child in node.body
+                    if not isinstance(
+                        child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+                    )
+                ]
+                content = ast.Module(body=own + node.bases, type_ignores=[])
+                symbols[name] = ("class", signature, _digest(content))
+                visit(node.body, name + ".")
+
+    visit(tree.body, "")
+    return symbols
+
+
+# Разборщики символов по расширению файла
+SYMBOL_PARSERS: Dict[str, Callable[[bytes], Optional[Dict[str, Symbol]]]] = {
+    ".py": parse_python_symbols,
+    ".pyi": parse_python_symbols,
+}
+
+
+def _extension(path: str) -> str:
+    name = path.rsplit("/", 1)[-1]
+    return "." + name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+class SymbolDigest:
+    """Сводка добавленных, удаленных и измененных символов по файлам"""
+
+    def __init__(self, git_helper: GitHelper, cache_size: int = 4096):
+        self.git_helper = git_helper
+        self.cache_size = cache_size
+        # Результат разбора для каждого SHA blob'а
+        self._cache: "OrderedDict[str, Optional[Dict[str, Symbol]]]" = OrderedDict()
+
+    def _parse_blobs(self, blobs: List[Tuple[str, str]]):
+        """Разбирает blob'ы, которых еще нет в кэше"""
+        missing = [sha for sha, _ in blobs if sha not in self._cache and sha != NULL_SHA]
+        contents = self.git_helper.read_blobs(list(dict.fromkeys(missing)))
+        for sha, path in blobs:
+            if sha in self._cache or sha == NULL_SHA:
+                continue
+            content = contents.get(sha)
+            parser = SYMBOL_PARSERS.get(_extension(path))
+            if parser is None or content is None or len(content) > MAX_BLOB_SIZE:
+                symbols = None
+            else:
+                symbols = parser(content)
+            self._cache[sha] = symbols
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _symbols(self, sha: str) -> Optional[Dict[str, Symbol]]:
+        if sha == NULL_SHA:
+            return {}
+        return self._cache.get(sha)
+
+    def build(self, changes: List[Dict[str, str]]) -> List[str]:
+        """
+        Строит сводку по списку изменений из GitHelper.get_raw_changes
+
+        Returns:
+            Строки сводки; файлы без изменений символов не попадают в нее
+        """
+        supported = [
+            change
+            for change in changes
+            if _extension(change["path"]) in SYMBOL_PARSERS
+            and change["old_sha"] != change["new_sha"]
+        ]
+        blobs = []
+        for change in supported:
+            # Старая версия разбирается по новому пути: при переименовании
+            # script -> script.py у старого пути нет разборщика
+            blobs.append((change["old_sha"], change["path"]))
+            blobs.append((change["new_sha"], change["path"]))
+        self._parse_blobs(blobs)
+
+        lines = []
+        for change in supported:
+            old = self._symbols(change["old_sha"])
+            new = self._symbols(change["new_sha"])
+            if old is None or new is None:
+                continue
+            entries = self.compare(old, new)
+            if entries:
+                lines.append(change["path"])
+                lines.extend(f"  {entry}" for entry in entries)
+        return lines
+
+    @staticmethod
+    def compare(old: Dict[str, Symbol], new: Dict[str, Symbol]) -> List[str]:
+        """Сравнивает символы двух версий файла"""
+        entries = []
+        for name, (_, signature, _) in new.items():
+            if name not in old:
+                entries.append(f"+ {signature}")
+        for name, (_, signature, _) in old.items():
+            if name not in new:
+                entries.append(f"- {signature}")
+        for name, (_, signature, digest) in new.items():
+            if name not in old:
+                continue
+            _, old_signature, old_digest = old[name]
+            if old_signature != signature:
+                entries.append(f"~ {old_signature} → {signature}")
+            elif old_digest != digest:
+                entries.append(f"~ {signature}")
+        return entries
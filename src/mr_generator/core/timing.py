@@ -0,0 +1,33 @@
+"""
+Замер времени этапов генерации описания
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class PhaseTimer:
+    """Время по этапам; повторные замеры одного этапа суммируются"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Замеряет время выполнения блока"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def format_lines(self) -> List[str]:
+        """Строки отчета для вывода пользователю"""
+        lines = [f"{name}: {seconds * 1000:,.0f} мс" for name, seconds in self.phases.items()]
+        lines.append(f"всего: {self.total * 1000:,.0f} мс")
+        return lines
@@ -0,0 +1,10 @@
+"""
+Грубая оценка количества токенов
+"""
+
+from ..config import CHARS_PER_TOKEN
+
+
+def estimate_tokens(size: int) -> int:
+    """Оценивает количество токенов по размеру текста в символах"""
+    return (size + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
@@ -0,0 +1,110 @@
+"""
+Составной провайдер: цепочка резервных моделей и гонка запросов
+"""
+
+import queue
+import threading
+import time
+from typing import List, Optional
+from ..core.base_provider import LLMProvider
+
+
+class FallbackProvider(LLMProvider):
+    """
+    Отправляет один промпт нескольким провайдерам и возвращает первый успешный ответ
+
+    Режимы запуска:
+        fallback  - следующий провайдер запускается, только если предыдущий вернул ошибку
+        staggered - следующий запускается и при ошибке, и если ответа нет за hedge_delay секунд
+        parallel  - все провайдеры запускаются сразу
+
+    Запрос, ответивший позже победителя, не ждем: его результат отбрасывается.
+    """
+
+    RACE_MODES = ('fallback', 'staggered', 'parallel')
+
+    def __init__(self, providers: List[LLMProvider], race_mode: str = 'fallback',
+                 hedge_delay: float = 3.0, latency_budget: Optional[float] = None):
+        super().__init__('')
+        if not providers:
+            raise ValueError("Нужен хотя бы один провайдер")
+        if race_mode not in self.RACE_MODES:
+            raise ValueError(f"Неизвестный режим: {race_mode}. Доступные: {list(self.RACE_MODES)}")
+        self.providers = providers
+        self.race_mode = race_mode
+        self.hedge_delay = hedge_delay
+        self.latency_budget = latency_budget
+
+    def build_prompt(self, diff_content: str, branch_name: str, **kwargs) -> str:
+        """Промпт собирает основной провайдер, остальным отправляется он же"""
+        return self.providers[0].build_prompt(diff_content, branch_name, **kwargs)
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        """Отправляет промпт по цепочке провайдеров с учетом режима и бюджета времени"""
+        results: "queue.Queue" = queue.Queue()
+        pending = list(self.providers)
+        errors = []
+        running = 0
+        start = time.monotonic()
+        deadline = start + self.latency_budget if self.latency_budget else None
+
+        def run(provider: LLMProvider):
+            try:
+                results.put((provider, provider.complete(prompt, **kwargs), None))
+            except Exception as e:
+                results.put((provider, None, e))
+
+        def launch():
+            nonlocal running, next_launch
+            provider = pending.pop(0)
+            if running:
+                print(f"🏁 Параллельно запрашиваем {provider.get_model_name()}")
+            # daemon: отставший запрос не задерживает завершение программы
+            threading.Thread(target=run, args=(provider,), daemon=True).start()
+            running += 1
+            next_launch = time.monotonic() + self.hedge_delay
+
+        next_launch = start
+        launch()
+        while self.race_mode == 'parallel' and pending:
+            launch()
+
+        while running:
+            now = time.monotonic()
+            waits = []
+            if deadline is not None:
+                waits.append(deadline - now)
+            if self.race_mode == 'staggered' and pending:
+                waits.append(next_launch - now)
+            timeout = max(min(waits), 0) if waits else None
+
+            try:
+                provider, text, error = results.get(timeout=timeout)
+            except queue.Empty:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if self.race_mode == 'staggered' and pending and now >= next_launch:
+                    launch()
+                continue
+
+            running -= 1
+            if error is None:
+                if len(self.providers) > 1:
+                    print(f"✅ Ответ от {provider.get_model_name()} "
+                          f"за {time.monotonic() - start:.1f} с")
+                return text
+
+            errors.append(f"{provider.get_model_name()}: {error}")
+            if pending:
+                print(f"⚠️  Ошибка {provider.get_model_name()}, "
+                      f"переключаемся на {pending[0].get_model_name()}")
+                launch()
+
+        if running:
+            errors.append(f"нет ответа за {self.latency_budget:g} с")
+        raise Exception(f"Ошибка генерации: ни один провайдер не ответил ({'; '.join(errors)})")
+
+    def get_model_name(self) -> str:
+        """Возвращает названия моделей в порядке цепочки"""
+        return ' → '.join(provider.get_model_name() for provider in self.providers)
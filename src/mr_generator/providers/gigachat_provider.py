@@ -7,6 +7,8 @@ import requests
 import uuid
 from typing import Dict, Any
 from ..core.base_provider import LLMProvider
+from ..core.prompt_builder import get_prompt_builder
+from ..core.file_classifier import detect_mr_type
 
 
 class GigaChatProvider(LLMProvider):
@@ -45,10 +47,8 @@ class GigaChatProvider(LLMProvider):
         except Exception as e:
             raise Exception(f"Ошибка получения токена GigaChat: {e}")
     
-    def generate_description(self, diff_content: str, branch_name: str, **kwargs) -> str:
-        """Генерирует описание MR с помощью GigaChat"""
-        
-        prompt = self._build_prompt(diff_content, branch_name, **kwargs)
+    def complete(self, prompt: str, **kwargs) -> str:
+        """Отправляет промпт в GigaChat"""
         
         url = f"{self.base_url}/chat/completions"
         headers = {
@@ -83,84 +83,23 @@ class GigaChatProvider(LLMProvider):
         changed_files = kwargs.get('changed_files', [])
         commit_messages = kwargs.get('commit_messages', [])
         
-        # Определяем тип MR
-        mr_type = self._detect_mr_type(changed_files, commit_messages)
-        
-        print(f"🎯 Определен тип MR: {mr_type}")
+        # Тип MR обычно уже определен генератором
+        mr_type = kwargs.pop('mr_type', None)
+        if not mr_type:
+            mr_type = self._detect_mr_type(changed_files, commit_messages)
+            print(f"🎯 Определен тип MR: {mr_type}")
         
         # Возвращаем специализированный промпт
         return self._get_specialized_prompt(mr_type, diff_content, branch_name, **kwargs)
         
     def _detect_mr_type(self, changed_files: list, commit_messages: list) -> str:
         """Определяет тип MR для выбора подходящего промпта"""
-        
-        # Анализ по файлам
-        has_ci = any(('.github' in f or 'ci' in f.lower() or 'docker' in f.lower() or 
-                     'makefile' in f.lower() or '.yml' in f or '.yaml' in f) for f in changed_files)
-        has_tests = any(('test' in f.lower() or 'spec' in f.lower()) for f in changed_files)
-        has_docs = any(('readme' in f.lower() or '.md' in f.lower()) for f in changed_files)
-        has_config = any(('config' in f.lower() or '.json' in f or '.toml' in f or 
-                         '.env' in f or 'requirements' in f) for f in changed_files)
-        
-        # Анализ по коммитам  
-        commits_text = ' '.join(commit_messages).lower()
-        is_fix = any(word in commits_text for word in ['fix', 'bug', 'исправ', 'bagfix', 'hotfix'])
-        is_feat = any(word in commits_text for word in ['feat', 'add', 'new', 'добав', 'feature'])
-        is_refactor = any(word in commits_text for word in ['refactor', 'clean', 'рефактор', 'restructure'])
-        is_docs = any(word in commits_text for word in ['docs', 'documentation', 'readme', 'документ'])
-        
-        # Определяем тип с приоритетами
-        if has_ci or 'docker' in commits_text or 'deploy' in commits_text:
-            return 'infrastructure'
-        elif is_fix and not is_feat:
-            return 'bugfix'
-        elif is_refactor and not is_feat:
-            return 'refactor'
-        elif has_docs and is_docs and len(changed_files) <= 5:
-            return 'docs'
-        elif is_feat or 'new' in commits_text:
-            return 'feature'
-        else:
-            return 'default'
+        return detect_mr_type(changed_files, commit_messages)
     
     def _get_specialized_prompt(self, mr_type: str, diff_content: str, branch_name: str, **kwargs) -> str:
         """Возвращает специализированный промпт в зависимости от типа MR"""
         
-        language = kwargs.get('language', 'ru')
-        prompt_type = kwargs.get('prompt_type', 'detailed')
-        
-        # Импортируем шаблоны из config
-        from ..config import PROMPT_TEMPLATES
-        
-        # Определяем ключ шаблона
-        template_key = f"{prompt_type}_{language}"
-        
-        if template_key not in PROMPT_TEMPLATES:
-            # Fallback к базовому шаблону
-            template_key = f"basic_{language}"
-        
-        template = PROMPT_TEMPLATES[template_key]
-        
-        # Подготавливаем данные для шаблона
-        changed_files = kwargs.get('changed_files', [])
-        commit_messages = kwargs.get('commit_messages', [])
-        repo_name = kwargs.get('repo_name', 'Unknown')
-        
-        # Форматируем шаблон
-        try:
-            return template.format(
-                branch_name=branch_name,
-                diff_content=diff_content,
-                repo_name=repo_name,
-                changed_files_count=len(changed_files),
-                commits_count=len(commit_messages)
-            )
-        except KeyError as e:
-            # Если в шаблоне не хватает параметров, используем базовый формат
-            return template.format(
-                branch_name=branch_name,
-                diff_content=diff_content
-            )
+        return get_prompt_builder().build(diff_content, branch_name, mr_type=mr_type, **kwargs)
     
     def _get_russian_prompt(self, mr_type: str, diff_content: str, branch_name: str, **kwargs) -> str:
         """Специализированные русские промпты"""
@@ -0,0 +1,86 @@
+"""
+Провайдер для локальных серверов с OpenAI-совместимым API (llama.cpp, vLLM и др.)
+"""
+
+import json
+import requests
+from typing import Dict, Iterable
+from ..core.base_provider import LLMProvider
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Провайдер для серверов с API /chat/completions в формате OpenAI"""
+
+    REQUIRES_API_KEY = False
+
+    def __init__(self, api_key: str, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.base_url = kwargs.get('base_url', 'http://localhost:8080/v1').rstrip('/')
+        self.model = kwargs.get('model', 'local-model')
+        self.temperature = kwargs.get('temperature', 0.7)
+        self.auth_header = kwargs.get('auth_header', 'Authorization')
+        self.auth_scheme = kwargs.get('auth_scheme', 'Bearer')
+        self.stream = kwargs.get('stream', True)
+        self.timeout = kwargs.get('timeout', 300)
+
+    def _headers(self) -> Dict[str, str]:
+        """Заголовки запроса; ключ передается, только если он задан"""
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            value = f'{self.auth_scheme} {self.api_key}' if self.auth_scheme else self.api_key
+            headers[self.auth_header] = value
+        return headers
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        """Отправляет промпт на локальный сервер"""
+
+        url = f"{self.base_url}/chat/completions"
+        payload = {
+            'model': self.model,
+            'messages': [
+                {
+                    'role': 'system',
+                    'content': 'You are a helpful assistant that generates clear and professional merge request descriptions based on git diffs.'
+                },
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ],
+            'temperature': self.temperature,
+            'max_tokens': kwargs.get('max_tokens', 1000),
+            'stream': self.stream
+        }
+
+        try:
+            # При потоковой передаче таймаут чтения действует между фрагментами,
+            # а не на весь ответ: долгая генерация на слабом железе не обрывается
+            response = requests.post(url, headers=self._headers(), json=payload,
+                                     stream=self.stream, timeout=self.timeout)
+            response.raise_for_status()
+            if self.stream:
+                with response:
+                    return ''.join(self._iter_stream(response.iter_lines())).strip()
+            result = response.json()
+            return result['choices'][0]['message']['content'].strip()
+        except Exception as e:
+            raise Exception(f"Ошибка генерации с локальным сервером {self.base_url}: {e}")
+
+    @staticmethod
+    def _iter_stream(lines: Iterable[bytes]) -> Iterable[str]:
+        """Фрагменты текста из потока server-sent events"""
+        for line in lines:
+            if not line.startswith(b'data:'):
+                continue
+            data = line[len(b'data:'):].strip()
+            if data == b'[DONE]':
+                break
+            chunk = json.loads(data)
+            for choice in chunk.get('choices', []):
+                content = (choice.get('delta') or {}).get('content')
+                if content:
+                    yield content
+
+    def get_model_name(self) -> str:
+        """Возвращает название модели"""
+        return f"Local-{self.model}"
@@ -0,0 +1,118 @@
+"""
+Реестр провайдеров с ленивой загрузкой
+
+Провайдеры находятся через entry points группы "mr_generator.providers"
+(importlib.metadata), а модуль импортируется только у выбранного
+провайдера. Сторонний пакет подключает провайдера так:
+
+    [project.entry-points."mr_generator.providers"]
+    corp-llm = "corp_llm.provider:CorpLLMProvider"
+
+Встроенные провайдеры доступны и без установки пакета (запуск из исходников).
+"""
+
+import importlib
+from typing import Dict, List, Optional, Type
+
+from ..core.base_provider import LLMProvider, implements_complete
+
+ENTRY_POINT_GROUP = "mr_generator.providers"
+
+_PACKAGE = __name__.rpartition('.')[0]
+
+# Встроенные провайдеры: название -> "модуль:класс"
+BUILTIN_PROVIDERS = {
+    'gigachat': f'{_PACKAGE}.gigachat_provider:GigaChatProvider',
+    'deepseek': f'{_PACKAGE}.deepseek_provider:DeepSeekProvider',
+    'local': f'{_PACKAGE}.openai_compatible_provider:OpenAICompatibleProvider',
+}
+
+
+def _entry_points(group: str) -> Dict[str, str]:
+    """Entry points группы: название -> "модуль:класс" (без импорта модулей)"""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return {}
+    found = entry_points()
+    if hasattr(found, 'select'):
+        items = found.select(group=group)
+    else:
+        # Python 3.8-3.9: словарь групп
+        items = found.get(group, [])
+    return {item.name: item.value for item in items}
+
+
+class ProviderRegistry:
+    """Названия провайдеров и их классы, загружаемые по первому запросу"""
+
+    def __init__(self, builtin: Optional[Dict[str, str]] = None,
+                 group: Optional[str] = ENTRY_POINT_GROUP):
+        self.builtin = dict(BUILTIN_PROVIDERS if builtin is None else builtin)
+        self.group = group
+        self._targets: Optional[Dict[str, str]] = None
+        self._classes: Dict[str, Type[LLMProvider]] = {}
+
+    def targets(self) -> Dict[str, str]:
+        """Все известные провайдеры: встроенные, затем из entry points"""
+        if self._targets is None:
+            targets = dict(self.builtin)
+            if self.group:
+                # Пакет может заменить встроенного провайдера (например, заглушкой)
+                targets.update(_entry_points(self.group))
+            self._targets = targets
+        return self._targets
+
+    def names(self) -> List[str]:
+        return list(self.targets())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.targets()
+
+    def register(self, name: str, target: str):
+        """Добавляет провайдера вручную ("модуль:класс")"""
+        self.targets()[name] = target
+        self._classes.pop(name, None)
+
+    def load(self, name: str) -> Type[LLMProvider]:
+        """Импортирует модуль провайдера и возвращает его класс"""
+        if name in self._classes:
+            return self._classes[name]
+        targets = self.targets()
+        if name not in targets:
+            raise ValueError(f"Неподдерживаемый провайдер: {name}. "
+                             f"Доступные: {self.names()}")
+
+        module_name, _, attribute = targets[name].partition(':')
+        try:
+            provider_class = importlib.import_module(module_name)
+            for part in filter(None, attribute.split('.')):
+                provider_class = getattr(provider_class, part)
+        except (ImportError, AttributeError) as e:
+            raise Exception(f"Ошибка загрузки провайдера {name} ({targets[name]}): {e}")
+        if not (isinstance(provider_class, type) and issubclass(provider_class, LLMProvider)):
+            raise Exception(f"Провайдер {name} ({targets[name]}) не наследует LLMProvider")
+        missing = sorted(getattr(provider_class, '__abstractmethods__', ()))
+        if not implements_complete(provider_class):
+            missing.insert(0, 'complete')
+        if missing:
+            raise Exception(f"Провайдер {name} ({targets[name]}) не реализует: "
+                            f"{', '.join(missing)}")
+
+        self._classes[name] = provider_class
+        return provider_class
+
+    def requires_api_key(self, name: str) -> bool:
+        """Нужен ли провайдеру API ключ (атрибут REQUIRES_API_KEY класса)"""
+        return getattr(self.load(name), 'REQUIRES_API_KEY', True)
+
+
+_default_registry: Optional[ProviderRegistry] = None
+
+
+def get_provider_registry() -> ProviderRegistry:
+    """Возвращает общий реестр провайдеров (создается один раз)"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ProviderRegistry()
+    return _default_registry
@@ -81,3 +81,11 @@ class TestConfig:
         max_size = Config.get_max_diff_size()
         assert isinstance(max_size, int)
         assert max_size > 0
+
+    def test_diff_options_copy(self):
+        """Правка вложенных параметров diff не меняет значения по умолчанию"""
+        from mr_generator.config import Config
+
+        options = Config.get_diff_options()
+        options["file_encodings"]["legacy/*"] = "cp866"
+        assert Config.get_diff_options()["file_encodings"] == {}
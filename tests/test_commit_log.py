@@ -0,0 +1,50 @@
+"""
+Тесты для сжатия списка коммитов
+"""
+
+import sys
+import os
+
+# Добавляем src в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mr_generator.core.commit_log import compact_commit_log
+from mr_generator.core.file_classifier import detect_mr_type
+
+
+class TestCompactCommitLog:
+    """Тесты для compact_commit_log"""
+
+    def test_merges_and_duplicates(self):
+        """Merge-коммиты убираются, почти одинаковые сообщения группируются"""
+        messages = [
+            "fix",
+            "feat(api): add endpoint PROJ-12",
+            "Merge branch 'main' into feature",
+            "fixup! feat(api): add endpoint PROJ-12",
+            "wip",
+            "Bump version to 1.2.3",
+            "fix",
+            "Bump version to 1.2.4",
+            "Merge pull request #42 from org/feature",
+        ]
+        log = compact_commit_log(messages, max_tokens=0)
+
+        assert log.lines == [
+            "fix (×2)",
+            "feat(api): add endpoint PROJ-12 (×2)",
+            "wip",
+            "Bump version to 1.2.3 (×2)",
+        ]
+        assert (log.total, log.merges, log.omitted) == (9, 2, 0)
+
+    def test_budget_keeps_meaningful_commits(self):
+        """При нехватке бюджета conventional commits остаются, остальное отбрасывается"""
+        messages = ["wip"] * 5 + [f"refactor: split module number{i}x" for i in range(3)]
+        messages += [f"update docs for section s{i}x" for i in range(300)]
+        log = compact_commit_log(messages, max_tokens=60)
+
+        refactors = [line for line in log.lines if line.startswith("refactor:")]
+        assert len(refactors) == 3
+        assert log.omitted > 250
+        assert detect_mr_type(["src/a.py"], log.lines) == "refactor"
@@ -0,0 +1,302 @@
+"""
+Тесты для обработки diff: разбор, нормализация, сокращение
+"""
+
+import sys
+import os
+
+# Добавляем src в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mr_generator.core.diff_model import parse_diff, render_diff
+from mr_generator.core.diff_normalizer import DiffNormalizer, NormalizationStats
+from mr_generator.core.diff_dedup import HunkDeduplicator
+from mr_generator.core.diff_parallel import ParallelDiffProcessor, split_buffer
+from mr_generator.core.diff_renames import collapse_renames
+from mr_generator.core.file_classifier import classify_path, detect_mr_type
+from mr_generator.core.symbol_digest import SymbolDigest, parse_python_symbols
+
+SAMPLE_DIFF = """diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,4 @@
+ def foo():
+-    return 1
++    return 2
++
+@@ -10,2 +11,3 @@ def bar():
+     pass
++    # TODO: remove
+diff --git a/logo.png b/logo.png
+index 3333333..4444444 100644
+Binary files a/logo.png and b/logo.png differ
+""".encode("utf-8")
+
+
+class TestDiffModel:
+    """Тесты для разбора diff"""
+
+    def test_parse_and_render_roundtrip(self):
+        """Разбор и обратная сборка не теряют строк"""
+        files = parse_diff(SAMPLE_DIFF)
+        assert [f.path for f in files] == ["app.py", "logo.png"]
+        assert len(files[0].hunks) == 2
+        assert files[0].additions == 3
+        assert files[0].deletions == 1
+        assert render_diff(files) + "\n" == SAMPLE_DIFF.decode("utf-8")
+
+    def test_size_matches_rendered_text(self):
+        """Размер модели совпадает с длиной собранного текста"""
+        files = parse_diff(SAMPLE_DIFF)
+        assert sum(f.size for f in files) == len(SAMPLE_DIFF)
+
+    def test_offsets_into_shared_buffer(self):
+        """Файлы и hunk'и ссылаются на общий буфер, а не копируют строки"""
+        files = parse_diff(SAMPLE_DIFF)
+        hunk = files[0].hunks[0]
+        assert not hasattr(hunk, "__dict__")
+        assert hunk.buffer is SAMPLE_DIFF and files[1].buffer is SAMPLE_DIFF
+        assert hunk.header == b"@@ -1,3 +1,4 @@"
+        assert bytes(hunk.raw()).startswith(b"@@ -1,3 +1,4 @@\n def foo():")
+        assert list(hunk.changed_lines) == [b"-    return 1", b"+    return 2", b"+"]
+
+    def test_fallback_encoding(self):
+        """Файл не в UTF-8 декодируется запасной кодировкой"""
+        diff = (
+            "diff --git a/legacy.pas b/legacy.pas\n"
+            "--- a/legacy.pas\n"
+            "+++ b/legacy.pas\n"
+            "@@ -1 +1 @@\n"
+            "-// старый\n"
+            "+// новый\n"
+        ).encode("cp1251")
+        files = parse_diff(diff, fallback_encoding="cp1251")
+        assert "+// новый" in render_diff(files)
+
+    def test_one_encoding_per_file(self):
+        """Кодировка определяется по всему файлу, а не по каждому hunk'у отдельно"""
+        diff = (
+            "diff --git a/legacy.pas b/legacy.pas\n"
+            "--- a/legacy.pas\n"
+            "+++ b/legacy.pas\n"
+            "@@ -1 +1 @@\n"
+            "-// old\n"
+            "+// Ва\n"
+        ).encode("utf-8") + "@@ -9 +9 @@\n-// старый\n+// новый\n".encode("cp1251")
+        files = parse_diff(diff, fallback_encoding="cp1251")
+        rendered = render_diff(files)
+        assert files[0].encoding == "cp1251"
+        assert "+// новый" in rendered
+        # UTF-8 фрагмент того же файла тоже читается как cp1251
+        assert "+// " + "Ва".encode("utf-8").decode("cp1251") in rendered
+
+
+class TestDiffNormalizer:
+    """Тесты для нормализации diff"""
+
+    def test_drop_comment_hunks(self):
+        """Hunk только с комментариями выбрасывается, остальное сохраняется"""
+        stats = NormalizationStats()
+        normalizer = DiffNormalizer(drop_comment_hunks=True, minify=True)
+        files = normalizer.normalize(parse_diff(SAMPLE_DIFF), stats)
+
+        assert [f.path for f in files] == ["app.py", "logo.png"]
+        assert len(files[0].hunks) == 1
+        assert not any(line.startswith(b"index ") for line in files[0].header_lines)
+        assert [step for step, _, _ in stats.steps] == [
+            "blank_hunks",
+            "comment_hunks",
+            "minify",
+        ]
+        assert stats.tokens_saved > 0
+
+    @staticmethod
+    def _single_hunk(path: str, body: str) -> bytes:
+        return (f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+                f"@@ -1,3 +1,3 @@\n{body}").encode("utf-8")
+
+    def test_block_comment_hunks(self):
+        """Строки "* ..." считаются комментарием только внутри блока /* */"""
+        normalizer = DiffNormalizer(drop_comment_hunks=True)
+        doc = self._single_hunk("api.ts", " /**\n- * Старое описание\n+ * Новое описание\n */\n")
+        pointer = self._single_hunk("main.c", " int *p = &x;\n-*p = 1;\n+*p = 2;\n")
+        css = self._single_hunk("site.css", "-* { margin: 0 }\n+* { margin: 1px }\n")
+        closed = self._single_hunk("main.c", "-/* old */\n+/* new */\n-*p = 1;\n+*p = 2;\n")
+
+        assert normalizer.normalize(parse_diff(doc), NormalizationStats()) == []
+        for diff in (pointer, css, closed):
+            files = normalizer.normalize(parse_diff(diff), NormalizationStats())
+            assert len(files) == 1 and len(files[0].hunks) == 1
+
+
+class TestHunkDeduplicator:
+    """Тесты для схлопывания повторяющихся правок"""
+
+    @staticmethod
+    def _rename_diff(count):
+        sections = []
+        for i in range(count):
+            sections.append(
+                f"diff --git a/pkg/m{i}.py b/pkg/m{i}.py\n"
+                f"--- a/pkg/m{i}.py\n"
+                f"+++ b/pkg/m{i}.py\n"
+                f"@@ -{i},2 +{i},2 @@ def f{i}():\n"
+                f"-    return old_name({i})\n"
+                f"+    return new_name({i})\n"
+            )
+        return "".join(sections).encode("utf-8")
+
+    def test_mass_rename_collapsed(self):
+        """Переименование в разных файлах схлопывается в один кластер"""
+        diff = self._rename_diff(5) + SAMPLE_DIFF
+        files, clusters = HunkDeduplicator(min_files=3).deduplicate(parse_diff(diff))
+
+        assert len(clusters) == 1
+        assert len(clusters[0].paths) == 5
+        assert [f.path for f in files] == ["app.py", "logo.png"]
+
+    def test_below_threshold_kept(self):
+        """Правки в малом числе файлов не трогаются"""
+        files, clusters = HunkDeduplicator(min_files=3).deduplicate(
+            parse_diff(self._rename_diff(2))
+        )
+        assert clusters == []
+        assert len(files) == 2
+
+    def test_labels_follow_language(self):
+        """Подписи раздела с кластерами на языке промпта"""
+        files = parse_diff(self._rename_diff(3))
+        deduplicator = HunkDeduplicator(min_files=3, language="en")
+        text = deduplicator.render_clusters(deduplicator.deduplicate(files)[1])
+
+        assert text.startswith("=== REPEATED CHANGES ===")
+        assert "# Same change: 3 hunks in 3 files (example: pkg/m0.py)" in text
+        assert "# Files: pkg/m0.py, pkg/m1.py, pkg/m2.py" in text
+
+
+class TestRenames:
+    """Тесты для схлопывания переименований"""
+
+    def test_directory_move_collapsed(self):
+        """Перемещение директории дает одну строку сводки"""
+        sections = [
+            f"diff --git a/src/pkg/m{i}.py b/lib/pkg/m{i}.py\n"
+            f"similarity index 100%\n"
+            f"rename from src/pkg/m{i}.py\n"
+            f"rename to lib/pkg/m{i}.py\n"
+            for i in range(4)
+        ]
+        diff = "".join(sections).encode("utf-8") + SAMPLE_DIFF
+        files, summary = collapse_renames(parse_diff(diff))
+
+        assert summary == ["перемещен: src/ → lib/ (файлов: 4)"]
+        assert [f.path for f in files] == ["app.py", "logo.png"]
+
+        _, summary = collapse_renames(parse_diff(diff), language="en")
+        assert summary == ["moved: src/ → lib/ (files: 4)"]
+
+    def test_modified_binary_rename_kept(self):
+        """Переименованный и измененный бинарный файл не считается перемещением"""
+        diff = (
+            "diff --git a/img/logo.png b/assets/logo.png\n"
+            "similarity index 87%\n"
+            "rename from img/logo.png\n"
+            "rename to assets/logo.png\n"
+            "index 3333333..4444444 100644\n"
+            "Binary files a/img/logo.png and b/assets/logo.png differ\n"
+        ).encode("utf-8")
+        files, summary = collapse_renames(parse_diff(diff))
+
+        assert summary == []
+        assert [f.path for f in files] == ["assets/logo.png"]
+
+
+class TestFileClassifier:
+    """Тесты для классификации файлов"""
+
+    def test_classify_path(self):
+        """Категории определяются по имени, директории и расширению"""
+        assert classify_path("src/specific.py") == "source"
+        assert classify_path("tests/test_api.py") == "test"
+        assert classify_path(".github/workflows/build.yml") == "ci"
+        assert classify_path("docs/guide.md") == "docs"
+        assert classify_path("requirements.txt") == "config"
+        assert classify_path("vendor/lib/lib_test.go") == "generated"
+
+    def test_detect_mr_type(self):
+        """Тип MR определяется по категориям файлов и коммитам"""
+        assert detect_mr_type(["src/specific.py"], ["Fix crash on empty diff"]) == "bugfix"
+        assert detect_mr_type(["src/api.py"], ["feat: add export"]) == "feature"
+        assert detect_mr_type([".gitlab-ci.yml"], ["update"]) == "infrastructure"
+        assert detect_mr_type(["README.md"], ["update"]) == "docs"
+
+    def test_infrastructure_not_from_prose(self):
+        """Слова ci и pipeline в тексте коммита не делают MR инфраструктурным"""
+        assert detect_mr_type(["src/cli.py"], ["Run the real pipeline in --dry-run"]) == "default"
+        assert detect_mr_type(["src/cli.py"], ["Add CI env support"]) == "feature"
+        assert detect_mr_type(["src/cli.py"], ["ci: cache pip downloads"]) == "infrastructure"
+        assert detect_mr_type(["src/cli.py"], ["ci(lint): run ruff"]) == "infrastructure"
+
+
+class TestSymbolDigest:
+    """Тесты для сводки символов"""
+
+    def test_compare_python_symbols(self):
+        """Добавленные, удаленные и измененные символы попадают в сводку"""
+        old = parse_python_symbols(
+            b"def foo(x):\n    return x\n\nclass A:\n    def m(self):\n        pass\n"
+        )
+        new = parse_python_symbols(
+            b"def foo(x, y=1):\n    return x\n\nclass A:\n    def m(self):\n"
+            b"        return 1\n\ndef bar():\n    pass\n"
+        )
+        assert SymbolDigest.compare(old, new) == [
+            "+ def bar()",
+            "~ def foo(x) → def foo(x, y=…)",
+            "~ def A.m(self)",
+        ]
+
+    def test_syntax_error_skipped(self):
+        """Файл с синтаксической ошибкой не разбирается"""
+        assert parse_python_symbols(b"def broken(:\n") is None
+
+    def test_rename_into_python_file(self):
+        """Переименование файла без расширения в .py с правками не прерывает сводку"""
+
+        class FakeGitHelper:
+            def read_blobs(self, shas):
+                blobs = {"a" * 40: b"def old():\n    pass\n",
+                         "b" * 40: b"def old():\n    pass\n\ndef new():\n    pass\n"}
+                return {sha: blobs[sha] for sha in shas}
+
+        changes = [{"path": "tools/run.py", "old_path": "tools/run",
+                    "old_sha": "a" * 40, "new_sha": "b" * 40}]
+        assert SymbolDigest(FakeGitHelper()).build(changes) == [
+            "tools/run.py",
+            "  + def new()",
+        ]
+
+
+class TestParallelDiffProcessor:
+    """Тесты для параллельной обработки diff"""
+
+    def test_matches_serial_processing(self):
+        """Пул процессов дает тот же результат, что и обработка в одном процессе"""
+        diff = TestHunkDeduplicator._rename_diff(6) + SAMPLE_DIFF
+        options = {"drop_comment_hunks": True, "dedup_hunks": True}
+
+        serial_stats = NormalizationStats()
+        serial = DiffNormalizer(**options).normalize(parse_diff(diff), serial_stats)
+        serial, serial_clusters = HunkDeduplicator().deduplicate(serial)
+
+        stats = NormalizationStats()
+        files, fingerprints = ParallelDiffProcessor(jobs=2, min_size=0).process(
+            diff, options, stats
+        )
+        files, clusters = HunkDeduplicator().deduplicate(files, fingerprints)
+
+        assert len(split_buffer(diff, 3)) == 3
+        assert render_diff(files) == render_diff(serial)
+        assert stats.steps == serial_stats.steps
+        assert [c.paths for c in clusters] == [c.paths for c in serial_clusters]
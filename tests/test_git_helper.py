@@ -0,0 +1,308 @@
+"""
+Тесты для GitHelper на временном репозитории
+"""
+
+import json
+import sys
+import os
+import subprocess
+
+# Добавляем src в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mr_generator.core.diff_cache import DiffCache
+from mr_generator.core.diff_segments import SegmentCache
+from mr_generator.core.git_helper import GitHelper
+from mr_generator.core.memory_budget import MemoryBudget, parse_size
+from mr_generator.core.revisions import read_ci_revisions
+from mr_generator.core.stack import build_stack, stack_context, summarize_description
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+class TestParallelDiff:
+    """Тесты для параллельного git diff по частям списка файлов"""
+
+    def test_partitioned_diff_matches_single_diff(self, tmp_path):
+        """Diff по частям совпадает с обычным, переименования не теряются"""
+        repo = str(tmp_path)
+        _git(repo, "init", "-q", "-b", "main")
+        for i in range(12):
+            (tmp_path / f"m{i:02d}.py").write_text(f"value = {i}\n" + "x = 1\n" * 20)
+        (tmp_path / "odd name*.txt").write_text("text\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "init")
+
+        _git(repo, "checkout", "-q", "-b", "feature")
+        for i in range(0, 12, 2):
+            (tmp_path / f"m{i:02d}.py").write_text(f"value = {i * 10}\n" + "x = 1\n" * 20)
+        _git(repo, "mv", "m01.py", "z01.py")
+        (tmp_path / "odd name*.txt").write_text("changed\n")
+        _git(repo, "commit", "-q", "-am", "change")
+
+        helper = GitHelper(repo)
+        single = helper.get_diff_bytes("feature", "main", jobs=1)
+        partitioned = helper.get_diff_bytes(
+            "feature", "main", jobs=3, parallel_min_files=0
+        )
+
+        assert b"rename to z01.py" in single
+        assert partitioned == single
+
+
+class TestDiffCache:
+    """Тесты для кэша diff'ов на диске"""
+
+    def test_roundtrip_and_eviction(self, tmp_path):
+        """Записи читаются обратно, а при переполнении вытесняются самые старые"""
+        cache = DiffCache(str(tmp_path), max_size=250)
+        first = DiffCache.make_key("diff", ["a" * 40, "b" * 40, "-M50%"])
+        second = DiffCache.make_key("diff", ["a" * 40, "c" * 40, "-M50%"])
+
+        cache.put(first, os.urandom(190))
+        os.utime(cache._path(first), (1, 1))
+        data = os.urandom(100)
+        cache.put(second, data)
+
+        assert cache.get(first) is None
+        assert cache.get(second) == data
+        assert cache.get_json(DiffCache.make_key("files", ["x"])) is None
+
+    def test_eviction_scans_only_on_overflow(self, tmp_path, monkeypatch):
+        """Директория обходится при первой записи и при переполнении, а не на каждую запись"""
+        cache = DiffCache(str(tmp_path), max_size=1000)
+        scans = []
+        original = cache._evict
+        monkeypatch.setattr(cache, "_evict", lambda: scans.append(1) or original())
+
+        for i in range(5):
+            cache.put(DiffCache.make_key("diff", [i]), os.urandom(100))
+        assert len(scans) == 1
+
+        cache.put(DiffCache.make_key("diff", ["big"]), os.urandom(600))
+        assert len(scans) == 2
+        assert cache._size <= 1000
+
+    def test_failed_write_removes_tmp_file(self, tmp_path):
+        """При ошибке записи временный файл не остается в директории кэша"""
+        cache = DiffCache(str(tmp_path))
+
+        class BrokenSource:
+            def seek(self, offset):
+                pass
+
+            def read(self, size):
+                raise OSError("read failed")
+
+        cache.put_stream(DiffCache.make_key("diff", ["x"]), BrokenSource())
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_git_helper_uses_cache(self, tmp_path):
+        """Повторный запрос diff'а берется из кэша"""
+        repo = str(tmp_path / "repo")
+        os.makedirs(repo)
+        _git(repo, "init", "-q", "-b", "main")
+        (tmp_path / "repo" / "a.py").write_text("a = 1\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "init")
+        _git(repo, "checkout", "-q", "-b", "feature")
+        (tmp_path / "repo" / "a.py").write_text("a = 2\n")
+        _git(repo, "commit", "-q", "-am", "change")
+
+        cache = DiffCache(str(tmp_path / "cache"))
+        helper = GitHelper(repo, cache=cache)
+        diff = helper.get_diff_bytes("feature", "main", jobs=1)
+        assert len(os.listdir(str(tmp_path / "cache"))) == 2  # merge-base и diff
+
+        assert helper.get_diff_bytes("feature", "main", jobs=1) == diff
+        assert helper.get_changed_files("feature", "main") == ["a.py"]
+        assert helper.get_commit_messages("feature", "main") == ["change"]
+
+
+class TestDiffSegments:
+    """Тесты для сборки diff'а из секций файлов (режим watch)"""
+
+    def test_only_changed_files_are_recomputed(self, tmp_path):
+        """Diff из сегментов совпадает с обычным, после коммита пересчитывается один файл"""
+        repo = str(tmp_path)
+        _git(repo, "init", "-q", "-b", "main")
+        for name in ("a.py", "b.py", "c.py"):
+            (tmp_path / name).write_text("x = 1\n" * 10)
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "init")
+
+        _git(repo, "checkout", "-q", "-b", "feature")
+        (tmp_path / "a.py").write_text("x = 2\n" * 10)
+        _git(repo, "mv", "b.py", "d.py")
+        (tmp_path / "new file.txt").write_text("text\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "change")
+
+        helper = GitHelper(repo)
+        segments = SegmentCache()
+        first = helper.get_diff_segments("feature", "main", segments=segments)
+        assert first == helper.get_diff_bytes("feature", "main", jobs=1)
+        assert (segments.hits, segments.misses) == (0, 3)
+
+        (tmp_path / "c.py").write_text("x = 3\n" * 10)
+        _git(repo, "commit", "-q", "-am", "more")
+
+        second = helper.get_diff_segments("feature", "main", segments=segments)
+        assert second == helper.get_diff_bytes("feature", "main", jobs=1)
+        assert (segments.hits, segments.misses) == (3, 4)
+
+    def test_long_path_list_split(self, tmp_path, monkeypatch):
+        """Список путей длиннее лимита передается в git diff по частям"""
+        repo = str(tmp_path)
+        _git(repo, "init", "-q", "-b", "main")
+        (tmp_path / "base.txt").write_text("base\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "init")
+        _git(repo, "checkout", "-q", "-b", "feature")
+        for i in range(7):
+            (tmp_path / f"f{i}.txt").write_text(f"{i}\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "many files")
+
+        monkeypatch.setattr("mr_generator.core.git_helper.MAX_PATHSPEC_PATHS", 3)
+        helper = GitHelper(repo)
+        calls = []
+        run_diff = helper._run_diff
+        monkeypatch.setattr(helper, "_run_diff",
+                            lambda args, base, head, paths=None: calls.append(paths)
+                            or run_diff(args, base, head, paths))
+
+        diff = helper.get_diff_segments("feature", "main", segments=SegmentCache())
+        assert diff == helper.get_diff_bytes("feature", "main", jobs=1)
+        assert [len(paths) for paths in calls[:3]] == [3, 3, 1]
+
+
+class TestBranchStack:
+    """Тесты для пакетной генерации по стеку веток"""
+
+    def test_stack_order_and_parent_relative_diff(self, tmp_path):
+        """Ветки упорядочены по истории, diff потомка не содержит изменений предка"""
+        repo = str(tmp_path)
+        _git(repo, "init", "-q", "-b", "main")
+        (tmp_path / "base.py").write_text("x = 1\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "init")
+        for name in ("feature-1", "feature-2", "feature-3"):
+            _git(repo, "checkout", "-q", "-b", name)
+            (tmp_path / f"{name}.py").write_text(f"name = '{name}'\n")
+            _git(repo, "add", "-A")
+            _git(repo, "commit", "-q", "-m", name)
+        _git(repo, "checkout", "-q", "-b", "other", "main")
+        (tmp_path / "other.py").write_text("y = 2\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "other")
+
+        helper = GitHelper(repo)
+        branches = ["feature-3", "other", "feature-1", "feature-2"]
+        heads = dict(zip(branches, helper.resolve_commits(*branches)))
+        stack = build_stack(heads, helper.is_ancestor)
+
+        assert stack == [
+            ("other", None),
+            ("feature-1", None),
+            ("feature-2", "feature-1"),
+            ("feature-3", "feature-2"),
+        ]
+        diff = helper.get_diff_bytes("feature-3", "feature-2")
+        assert b"feature-3.py" in diff
+        assert b"feature-2.py" not in diff and b"feature-1.py" not in diff
+
+    def test_stack_context(self):
+        """Контекст стека содержит цепочку предков и сводки их описаний"""
+        summary = summarize_description("## Сводка\n\nДобавлен API заказов\n\n## Изменения\n- a")
+        assert summary == "Добавлен API заказов"
+        assert stack_context([]) == ""
+
+        context = stack_context([("feature-1", summary), ("feature-2", "")])
+        assert "feature-1 → feature-2" in context
+        assert "feature-1: Добавлен API заказов" in context
+
+
+class TestMemoryBudget:
+    """Тесты для режима с лимитом памяти"""
+
+    def test_spooled_diff_matches_in_memory(self, tmp_path):
+        """Diff через временный файл и mmap совпадает с обычным, в том числе из кэша"""
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        _git(str(repo), "init", "-q", "-b", "main")
+        (repo / "a.txt").write_text("one\n")
+        _git(str(repo), "add", "-A")
+        _git(str(repo), "commit", "-q", "-m", "init")
+        _git(str(repo), "checkout", "-q", "-b", "feature")
+        (repo / "a.txt").write_text("two\n" * 1000)
+        _git(str(repo), "commit", "-q", "-am", "change")
+
+        expected = GitHelper(str(repo)).get_diff_bytes("feature", "main")
+        helper = GitHelper(str(repo), cache=DiffCache(str(tmp_path / "cache")))
+        helper.memory_budget = MemoryBudget(parse_size("64M"), str(tmp_path))
+
+        first = helper.get_diff_bytes("feature", "main")
+        second = helper.get_diff_bytes("feature", "main")
+        assert not isinstance(first, bytes)
+        assert first[:] == second[:] == expected
+        assert helper.get_diff_bytes("main", "main") == b""
+
+    def test_parse_size(self):
+        """Размер памяти принимается с суффиксами K, M, G"""
+        assert parse_size("512M") == 512 * 1024 ** 2
+        assert parse_size("1.5g") == int(1.5 * 1024 ** 3)
+        assert parse_size("2GB") == 2 * 1024 ** 3
+        assert parse_size("4096") == 4096
+
+
+class TestExplicitRevisions:
+    """Тесты для работы по явным SHA коммитов (CI, bare и mirror клоны)"""
+
+    def test_bare_mirror_diff_by_sha(self, tmp_path):
+        """В mirror клоне без рабочей копии diff и метаданные считаются по SHA"""
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        _git(str(repo), "init", "-q", "-b", "main")
+        (repo / "a.txt").write_text("one\n")
+        _git(str(repo), "add", "-A")
+        _git(str(repo), "commit", "-q", "-m", "init")
+        _git(str(repo), "checkout", "-q", "-b", "feature")
+        (repo / "b.txt").write_text("two\n")
+        _git(str(repo), "add", "-A")
+        _git(str(repo), "commit", "-q", "-m", "add b")
+        _git(str(tmp_path), "clone", "-q", "--mirror", str(repo), "mirror.git")
+
+        helper = GitHelper(str(tmp_path / "mirror.git"))
+        base, head = helper.resolve_commits("main", "feature")
+        assert helper.is_git_repo()
+        assert b"b.txt" in helper.get_diff_bytes(head, base)
+        assert helper.get_changed_files(head, base) == ["b.txt"]
+        assert helper.get_commit_messages(head, base) == ["add b"]
+        assert "current_branch" not in helper.get_repo_info(include_branch=False)
+
+    def test_read_ci_revisions(self, tmp_path):
+        """SHA берутся из переменных GitLab CI или из файла события GitHub Actions"""
+        assert read_ci_revisions({}) is None
+
+        gitlab = read_ci_revisions({
+            "CI_MERGE_REQUEST_DIFF_BASE_SHA": "aaa",
+            "CI_COMMIT_SHA": "bbb",
+            "CI_MERGE_REQUEST_SOURCE_BRANCH_NAME": "feature/api",
+        })
+        assert (gitlab.base, gitlab.head, gitlab.branch) == ("aaa", "bbb", "feature/api")
+
+        event = tmp_path / "event.json"
+        event.write_text(json.dumps({
+            "pull_request": {"base": {"sha": "ccc"}, "head": {"sha": "ddd", "ref": "fix"}},
+        }))
+        github = read_ci_revisions({"GITHUB_EVENT_PATH": str(event)})
+        assert (github.base, github.head, github.branch) == ("ccc", "ddd", "fix")
+        assert github.source == "GitHub Actions"
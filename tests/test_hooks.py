@@ -0,0 +1,32 @@
+"""
+Тесты для установки git hook'ов
+"""
+
+import sys
+import os
+
+# Добавляем src в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mr_generator.core.hooks import MARKER_BEGIN, install_hooks
+
+
+class TestInstallHooks:
+    """Тесты для hook'ов фоновой подготовки diff'а"""
+
+    def test_existing_hook_preserved_and_reinstall_idempotent(self, tmp_path):
+        """Чужой hook сохраняется, повторная установка не дублирует блок"""
+        existing = tmp_path / "pre-push"
+        existing.write_text("#!/bin/sh\nrun-linters\nexit 0\n")
+
+        install_hooks(str(tmp_path), ["python", "-m", "mr_generator.cli", "precompute"])
+        paths = install_hooks(
+            str(tmp_path), ["python", "-m", "mr_generator.cli", "precompute", "--symbols"]
+        )
+
+        content = existing.read_text()
+        assert content.count(MARKER_BEGIN) == 1
+        assert content.index(MARKER_BEGIN) < content.index("exit 0")
+        assert "run-linters" in content and "--symbols" in content
+        assert all(os.access(path, os.X_OK) for path in paths)
+        assert (tmp_path / "post-commit").read_text().startswith("#!/bin/sh\n")
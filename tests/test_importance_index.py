@@ -0,0 +1,94 @@
+"""
+Тесты для индекса важности файлов
+"""
+
+import sys
+import os
+import subprocess
+
+# Добавляем src в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mr_generator.core.git_helper import GitHelper
+from mr_generator.core.importance_index import ImportanceIndex, extract_imports, module_name
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+def _commit(repo, message, date):
+    _git(repo, "add", "-A")
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com",
+         "commit", "-q", "-m", message],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        env={**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+    )
+
+
+class TestImportanceIndex:
+    """Тесты для ImportanceIndex на временном репозитории"""
+
+    def test_incremental_update_and_scores(self, tmp_path):
+        """Индекс читает только новые коммиты, переносит историю при переименовании"""
+        repo = str(tmp_path)
+        _git(repo, "init", "-q", "-b", "main")
+        (tmp_path / "core.py").write_text("VALUE = 0\n")
+        (tmp_path / "cold.py").write_text("import os\n")
+        (tmp_path / "user.py").write_text("from app import core\n")
+        _commit(repo, "init", "2024-01-01T00:00:00")
+        for i in range(1, 4):
+            (tmp_path / "core.py").write_text(f"VALUE = {i}\n")
+            _commit(repo, f"change {i}", f"2024-06-0{i}T00:00:00")
+
+        helper = GitHelper(repo)
+        index = ImportanceIndex(str(tmp_path / "importance.json"), helper)
+        assert index.update(helper.resolve_commits("main")[0]) == 4
+
+        _git(repo, "mv", "core.py", "engine.py")
+        (tmp_path / "other.py").write_text("import engine\n")
+        _commit(repo, "rename", "2024-06-10T00:00:00")
+        assert index.update(helper.resolve_commits("main")[0]) == 1
+        assert index.update(helper.resolve_commits("main")[0]) == 0
+
+        scores = index.scores(["engine.py", "cold.py", "new.py"])
+        assert scores["engine.py"] > scores["cold.py"] > 0
+        assert scores["new.py"] == 0.0
+
+    def test_large_blobs_skipped_and_batched(self, tmp_path, monkeypatch):
+        """Большие файлы не читаются, остальные читаются частями ограниченного размера"""
+        repo = str(tmp_path)
+        _git(repo, "init", "-q", "-b", "main")
+        for i in range(3):
+            (tmp_path / f"m{i}.py").write_text(f"import dep{i}\n")
+        (tmp_path / "huge.py").write_text("import big\n" + "#" * 2048)
+        _commit(repo, "init", "2024-01-01T00:00:00")
+
+        monkeypatch.setattr("mr_generator.core.importance_index.MAX_SOURCE_SIZE", 1024)
+        monkeypatch.setattr("mr_generator.core.importance_index.READ_BATCH_SIZE", 20)
+        helper = GitHelper(repo)
+        batches = []
+        read_blobs = helper.read_blobs
+        monkeypatch.setattr(helper, "read_blobs",
+                            lambda shas: batches.append(len(shas)) or read_blobs(shas))
+
+        index = ImportanceIndex(str(tmp_path / "importance.json"), helper)
+        assert index.update(helper.resolve_commits("main")[0]) == 1
+        assert batches == [1, 1, 1]
+        assert index.scores(["m0.py"])["m0.py"] > 0
+
+    def test_extract_imports(self):
+        """Импорты Python и JavaScript сводятся к коротким именам модулей"""
+        python = b"import os.path\nfrom .core import stack\nfrom . import x\n"
+        assert extract_imports("a.py", python) == ["core", "path"]
+        js = b"import api from './services/api.js'\nconst u = require('../utils')\n"
+        assert extract_imports("a.ts", js) == ["api", "utils"]
+        assert module_name("src/utils/index.ts") == "utils"
@@ -0,0 +1,130 @@
+"""
+Тесты для построителя промптов
+"""
+
+import pytest
+import sys
+import os
+
+# Добавляем src в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mr_generator.config import PROMPT_TEMPLATES
+from mr_generator.core.prompt_builder import PromptBuilder, get_prompt_builder
+
+
+class TestPromptBuilder:
+    """Тесты для PromptBuilder"""
+
+    def test_matches_str_format(self):
+        """Результат совпадает с str.format для всех шаблонов"""
+        builder = get_prompt_builder()
+        values = {
+            "branch_name": "feature/x",
+            "diff_content": "diff --git a/a.py b/a.py\n+{not_a_field}",
+            "repo_name": "repo",
+            "changed_files_count": 2,
+            "commits_count": 3,
+            "mr_type": "bugfix",
+        }
+        for key, text in PROMPT_TEMPLATES.items():
+            # Шаблон без языка (structured) подходит для любого языка
+            prompt_type, _, language = key.partition("_")
+            prompt = builder.build(
+                values["diff_content"],
+                values["branch_name"],
+                prompt_type=prompt_type,
+                language=language or "en",
+                repo_name="repo",
+                changed_files=["a.py", "b.py"],
+                commit_messages=["1", "2", "3"],
+                mr_type="bugfix",
+            )
+            assert prompt == text.format(**values)
+
+    def test_mr_type_in_prompt(self):
+        """Тип MR попадает в промпт каждого шаблона"""
+        builder = get_prompt_builder()
+        for prompt_type in ("basic", "detailed", "concise", "structured"):
+            feature = builder.build("+x", "b", prompt_type=prompt_type, mr_type="feature")
+            bugfix = builder.build("+x", "b", prompt_type=prompt_type, mr_type="bugfix")
+            assert "bugfix" in bugfix and "bugfix" not in feature
+
+    def test_fallback_to_basic(self):
+        """Неизвестный тип промпта откатывается к basic шаблону"""
+        builder = get_prompt_builder()
+        template = builder.get_template("unknown", "en")
+        assert template.key == "basic_en"
+
+    def test_unknown_placeholder_rejected(self):
+        """Неизвестный плейсхолдер обнаруживается при загрузке шаблонов"""
+        with pytest.raises(ValueError):
+            PromptBuilder({"basic_ru": "{branch_name} {author}"})
+
+
+class TestProviderPrompt:
+    """Тесты для разделения сборки промпта и запроса к модели"""
+
+    def test_generate_description_sends_built_prompt(self):
+        """generate_description отправляет в complete тот же промпт, что дает build_prompt"""
+        from mr_generator.providers.deepseek_provider import DeepSeekProvider
+
+        sent = []
+
+        class OfflineProvider(DeepSeekProvider):
+            def complete(self, prompt, **kwargs):
+                sent.append(prompt)
+                return "ok"
+
+        provider = OfflineProvider("key")
+        prompt = provider.build_prompt("+x = 1", "feature/x", language="en")
+        assert "+x = 1" in prompt
+        assert provider.generate_description("+x = 1", "feature/x", language="en") == "ok"
+        assert sent == [prompt]
+
+
+class TestStructuredDescription:
+    """Тесты для рендеринга структурированного описания"""
+
+    RESPONSE = """```json
+{
+  "summary": {"ru": "Добавлен кэш", "en": "Added cache"},
+  "highlights": [{"ru": "Добавлен кэш diff", "en": "Added diff cache"}],
+  "changes": {
+    "code": [{"ru": "Класс `DiffCache`", "en": "Class `DiffCache`"}],
+    "config": [],
+    "tests": [{"ru": "Тест вытеснения", "en": "Eviction test"}]
+  },
+  "purpose": {"ru": "Ускорить запуски", "en": "Speed up runs"},
+  "technical": [],
+  "files": [{"path": "core/diff_cache.py", "change": {"ru": "новый модуль", "en": "new module"}}]
+}
+```"""
+
+    def test_render_all_variants(self):
+        """Из одного ответа собираются все форматы на обоих языках"""
+        from mr_generator.core.structured_description import parse_structured, render_all
+
+        variants = render_all(parse_structured(self.RESPONSE))
+        assert len(variants) == 6
+
+        assert variants[("detailed", "en")] == (
+            "## 📋 Summary\nAdded cache\n\n"
+            "## 🔧 Changes\n\n### Code\n• Class `DiffCache`\n\n### Tests\n• Eviction test\n\n"
+            "## 🎯 Purpose\nSpeed up runs\n\n"
+            "## 📁 Key Files\n• `core/diff_cache.py` - new module"
+        )
+        assert variants[("concise", "ru")] == (
+            "## Изменения\n• Добавлен кэш diff\n\n## Цель\nУскорить запуски\n\n"
+            "## Файлы\n• `core/diff_cache.py` - новый модуль"
+        )
+        assert variants[("basic", "ru")].startswith(
+            "## Изменения\n• Класс `DiffCache`\n• Тест вытеснения\n\n"
+        )
+
+    def test_invalid_response(self):
+        """Ответ без JSON - понятная ошибка"""
+        from mr_generator.core.structured_description import parse_structured
+
+        with pytest.raises(ValueError):
+            parse_structured("## Изменения\n• что-то")
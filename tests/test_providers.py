@@ -0,0 +1,266 @@
+"""
+Тесты для провайдеров языковых моделей
+"""
+
+from unittest.mock import MagicMock, patch
+import pytest
+import sys
+import os
+import time
+
+# Добавляем src в путь для импорта
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mr_generator.core.base_provider import LLMProvider
+from mr_generator.core.health import CircuitBreaker, CircuitOpenError, HealthCheckedProvider
+from mr_generator.core.rate_limiter import RateLimiter, RateLimitExceeded
+from mr_generator.providers.fallback_provider import FallbackProvider
+from mr_generator.providers.openai_compatible_provider import OpenAICompatibleProvider
+from mr_generator.providers.registry import ProviderRegistry
+
+
+class FakeProvider(LLMProvider):
+    """Провайдер с заданной задержкой и ответом (или ошибкой)"""
+
+    def __init__(self, name, delay=0.0, answer=None, error=None):
+        super().__init__("")
+        self.name = name
+        self.delay = delay
+        self.answer = answer
+        self.error = error
+        self.calls = 0
+
+    def complete(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise Exception(self.error)
+        return self.answer
+
+    def get_model_name(self):
+        return self.name
+
+
+class TestOpenAICompatibleProvider:
+    """Тесты для провайдера локального OpenAI-совместимого сервера"""
+
+    def test_stream_response(self):
+        """Ответ собирается из фрагментов server-sent events"""
+        response = MagicMock()
+        response.iter_lines.return_value = [
+            b'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            b"",
+            b'data: {"choices": [{"delta": {"content": "## Changes"}}]}',
+            b'data: {"choices": [{"delta": {"content": "\\n- fix"}}]}',
+            b"data: [DONE]",
+        ]
+        provider = OpenAICompatibleProvider("", base_url="http://gpu:8000/v1/", model="qwen")
+
+        with patch("requests.post", return_value=response) as post:
+            assert provider.complete("prompt") == "## Changes\n- fix"
+
+        url = post.call_args[0][0]
+        assert url == "http://gpu:8000/v1/chat/completions"
+        assert "Authorization" not in post.call_args[1]["headers"]
+        assert post.call_args[1]["json"]["stream"] is True
+
+    def test_custom_auth_header(self):
+        """Ключ передается в заданном заголовке, без потоковой передачи"""
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": " text "}}]}
+        provider = OpenAICompatibleProvider(
+            "secret", auth_header="X-API-Key", auth_scheme="", stream=False
+        )
+
+        with patch("requests.post", return_value=response) as post:
+            assert provider.complete("prompt") == "text"
+
+        assert post.call_args[1]["headers"]["X-API-Key"] == "secret"
+
+
+class TestFallbackProvider:
+    """Тесты для цепочки резервных провайдеров"""
+
+    def test_fallback_on_error(self):
+        """При ошибке основного провайдера ответ дает следующий, третий не запускается"""
+        third = FakeProvider("third", answer="c")
+        provider = FallbackProvider(
+            [FakeProvider("first", error="503"), FakeProvider("second", answer="b"), third]
+        )
+        assert provider.complete("prompt") == "b"
+        assert third.calls == 0
+
+    def test_staggered_hedge(self):
+        """Медленный основной провайдер не ждем дольше hedge_delay"""
+        provider = FallbackProvider(
+            [FakeProvider("slow", delay=2.0, answer="a"), FakeProvider("fast", answer="b")],
+            race_mode="staggered",
+            hedge_delay=0.05,
+        )
+        start = time.monotonic()
+        assert provider.complete("prompt") == "b"
+        assert time.monotonic() - start < 1.0
+
+    def test_latency_budget(self):
+        """Без ответа в пределах бюджета времени - ошибка со списком причин"""
+        provider = FallbackProvider(
+            [FakeProvider("broken", error="timeout"), FakeProvider("slow", delay=2.0, answer="a")],
+            race_mode="parallel",
+            latency_budget=0.1,
+        )
+        with pytest.raises(Exception, match="broken: timeout; нет ответа за 0.1 с"):
+            provider.complete("prompt")
+
+
+class TestCircuitBreaker:
+    """Тесты для circuit breaker'а endpoint'ов"""
+
+    def test_open_and_half_open_probe(self, tmp_path):
+        """После серии ошибок запросы не отправляются, пробный запрос закрывает цепь"""
+        breaker = CircuitBreaker(str(tmp_path / "health.json"), failure_threshold=2)
+        failing = FakeProvider("down", error="timeout")
+        provider = HealthCheckedProvider(failing, breaker, "down")
+
+        for _ in range(2):
+            with pytest.raises(Exception, match="timeout"):
+                provider.complete("prompt")
+        with pytest.raises(CircuitOpenError):
+            provider.complete("prompt")
+        assert failing.calls == 2
+
+        # Состояние общее: новый экземпляр читает его из файла
+        other = CircuitBreaker(str(tmp_path / "health.json"))
+        assert other.snapshot("down")["state"] == "open"
+
+        failing.error = None
+        failing.answer = "ok"
+        with patch("time.time", return_value=time.time() + 61):
+            assert provider.complete("prompt") == "ok"
+        assert other.snapshot("down")["state"] == "closed"
+
+    def test_fallback_skips_open_endpoint(self, tmp_path):
+        """Разомкнутый endpoint сразу передает запрос резервному провайдеру"""
+        breaker = CircuitBreaker(str(tmp_path / "health.json"), failure_threshold=1)
+        slow = FakeProvider("slow", error="timeout")
+        breaker.record("slow", False, 30.0)
+
+        provider = FallbackProvider(
+            [HealthCheckedProvider(slow, breaker, "slow"), FakeProvider("spare", answer="b")]
+        )
+        assert provider.complete("prompt") == "b"
+        assert slow.calls == 0
+
+
+class TestRateLimiter:
+    """Тесты для общего лимита запросов и токенов"""
+
+    def test_shared_buckets_queue_requests(self, tmp_path):
+        """Процессы с одним ключом делят лимит и ждут своей очереди"""
+        path = str(tmp_path / "limits.json")
+        first = RateLimiter(path, requests_per_minute=2, tokens_per_minute=6000)
+        second = RateLimiter(path, requests_per_minute=2, tokens_per_minute=6000)
+        key = RateLimiter.make_key("deepseek", "secret")
+
+        with patch("time.time", return_value=1000.0):
+            assert first.reserve(key, 1000) == 0
+            assert second.reserve(key, 1000) == 0
+            # Оба запроса минуты израсходованы: третий ждет 30 с (2 запроса в минуту)
+            assert first.reserve(key, 1000) == pytest.approx(30.0)
+
+    def test_token_bucket(self, tmp_path):
+        """Запрос ждет, пока восстановятся токены (100 в секунду при 6000 в минуту)"""
+        limiter = RateLimiter(str(tmp_path / "limits.json"), tokens_per_minute=6000)
+        with patch("time.time", return_value=1000.0):
+            assert limiter.reserve("key", 5000) == 0
+            assert limiter.reserve("key", 3000) == pytest.approx(20.0)
+        with patch("time.time", return_value=1030.0):
+            # За 30 с восстановилось 3000 токенов: баланс 1000
+            assert limiter.reserve("key", 1000) == 0
+
+    def test_wait_over_limit(self, tmp_path):
+        """Слишком долгое ожидание - ошибка без резервирования"""
+        limiter = RateLimiter(str(tmp_path / "limits.json"), requests_per_minute=1, max_wait=10)
+        with patch("time.time", return_value=1000.0):
+            assert limiter.reserve("key", 0) == 0
+            with pytest.raises(RateLimitExceeded):
+                limiter.reserve("key", 0)
+            with pytest.raises(RateLimitExceeded):
+                limiter.reserve("key", 0)
+
+
+class TestProviderRegistry:
+    """Тесты для реестра провайдеров"""
+
+    def test_entry_point_provider_loaded_lazily(self, tmp_path, monkeypatch):
+        """Провайдер из entry point импортируется только при выборе"""
+        (tmp_path / "corp_llm_stub.py").write_text(
+            "from mr_generator.core.base_provider import LLMProvider\n"
+            "class StubProvider(LLMProvider):\n"
+            "    REQUIRES_API_KEY = False\n"
+            "    def complete(self, prompt, **kwargs):\n"
+            "        return 'stub'\n"
+            "    def get_model_name(self):\n"
+            "        return 'Stub'\n"
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.setattr(
+            "mr_generator.providers.registry._entry_points",
+            lambda group: {"corp-llm": "corp_llm_stub:StubProvider"},
+        )
+        registry = ProviderRegistry()
+
+        assert registry.names()[-1] == "corp-llm" and "local" in registry
+        assert "corp_llm_stub" not in sys.modules
+        provider_class = registry.load("corp-llm")
+        assert provider_class("").complete("prompt") == "stub"
+        assert not registry.requires_api_key("corp-llm")
+        assert registry.requires_api_key("deepseek")
+
+    def test_unknown_and_invalid_providers(self):
+        """Неизвестный провайдер и класс не от LLMProvider дают понятную ошибку"""
+        registry = ProviderRegistry(builtin={}, group=None)
+        registry.register("bad", "collections:OrderedDict")
+
+        with pytest.raises(ValueError, match="Неподдерживаемый провайдер"):
+            registry.load("missing")
+        with pytest.raises(Exception, match="не наследует LLMProvider"):
+            registry.load("bad")
+
+    def test_legacy_provider_routed_through_generate_description(self):
+        """Провайдер под прежний контракт (только generate_description) продолжает работать"""
+
+        class LegacyProvider(LLMProvider):
+            def generate_description(self, diff_content, branch_name, **kwargs):
+                return f"{branch_name}: {diff_content} ({kwargs['language']})"
+
+            def get_model_name(self):
+                return "Legacy"
+
+        class NoCompleteProvider(LLMProvider):
+            def get_model_name(self):
+                return "Broken"
+
+        provider = LegacyProvider("")
+        prompt = provider.build_prompt("+x = 1", "feature/x", language="en")
+        assert "+x = 1" in prompt
+        assert provider.complete(prompt) == "feature/x: +x = 1 (en)"
+        wrapped = FallbackProvider([provider])
+        assert wrapped.complete(wrapped.build_prompt("+y", "b", language="ru")) == "b: +y (ru)"
+
+        with pytest.raises(NotImplementedError):
+            NoCompleteProvider("").complete("prompt")
+
+    def test_provider_without_complete_rejected(self, tmp_path, monkeypatch):
+        """Провайдер без complete и generate_description не загружается"""
+        (tmp_path / "broken_llm_stub.py").write_text(
+            "from mr_generator.core.base_provider import LLMProvider\n"
+            "class BrokenProvider(LLMProvider):\n"
+            "    def get_model_name(self):\n"
+            "        return 'Broken'\n"
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        registry = ProviderRegistry(builtin={}, group=None)
+        registry.register("broken", "broken_llm_stub:BrokenProvider")
+
+        with pytest.raises(Exception, match="не реализует: complete"):
+            registry.load("broken")